@@ -1,198 +1,11 @@
 import os
 import gradio as gr
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 
-# Load model and tokenizer (using a model that works without sentencepiece)
-# For demo purposes, we'll try a different approach
-print("🚀 Initializing AI Translator...")
-model_name = "google/flan-t5-small"
-tokenizer = None
-model = None
-
-try:
-    print(f"📥 Loading model: {model_name}")
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-    print("✅ Model loaded successfully!")
-except Exception as e:
-    print(f"⚠️ Error loading model: {e}")
-    print("🔄 Falling back to demo mode...")
-    # If this fails too, we'll create a mock translator for demo purposes
-    tokenizer = None
-    model = None
-
-# Translation function with error handling
-def translate(text, src_lang, tgt_lang):
-    print(f"🔄 Translating: '{text}' from {src_lang} to {tgt_lang}")
-    
-    try:
-        if not text.strip():
-            return "⚠️ Please enter some text to translate"
-        
-        if src_lang == tgt_lang:
-            return "⚠️ Source and target languages are the same"
-            
-        # If model failed to load, use a mock translator for demo
-        if tokenizer is None or model is None:
-            print("📝 Using mock translator (model not loaded)")
-            # Simple mock translation for demo purposes
-            lang_names = {
-                "en": "English", "hi": "Hindi", "fr": "French", 
-                "de": "German", "es": "Spanish"
-            }
-            
-            # Mock translations for common phrases
-            mock_translations = {
-                ("en", "hi"): {
-                    "Hello World": "नमस्ते दुनिया",
-                    "Good morning! How are you today?": "सुप्रभात! आज आप कैसे हैं?",
-                    "Thank you very much for your help!": "आपकी सहायता के लिए बहुत धन्यवाद!",
-                    "How are you? I hope you're having a great day!": "आप कैसे हैं? मुझे उम्मीद है कि आपका दिन अच्छा जा रहा है!"
-                },
-                ("en", "fr"): {
-                    "Hello World": "Bonjour le monde",
-                    "Good morning! How are you today?": "Bonjour! Comment allez-vous aujourd'hui?",
-                    "Thank you very much for your help!": "Merci beaucoup pour votre aide!",
-                    "How are you? I hope you're having a great day!": "Comment allez-vous? J'espère que vous passez une excellente journée!"
-                },
-                ("en", "es"): {
-                    "Hello World": "Hola Mundo",
-                    "Good morning! How are you today?": "¡Buenos días! ¿Cómo estás hoy?",
-                    "Thank you very much for your help!": "¡Muchas gracias por tu ayuda!",
-                    "How are you? I hope you're having a great day!": "¿Cómo estás? ¡Espero que tengas un gran día!"
-                },
-                ("en", "de"): {
-                    "Hello World": "Hallo Welt",
-                    "Good morning! How are you today?": "Guten Morgen! Wie geht es dir heute?",
-                    "Thank you very much for your help!": "Vielen Dank für deine Hilfe!",
-                    "How are you? I hope you're having a great day!": "Wie geht es dir? Ich hoffe, du hast einen großartigen Tag!"
-                }
-            }
-            
-            # Check if we have a mock translation
-            lang_pair = (src_lang, tgt_lang)
-            if lang_pair in mock_translations and text in mock_translations[lang_pair]:
-                return f"🎯 {mock_translations[lang_pair][text]}\n\n💡 Demo Translation (Mock)"
-            
-            return f"🔄 Mock Translation: '{text}' from {lang_names.get(src_lang, src_lang)} to {lang_names.get(tgt_lang, tgt_lang)}\n\n⚠️ This is a demo interface. The actual translation model requires additional dependencies that are not compatible with Python 3.13. Please see installation notes below."
-            
-        # For FLAN-T5 models (if they loaded successfully)
-        print("🤖 Using T5 model for translation")
-        
-        # Create more specific prompts for better T5 performance
-        if src_lang == "en" and tgt_lang == "fr":
-            input_text = f"translate English to French: {text}"
-        elif src_lang == "en" and tgt_lang == "de":
-            input_text = f"translate English to German: {text}"
-        elif src_lang == "en" and tgt_lang == "es":
-            input_text = f"translate English to Spanish: {text}"
-        elif src_lang == "en" and tgt_lang == "hi":
-            input_text = f"translate English to Hindi: {text}"
-        else:
-            return "⚠️ This demo model supports limited language pairs (EN→FR/DE/ES/HI)"
-            
-        print(f"📝 Input prompt: {input_text}")
-        encoded = tokenizer(input_text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-        generated_tokens = model.generate(
-            **encoded, 
-            max_length=512, 
-            num_beams=4, 
-            early_stopping=True,
-            do_sample=False,
-            temperature=1.0
-        )
-        translated = tokenizer.decode(generated_tokens[0], skip_special_tokens=True)
-        print(f"✅ T5 output: '{translated}'")
-        
-        # Check if T5 output is valid (comprehensive validation)
-        is_valid_translation = (
-            translated and 
-            translated.strip() and
-            translated.strip() != input_text.strip() and
-            len(translated.strip()) > 3 and
-            not translated.strip().startswith("Translate") and
-            not translated.strip().startswith("translate") and
-            # Check if output contains mostly punctuation or special characters
-            sum(c.isalpha() for c in translated) > len(translated) * 0.3 and  # At least 30% letters
-            not all(c in "?!.,;: " for c in translated.strip())  # Not just punctuation
-        )
-        
-        if not is_valid_translation:
-            print(f"⚠️ T5 output invalid: '{translated}' - using curated translation")
-            # Use high-quality curated translations as fallback
-            # Enhanced curated translations for better quality
-            curated_translations = {
-                ("en", "hi"): {
-                    "Hello World": "नमस्ते दुनिया",
-                    "Good morning! How are you today?": "सुप्रभात! आज आप कैसे हैं?",
-                    "Thank you very much for your help!": "आपकी सहायता के लिए बहुत धन्यवाद!",
-                    "How are you? I hope you're having a great day!": "आप कैसे हैं? मुझे उम्मीद है कि आपका दिन अच्छा जा रहा है!",
-                    "Hello": "नमस्ते",
-                    "Thank you": "धन्यवाद",
-                    "Good morning": "सुप्रभात",
-                    "How are you": "आप कैसे हैं",
-                    "I love you": "मैं तुमसे प्यार करता हूँ",
-                    "Welcome": "स्वागत है"
-                },
-                ("en", "fr"): {
-                    "Hello World": "Bonjour le monde",
-                    "Good morning! How are you today?": "Bonjour! Comment allez-vous aujourd'hui?",
-                    "Thank you very much for your help!": "Merci beaucoup pour votre aide!",
-                    "How are you? I hope you're having a great day!": "Comment allez-vous? J'espère que vous passez une excellente journée!",
-                    "Hello": "Bonjour",
-                    "Thank you": "Merci",
-                    "Good morning": "Bonjour",
-                    "How are you": "Comment allez-vous",
-                    "I love you": "Je t'aime",
-                    "Welcome": "Bienvenue"
-                },
-                ("en", "es"): {
-                    "Hello World": "Hola Mundo",
-                    "Good morning! How are you today?": "¡Buenos días! ¿Cómo estás hoy?",
-                    "Thank you very much for your help!": "¡Muchas gracias por tu ayuda!",
-                    "How are you? I hope you're having a great day!": "¿Cómo estás? ¡Espero que tengas un gran día!",
-                    "Hello": "Hola",
-                    "Thank you": "Gracias",
-                    "Good morning": "Buenos días",
-                    "How are you": "¿Cómo estás?",
-                    "I love you": "Te amo",
-                    "Welcome": "Bienvenido"
-                },
-                ("en", "de"): {
-                    "Hello World": "Hallo Welt",
-                    "Good morning! How are you today?": "Guten Morgen! Wie geht es dir heute?",
-                    "Thank you very much for your help!": "Vielen Dank für deine Hilfe!",
-                    "How are you? I hope you're having a great day!": "Wie geht es dir? Ich hoffe, du hast einen großartigen Tag!",
-                    "Hello": "Hallo",
-                    "Thank you": "Danke",
-                    "Good morning": "Guten Morgen",
-                    "How are you": "Wie geht es dir",
-                    "I love you": "Ich liebe dich",
-                    "Welcome": "Willkommen"
-                }
-            }
-            
-            lang_pair = (src_lang, tgt_lang)
-            # First try exact match
-            if lang_pair in curated_translations and text in curated_translations[lang_pair]:
-                return f"🎯 {curated_translations[lang_pair][text]}\n\n✨ High-Quality Curated Translation"
-            
-            # Then try case-insensitive match
-            text_lower = text.lower()
-            for key, value in curated_translations.get(lang_pair, {}).items():
-                if key.lower() == text_lower:
-                    return f"🎯 {value}\n\n✨ High-Quality Curated Translation"
-            
-            # If no exact match, provide a generic response
-            lang_names = {"en": "English", "hi": "Hindi", "fr": "French", "de": "German", "es": "Spanish"}
-            return f"🔄 [Professional translation needed for '{text}']\nFrom {lang_names.get(src_lang, src_lang)} to {lang_names.get(tgt_lang, tgt_lang)}\n\n⚠️ T5 model output was incomplete. For production use, consider using specialized translation models like M2M100 or commercial APIs."
-        
-        return f"🎯 {translated}\n\n🤖 Powered by T5 Model"
-        
-    except Exception as e:
-        error_msg = f"❌ Translation error: {str(e)}"
-        print(error_msg)
-        return error_msg
+from api_server import API_PORT, start_api_server
+from metrics import METRICS_PORT, start_metrics_server
+from translation_engine import CONCURRENCY, print_startup_report
+from translator import engine, model_ready, router, translate, translate_document, translate_stream
+from worker_pool import WORKERS, start_worker_pool
 
 # Enhanced language options with flags and names (limited for Marian model)
 language_options = [
@@ -202,6 +15,8 @@ language_options = [
     ("🇩🇪 German", "de"),
     ("🇪🇸 Spanish", "es"),
 ]
+# The source can also be detected from the text itself
+source_options = [("🔍 Auto-detect", "auto")] + language_options
 
 # Custom CSS for better styling
 custom_css = """
@@ -303,7 +118,7 @@ with gr.Blocks(css=custom_css, title="🌍 AI Translator", theme=gr.themes.Soft(
     with gr.Row():
         with gr.Column(scale=1):
             src_lang = gr.Dropdown(
-                choices=language_options,
+                choices=source_options,
                 value="en",
                 label="🔤 Source Language",
                 elem_classes=["language-dropdown"]
@@ -332,6 +147,14 @@ with gr.Blocks(css=custom_css, title="🌍 AI Translator", theme=gr.themes.Soft(
                 size="lg",
                 elem_classes=["translate-btn"]
             )
+            document_mode = gr.Checkbox(
+                label="📄 Document mode (long texts, streamed sentence by sentence)",
+                value=False
+            )
+            stream_tokens = gr.Checkbox(
+                label="⚡ Show the translation word by word as it is generated",
+                value=False
+            )
         with gr.Column(scale=1):
             pass
     
@@ -358,8 +181,19 @@ with gr.Blocks(css=custom_css, title="🌍 AI Translator", theme=gr.themes.Soft(
         </div>
     """)
     
+    # Translate handler: a generator so partial output can be streamed
+    def translate_ui(text, src, tgt, document, stream):
+        if document:
+            yield from translate_document(text, src, tgt)
+        elif stream:
+            yield from translate_stream(text, src, tgt)
+        else:
+            yield translate(text, src, tgt)
+    
     # Function to swap languages
     def swap_languages(src, tgt):
+        if src == "auto":
+            return src, tgt  # "auto" cannot be a target
         return tgt, src
     
     # Example text functions
@@ -374,8 +208,8 @@ with gr.Blocks(css=custom_css, title="🌍 AI Translator", theme=gr.themes.Soft(
     
     # Event handlers
     translate_button.click(
-        fn=translate,
-        inputs=[input_text, src_lang, tgt_lang],
+        fn=translate_ui,
+        inputs=[input_text, src_lang, tgt_lang, document_mode, stream_tokens],
         outputs=output_text
     )
     
@@ -395,13 +229,34 @@ with gr.Blocks(css=custom_css, title="🌍 AI Translator", theme=gr.themes.Soft(
     
     # Auto-translate on Enter key
     input_text.submit(
-        fn=translate,
-        inputs=[input_text, src_lang, tgt_lang],
+        fn=translate_ui,
+        inputs=[input_text, src_lang, tgt_lang, document_mode, stream_tokens],
         outputs=output_text
     )
 
 # Launch the app
 if __name__ == "__main__":
+    # Load the model and warm up every language pair before taking traffic
+    print("🚀 Initializing AI Translator...")
+    if model_ready():
+        if WORKERS:
+            # Load once, then fork inference workers that share the weights
+            start_worker_pool(engine, WORKERS)
+            print(f"🧵 Started {WORKERS} inference workers")
+        else:
+            engine.warmup()
+            print_startup_report(engine)
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+        print(f"📈 Metrics at http://localhost:{METRICS_PORT}/metrics")
+    if API_PORT:
+        # Same registry as the UI, so both share one set of routes and one memory budget
+        start_api_server(API_PORT, registry=router())
+        print(f"🌐 JSON API at http://localhost:{API_PORT}/translate")
+
+    # Allow concurrent handlers so the batcher can group their requests
+    demo.queue(default_concurrency_limit=CONCURRENCY)
     demo.launch(
         share=False,
         inbrowser=True,
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Lightweight asyncio JSON API for programmatic translation
+
+Runs next to the Gradio UI (set ``TRANSLATOR_API_PORT``) or on its own, and
+feeds requests straight into the shared engines: every segment becomes an
+engine future, so the event loop never blocks on ``generate`` and the
+segments of a batch request are padded together by the micro-batcher. The
+work before a segment is queued (tokenization, cache and translation memory
+lookups) runs on the loop's default executor.
+
+    POST /translate        {"text": "Hello", "src": "en", "tgt": "fr", "deadline_ms": 500}
+    POST /translate/batch  {"segments": ["Hello", "Bye"], "src": "en", "tgt": "fr", "stream": false}
+    GET  /health
+
+Connections are kept alive (HTTP/1.1). With ``"stream": true`` the batch
+endpoint answers with chunked NDJSON, one line per segment as it finishes.
+When the scheduler is overloaded the API answers 503 with ``Retry-After``
+at once; requests whose ``deadline_ms`` cannot be met get 504. ``"src":
+"auto"`` detects the source language from the text, and segments already in
+the target language are returned as they are, without reaching a model.
+
+    python api_server.py --port 8000          # registry models
+    python api_server.py --port 8000 --tiny   # tiny random models, no download
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import math
+import threading
+import time
+from http import HTTPStatus
+
+from batching import DeadlineExceeded, Overloaded
+from language_detection import AUTO, resolve_source
+from metrics import DECODE_RETRIES, RESULTS
+from model_registry import T5_PAIRS, ModelRegistry, get_registry
+from phrase_store import get_phrase_store
+from translation_cache import TranslationCache
+from translator import is_valid_translation
+
+# Port for the JSON API; 0 leaves it off
+API_PORT = int(os.environ.get("TRANSLATOR_API_PORT", "0"))
+API_MAX_BODY_BYTES = int(os.environ.get("TRANSLATOR_API_MAX_BODY_BYTES", str(1 << 20)))
+API_MAX_SEGMENTS = int(os.environ.get("TRANSLATOR_API_MAX_SEGMENTS", "256"))
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_TIMEOUT = 30
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+async def translate_segment(registry, text, src_lang, tgt_lang, phrases=None, latency_budget_ms=None, deadline=None,
+                            languages=None):
+    """Translate one segment without blocking the loop (curated phrases first, greedy-first retry).
+
+    Segments detected to be in ``tgt_lang`` already (among ``languages``) are returned as they are.
+    Pairs without a direct model are pivoted through English by the registry.
+    """
+    if resolve_source(text, src_lang, tgt_lang, candidates=languages)[1]:
+        RESULTS.inc(source="same_language")
+        return text
+    curated = phrases.lookup(text, src_lang, tgt_lang) if phrases is not None else None
+    if curated is not None:
+        RESULTS.inc(source="curated")
+        return curated
+
+    loop = asyncio.get_running_loop()
+    engine, future, retry_options = await loop.run_in_executor(
+        None, _start_segment, registry, text, src_lang, tgt_lang, latency_budget_ms, deadline)
+    translated = await asyncio.wrap_future(future)
+    if retry_options is not None and text.strip() and not is_valid_translation(translated, text):
+        DECODE_RETRIES.inc(engine=engine.name)
+        try:
+            future = await loop.run_in_executor(
+                None, functools.partial(engine.submit, text, src_lang, tgt_lang, deadline=deadline, **retry_options))
+            translated = await asyncio.wrap_future(future)
+        except DeadlineExceeded:
+            pass
+    RESULTS.inc(source="model")
+    return translated
+
+
+def _start_segment(registry, text, src_lang, tgt_lang, latency_budget_ms, deadline):
+    # Blocking: tokenizes the text and looks it up in the cache and translation memory
+    if len(registry.legs(src_lang, tgt_lang)) > 1:
+        # Each leg is queued on its engine's batcher as the previous one finishes
+        return None, registry.submit(text, src_lang, tgt_lang, latency_budget_ms, deadline), None
+    engine = registry.engine_for(src_lang, tgt_lang)
+    options, retry_options = engine.decoding_options(text, src_lang, tgt_lang, latency_budget_ms)
+    return engine, engine.submit(text, src_lang, tgt_lang, deadline=deadline, **options), retry_options
+
+
+class TranslationApi:
+    """HTTP/1.1 request handling on top of asyncio streams"""
+
+    def __init__(self, registry=None, phrases=None, max_body_bytes=API_MAX_BODY_BYTES,
+                 max_segments=API_MAX_SEGMENTS):
+        self.registry = registry or get_registry()
+        self.phrases = phrases
+        self.max_body_bytes = max_body_bytes
+        self.max_segments = max_segments
+
+    # -- HTTP plumbing ---------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                except ApiError as e:
+                    await self._send_json(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    await self._dispatch(writer, method, path, body, keep_alive)
+                except ApiError as e:
+                    await self._send_json(writer, e.status, {"error": e.message}, keep_alive)
+                except Overloaded as e:
+                    RESULTS.inc(source="busy")
+                    await self._send_json(writer, HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}, keep_alive,
+                                          headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+                except DeadlineExceeded as e:
+                    RESULTS.inc(source="deadline")
+                    await self._send_json(writer, HTTPStatus.GATEWAY_TIMEOUT, {"error": str(e)}, keep_alive)
+                except (ConnectionError, asyncio.CancelledError):
+                    raise
+                except Exception as e:
+                    RESULTS.inc(source="error")
+                    await self._send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR,
+                                          {"error": f"{type(e).__name__}: {e}"}, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive":
+            headers["connection"] = "close"
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > self.max_body_bytes:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body larger than {self.max_body_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method, target.split("?")[0], headers, body
+
+    async def _send_json(self, writer, status, payload, keep_alive=True, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        status = HTTPStatus(status)
+        extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"{extra}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _send_stream(self, writer, lines, keep_alive=True):
+        """Chunked NDJSON response, one chunk per line"""
+        writer.write(
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: application/x-ndjson; charset=utf-8\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        )
+        async for payload in lines:
+            chunk = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+            writer.write(f"{len(chunk):X}\r\n".encode("latin-1") + chunk + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    # -- endpoints -------------------------------------------------------
+
+    async def _dispatch(self, writer, method, path, body, keep_alive):
+        if path == "/health":
+            if method != "GET":
+                raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+            queues = {name: engine.queue_stats() for name, engine in zip(self.registry.names(), self.registry.engines())}
+            await self._send_json(writer, HTTPStatus.OK, {
+                "status": "ok", "models": self.registry.names(), "queues": queues,
+            }, keep_alive)
+            return
+        if path not in ("/translate", "/translate/batch"):
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+        if method != "POST":
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+
+        request = self._parse_body(body)
+        src_lang, tgt_lang = request.get("src"), request.get("tgt")
+        if not isinstance(src_lang, str) or not isinstance(tgt_lang, str):
+            raise ApiError(HTTPStatus.BAD_REQUEST, '"src" and "tgt" language codes are required')
+        languages = self.languages()
+        auto = src_lang == AUTO
+        if auto:
+            src_lang = self._detect_source(request.get("text") if path == "/translate" else request.get("segments"),
+                                           languages)
+        try:
+            # Auto-detected text already in the target language needs no model
+            legs = [] if auto and src_lang == tgt_lang else self.registry.legs(src_lang, tgt_lang)
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+        engines = dict(zip(self.registry.names(), self.registry.engines()))
+        model_name = "+".join(engines[name].model_name for name, _, _ in legs) or None
+        budget = request.get("latency_budget_ms")
+        deadline_ms = request.get("deadline_ms")
+        if deadline_ms is not None and (not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0):
+            raise ApiError(HTTPStatus.BAD_REQUEST, '"deadline_ms" must be a positive number')
+        deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms is not None else None
+
+        if path == "/translate":
+            text = request.get("text")
+            if not isinstance(text, str):
+                raise ApiError(HTTPStatus.BAD_REQUEST, '"text" must be a string')
+            translated = await translate_segment(self.registry, text, src_lang, tgt_lang, self.phrases, budget, deadline,
+                                                 languages)
+            await self._send_json(writer, HTTPStatus.OK, {
+                "translation": translated, "src": src_lang, "tgt": tgt_lang, "model": model_name,
+            }, keep_alive)
+            return
+
+        segments = request.get("segments")
+        if not isinstance(segments, list) or not all(isinstance(segment, str) for segment in segments):
+            raise ApiError(HTTPStatus.BAD_REQUEST, '"segments" must be a list of strings')
+        if len(segments) > self.max_segments:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"At most {self.max_segments} segments per request")
+
+        # Every segment is queued at once so the batcher can pad them together
+        tasks = [
+            asyncio.ensure_future(translate_segment(self.registry, segment, src_lang, tgt_lang, self.phrases, budget, deadline,
+                                                    languages))
+            for segment in segments
+        ]
+        try:
+            if request.get("stream"):
+                await self._send_stream(writer, self._completed(tasks), keep_alive)
+            else:
+                translations = await asyncio.gather(*tasks)
+                await self._send_json(writer, HTTPStatus.OK, {
+                    "translations": translations, "src": src_lang, "tgt": tgt_lang, "model": model_name,
+                }, keep_alive)
+        finally:
+            # Client went away or a segment failed: stop the rest
+            for task in tasks:
+                task.cancel()
+
+    def languages(self):
+        """Every language the registry can translate from or into"""
+        return {lang for pair in self.registry.supported_pairs() for lang in pair}
+
+    def _detect_source(self, sample, languages):
+        """Source language of a request's text (or segments), English if unsure"""
+        if isinstance(sample, list):
+            sample = " ".join(segment for segment in sample if isinstance(segment, str))
+        return resolve_source(sample if isinstance(sample, str) else "", AUTO, None, candidates=languages)[0]
+
+    async def _completed(self, tasks):
+        index_of = {task: index for index, task in enumerate(tasks)}
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=index_of.get):
+                # Headers are already sent, so failures are reported per segment
+                if task.exception() is not None:
+                    RESULTS.inc(source="error")
+                    yield {"index": index_of[task], "error": f"{type(task.exception()).__name__}: {task.exception()}"}
+                else:
+                    yield {"index": index_of[task], "translation": task.result()}
+
+    def _parse_body(self, body):
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+        if not isinstance(request, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return request
+
+
+async def serve(api, host="0.0.0.0", port=API_PORT):
+    """Start listening; returns the asyncio server"""
+    return await asyncio.start_server(api.handle_connection, host, port)
+
+
+def start_api_server(port=API_PORT, host="0.0.0.0", registry=None, phrases=None):
+    """Run the API on its own event loop in a background thread; returns the asyncio server"""
+    api = TranslationApi(registry, phrases if phrases is not None else get_phrase_store())
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(serve(api, host, port))
+    threading.Thread(target=loop.run_forever, name="api-server", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Async JSON translation API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=API_PORT or 8000)
+    parser.add_argument("--tiny", action="store_true", help="serve tiny random models (no download)")
+    args = parser.parse_args(argv)
+
+    registry = None
+    if args.tiny:
+        from benchmark import TinyM2M100Engine, TinyT5Engine
+
+        registry = ModelRegistry()
+        registry.register("t5", TinyT5Engine(cache=TranslationCache(path=None)), pairs=T5_PAIRS)
+        registry.register("m2m100", TinyM2M100Engine(cache=TranslationCache(path=None)))
+    api = TranslationApi(registry, get_phrase_store())
+
+    async def run():
+        server = await serve(api, args.host, args.port)
+        print(f"🌐 Translation API listening on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,30 +1,133 @@
 import gradio as gr
-from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer
-
-model_name = "facebook/m2m100_418M"
-tokenizer = M2M100Tokenizer.from_pretrained(model_name)
-model = M2M100ForConditionalGeneration.from_pretrained(model_name)
-
-LANGUAGE_CODES = {
-    "English": "en",
-    "Hindi": "hi",
-    "French": "fr",
-    "Spanish": "es",
-    "German": "de",
-    "Chinese": "zh",
-    "Russian": "ru",
-    "Japanese": "ja",
-}
-
-def translate(text, src_lang, tgt_lang):
-    tokenizer.src_lang = LANGUAGE_CODES[src_lang]
-    encoded = tokenizer(text, return_tensors="pt")
-    generated_tokens = model.generate(**encoded, forced_bos_token_id=tokenizer.lang_code_to_id[LANGUAGE_CODES[tgt_lang]])
-    return tokenizer.decode(generated_tokens[0], skip_special_tokens=True)
+
+from api_server import API_PORT, start_api_server
+from batching import Overloaded
+from language_detection import AUTO, resolve_source
+from metrics import METRICS_PORT, RESULTS, start_metrics_server
+from phrase_store import get_phrase_store
+from model_registry import get_registry, print_registry_report
+from translation_engine import CONCURRENCY, LANGUAGE_CODES
+from translator import BUSY_MESSAGE, is_valid_translation
+from worker_pool import WORKERS, start_worker_pool
+
+# Each pair is routed to the cheapest capable model (FLAN-T5 for EN→FR/DE/ES,
+# M2M100 for the rest); models load lazily under the registry's memory budget
+registry = get_registry()
+phrases = get_phrase_store()
+AUTO_DETECT = "Auto-detect"
+
+def resolve_codes(text, src_lang, tgt_lang=None):
+    # "Auto-detect" becomes the detected language; same_language means the
+    # text is already in the target and needs no model at all
+    src_code = AUTO if src_lang == AUTO_DETECT else LANGUAGE_CODES[src_lang]
+    tgt_code = LANGUAGE_CODES[tgt_lang] if tgt_lang is not None else None
+    src_code, same_language = resolve_source(text, src_code, tgt_code, candidates=set(LANGUAGE_CODES.values()))
+    return src_code, tgt_code, same_language
+
+def translate(text, src_lang, tgt_lang, latency_budget_ms=None):
+    src_code, tgt_code, same_language = resolve_codes(text, src_lang, tgt_lang)
+    if same_language:
+        RESULTS.inc(source="same_language")
+        return text
+    # Curated phrases never reach the model
+    curated = phrases.lookup(text, src_code, tgt_code)
+    if curated is not None:
+        RESULTS.inc(source="curated")
+        return curated
+    # Result cache + micro-batcher live in the engine
+    try:
+        translated = registry.translate(
+            text, src_code, tgt_code,
+            latency_budget_ms=latency_budget_ms,
+            validate=lambda output: is_valid_translation(output, text),
+        )
+    except Overloaded:
+        # Shed by the scheduler: answer at once instead of queueing behind the backlog
+        RESULTS.inc(source="busy")
+        return BUSY_MESSAGE
+    except Exception:
+        RESULTS.inc(source="error")
+        raise
+    RESULTS.inc(source="model")
+    return translated
+
+def translate_all(text, src_lang):
+    # One source into every other language: the source is encoded once and
+    # all targets are decoded together
+    src_code = resolve_codes(text, src_lang)[0]
+    names = {code: name for name, code in LANGUAGE_CODES.items()}
+    results = {}
+    for tgt_code in names:
+        curated = phrases.lookup(text, src_code, tgt_code)
+        if curated is not None and tgt_code != src_code:
+            RESULTS.inc(source="curated")
+            results[tgt_code] = curated
+    pending = [code for code in names if code != src_code and code not in results]
+    if pending:
+        try:
+            results.update(registry.translate_many(
+                text, src_code, pending,
+                validate=lambda output: is_valid_translation(output, text),
+            ))
+        except Exception:
+            RESULTS.inc(source="error")
+            raise
+        RESULTS.inc(len(pending), source="model")
+    return "\n".join(f"{names[code]}: {results[code]}" for code in names if code in results)
+
+def translate_stream(text, src_lang, tgt_lang):
+    # Token-by-token output; the text box fills in while generate runs
+    src_code, tgt_code, same_language = resolve_codes(text, src_lang, tgt_lang)
+    if same_language:
+        RESULTS.inc(source="same_language")
+        yield text
+        return
+    curated = phrases.lookup(text, src_code, tgt_code)
+    if curated is not None:
+        RESULTS.inc(source="curated")
+        yield curated
+        return
+    try:
+        yield from registry.engine_for(src_code, tgt_code).stream(
+            text, src_code, tgt_code,
+            validate=lambda output: is_valid_translation(output, text),
+        )
+    except Overloaded:
+        # Every stream slot is taken; streams never queue
+        RESULTS.inc(source="busy")
+        yield BUSY_MESSAGE
+        return
+    except Exception:
+        RESULTS.inc(source="error")
+        raise
+    RESULTS.inc(source="model")
+
+def translate_ui(text, src_lang, tgt_lang, document_mode, all_languages, stream_tokens):
+    if all_languages:
+        yield translate_all(text, src_lang)
+    # Document mode streams the output sentence by sentence as batches finish
+    elif document_mode:
+        src_code, tgt_code, same_language = resolve_codes(text, src_lang, tgt_lang)
+        if same_language:
+            RESULTS.inc(source="same_language")
+            yield text
+            return
+        try:
+            yield from registry.engine_for(src_code, tgt_code).translate_stream(
+                text, src_code, tgt_code,
+                validate=lambda segment, output: not segment.strip() or is_valid_translation(output, segment),
+            )
+        except Overloaded:
+            RESULTS.inc(source="busy")
+            yield BUSY_MESSAGE
+    elif stream_tokens:
+        yield from translate_stream(text, src_lang, tgt_lang)
+    else:
+        yield translate(text, src_lang, tgt_lang)
 
 with gr.Blocks(theme=gr.themes.Soft()) as iface:
     gr.Markdown("<h1 style='text-align: center; color: #A78BFA;'>🔵 AI-Powered Multi-Lingual Translator</h1>")
-    gr.Markdown("<p style='text-align: center;'>✨ Powered by M2M100 - Translate between 8 languages instantly ✨</p>")
+    gr.Markdown("<p style='text-align: center;'>✨ Powered by M2M100 + FLAN-T5 - Translate between 8 languages instantly ✨</p>")
 
     with gr.Row():
         with gr.Column():
@@ -35,12 +138,15 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
             output_text = gr.Textbox(placeholder="Translation will appear here...", lines=4)
 
     with gr.Row():
-        src_lang = gr.Dropdown(choices=list(LANGUAGE_CODES.keys()), label="🌐 Source Language", value="English")
+        src_lang = gr.Dropdown(choices=[AUTO_DETECT] + list(LANGUAGE_CODES.keys()), label="🌐 Source Language", value="English")
         tgt_lang = gr.Dropdown(choices=list(LANGUAGE_CODES.keys()), label="🎯 Target Language", value="Hindi")
 
+    document_mode = gr.Checkbox(label="📄 Document mode (long texts, streamed sentence by sentence)", value=False)
+    all_languages = gr.Checkbox(label="🌍 Translate to all languages at once", value=False)
+    stream_tokens = gr.Checkbox(label="⚡ Show the translation word by word as it is generated", value=False)
     translate_btn = gr.Button("🚀 Translate Now", elem_classes=["translate-btn"])
 
-    translate_btn.click(fn=translate, inputs=[input_text, src_lang, tgt_lang], outputs=output_text)
+    translate_btn.click(fn=translate_ui, inputs=[input_text, src_lang, tgt_lang, document_mode, all_languages, stream_tokens], outputs=output_text)
 
     gr.Markdown("💡 **Quick Examples**")
     gr.Examples(
@@ -55,5 +161,24 @@ with gr.Blocks(theme=gr.themes.Soft()) as iface:
         fn=translate
     )
 
-iface.launch(share=True)
+if __name__ == "__main__":
+    if WORKERS:
+        # Load every model, then fork one pool of workers that serves them all
+        # before any other thread starts (every model stays resident in its
+        # workers; the budget does not apply). Workers warm up only the
+        # pairs the registry routes to each model
+        start_worker_pool(registry.engines(), WORKERS, pairs=registry.routed_pairs())
+    else:
+        registry.warmup()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    print_registry_report(registry)
+    if API_PORT:
+        # Programmatic clients skip the Gradio stack entirely
+        start_api_server(API_PORT)
+        print(f"🌐 JSON API at http://localhost:{API_PORT}/translate")
+
+    # Let enough handlers run at once for the batcher to fill its batches
+    iface.queue(default_concurrency_limit=CONCURRENCY)
+    iface.launch(share=True)
 
@@ -0,0 +1,305 @@
+"""
+Dynamic micro-batching and admission control in front of model.generate
+
+Concurrent translation requests are collected for a short window and grouped
+by language pair, so that one padded ``generate`` call serves many callers
+instead of running a batch-of-one forward pass per request.
+
+Each request carries a cost estimate (from its token count and decoding
+settings). Cheap requests are dispatched first so a long paragraph does not
+hold up dozens of short ones, while every request gains priority as it waits
+so long ones never starve. Requests with a deadline are moved ahead once
+their slack runs out and are dropped if it passes while they are queued.
+When the projected queue wait goes over ``TRANSLATOR_MAX_QUEUE_WAIT_MS``,
+new requests are refused straight away with ``Overloaded``. Work that runs
+outside the batches (token streams) takes a ``slot()``, which is admitted
+the same way and counts as running while it lasts.
+"""
+
+import itertools
+import math
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from metrics import QUEUE_WAIT_SECONDS, REGISTRY, SHED_REQUESTS
+
+# Batching window (overridable through the environment)
+BATCH_MAX_SIZE = int(os.environ.get("TRANSLATOR_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("TRANSLATOR_BATCH_MAX_WAIT_MS", "10"))
+# Refuse new requests when the projected wait exceeds this; 0 never refuses
+MAX_QUEUE_WAIT_MS = float(os.environ.get("TRANSLATOR_MAX_QUEUE_WAIT_MS", "0"))
+# Milliseconds of estimated cost forgiven per millisecond spent waiting
+AGING_RATE = float(os.environ.get("TRANSLATOR_SCHED_AGING", "1.0"))
+
+
+class Overloaded(RuntimeError):
+    """The queue is too long to take the request; retry after ``retry_after`` seconds"""
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed (or cannot be met) before it was dispatched"""
+
+
+class _Item:
+    __slots__ = ("text", "future", "enqueued", "cost", "deadline")
+
+    def __init__(self, text, future, enqueued, cost, deadline):
+        self.text = text
+        self.future = future
+        self.enqueued = enqueued
+        self.cost = cost
+        self.deadline = deadline
+
+    def priority(self, now, aging_rate):
+        """Lower runs first: estimated cost minus aging, or the deadline slack if smaller"""
+        score = self.cost - aging_rate * (now - self.enqueued) * 1000
+        if self.deadline is not None:
+            score = min(score, (self.deadline - now) * 1000 - self.cost)
+        return score
+
+
+class _Group:
+    """Pending requests that can share one generate call"""
+
+    __slots__ = ("ready_at", "items")
+
+    def __init__(self, ready_at):
+        self.ready_at = ready_at
+        self.items = []
+
+
+# Live batchers, for the process-wide queue gauges
+_batchers = weakref.WeakSet()
+
+
+class MicroBatcher:
+    """Gather concurrent requests and run them through ``batch_fn`` in groups.
+
+    ``batch_fn(texts, src_lang, tgt_lang, **options)`` must return one output
+    per input text, in order. Requests are grouped by ``(src_lang, tgt_lang)``
+    plus any extra keyword options, because the tokenizer source language and
+    the forced BOS token differ per pair. ``cost_fn(text, options)`` estimates
+    a request's generate time in milliseconds; without it every request costs
+    the same and the queue is first come, first served.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS, num_workers=1,
+                 cost_fn=None, max_queue_wait_ms=MAX_QUEUE_WAIT_MS, aging_rate=AGING_RATE):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0) / 1000.0
+        # More than one dispatcher thread keeps several batches in flight,
+        # e.g. when batch_fn hands work to a pool of inference processes
+        self.num_workers = max(num_workers, 1)
+        self.cost_fn = cost_fn
+        self.max_queue_wait_ms = max_queue_wait_ms
+        self.aging_rate = aging_rate
+        self.shed = 0
+        self._groups = {}
+        # Dispatched batches: id -> (start, estimated cost in ms)
+        self._running = {}
+        self._batch_ids = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+        _batchers.add(self)
+
+    def submit(self, text, src_lang, tgt_lang, deadline=None, **options):
+        """Queue one text and return a Future resolving to its translation.
+
+        ``deadline`` is a ``time.monotonic()`` timestamp. Raises ``Overloaded``
+        when the projected wait is over the limit and ``DeadlineExceeded``
+        when the deadline cannot be met, without queueing the request.
+        """
+        future = Future()
+        key = (src_lang, tgt_lang, tuple(sorted(options.items())))
+        cost = self.cost_fn(text, options) if self.cost_fn is not None else 0.0
+        with self._cond:
+            now = time.monotonic()
+            self._admit(now, cost, deadline)
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group(now + self.max_wait)
+            group.items.append(_Item(text, future, now, cost, deadline))
+            self._ensure_worker()
+            self._cond.notify()
+        return future
+
+    def translate(self, text, src_lang, tgt_lang, timeout=None, **options):
+        """Blocking helper used by the UI handlers"""
+        return self.submit(text, src_lang, tgt_lang, **options).result(timeout)
+
+    @contextmanager
+    def slot(self, cost):
+        """Admit work that runs outside the batches (e.g. a token stream).
+
+        Raises ``Overloaded`` like ``submit``; while the block runs, ``cost``
+        counts toward the projected wait of everything queued behind it.
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._admit(now, cost, None)
+            slot_id = next(self._batch_ids)
+            self._running[slot_id] = (now, cost)
+        try:
+            yield
+        finally:
+            with self._cond:
+                del self._running[slot_id]
+
+    def close(self):
+        """Flush everything still queued and stop the dispatcher threads"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join()
+
+    def depth(self):
+        """Requests waiting to be dispatched"""
+        with self._cond:
+            return sum(len(group.items) for group in self._groups.values())
+
+    def projected_wait_ms(self):
+        with self._cond:
+            return self._projected_wait_ms(time.monotonic())
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": sum(len(group.items) for group in self._groups.values()),
+                "running": len(self._running),
+                "projected_wait_ms": self._projected_wait_ms(time.monotonic()),
+                "shed": self.shed,
+            }
+
+    def _projected_wait_ms(self, now):
+        # A padded batch costs about as much as its most expensive row
+        queued = sum(
+            math.ceil(len(group.items) / self.max_batch_size) * max(item.cost for item in group.items)
+            for group in self._groups.values()
+        )
+        running = sum(max(cost - (now - start) * 1000, 0.0) for start, cost in self._running.values())
+        return (queued + running) / self.num_workers
+
+    def _admit(self, now, cost, deadline):
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        if self.max_queue_wait_ms or deadline is not None:
+            wait_ms = self._projected_wait_ms(now)
+            if self.max_queue_wait_ms and wait_ms > self.max_queue_wait_ms:
+                self._shed("busy")
+                raise Overloaded(f"Translator busy: projected wait {wait_ms:.0f}ms exceeds "
+                                 f"{self.max_queue_wait_ms:.0f}ms", wait_ms / 1000.0)
+            if deadline is not None and now + (wait_ms + cost) / 1000 > deadline:
+                self._shed("deadline")
+                raise DeadlineExceeded(f"Deadline cannot be met: projected wait {wait_ms:.0f}ms")
+
+    def _shed(self, reason):
+        self.shed += 1
+        SHED_REQUESTS.inc(reason=reason)
+
+    def _ensure_worker(self):
+        if not self._threads:
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._run, name=f"micro-batcher-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _ready(self, group, now):
+        if len(group.items) >= self.max_batch_size or now >= group.ready_at or self._closed:
+            return True
+        # Do not hold a request for the batching window once its slack is gone
+        return any(item.deadline is not None and (item.deadline - now) * 1000 - item.cost <= self.max_wait * 1000
+                   for item in group.items)
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if not self._groups:
+                    if self._closed:
+                        return None
+                    self._cond.wait()
+                    continue
+
+                now = time.monotonic()
+                ready = [(key, group) for key, group in self._groups.items() if self._ready(group, now)]
+                if not ready:
+                    self._cond.wait(min(group.ready_at for group in self._groups.values()) - now)
+                    continue
+
+                # Serve the ready group holding the most urgent request, and
+                # from it the most urgent requests first
+                def priority(item):
+                    return item.priority(now, self.aging_rate)
+
+                key, group = min(ready, key=lambda kv: min(priority(item) for item in kv[1].items))
+                group.items.sort(key=priority)
+                items = group.items[:self.max_batch_size]
+                del group.items[:self.max_batch_size]
+                if not group.items:
+                    del self._groups[key]
+                batch_id = next(self._batch_ids)
+                self._running[batch_id] = (now, max(item.cost for item in items))
+                return key, items, batch_id
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            (src_lang, tgt_lang, options), items, batch_id = batch
+            try:
+                self._dispatch(src_lang, tgt_lang, options, items)
+            finally:
+                with self._cond:
+                    del self._running[batch_id]
+
+    def _dispatch(self, src_lang, tgt_lang, options, items):
+        # Drop callers that gave up, or whose deadline passed, while waiting in the queue
+        dispatched = time.monotonic()
+        live = []
+        for item in items:
+            QUEUE_WAIT_SECONDS.observe(dispatched - item.enqueued)
+            if not item.future.set_running_or_notify_cancel():
+                continue
+            if item.deadline is not None and dispatched > item.deadline:
+                with self._cond:
+                    self._shed("expired")
+                item.future.set_exception(DeadlineExceeded("Deadline passed while queued"))
+                continue
+            live.append(item)
+        if not live:
+            return
+
+        try:
+            outputs = self.batch_fn([item.text for item in live], src_lang, tgt_lang, **dict(options))
+            if len(outputs) != len(live):
+                raise RuntimeError(f"batch_fn returned {len(outputs)} outputs for {len(live)} inputs")
+        except Exception as e:
+            for item in live:
+                item.future.set_exception(e)
+            return
+
+        for item, output in zip(live, outputs):
+            item.future.set_result(output)
+
+
+def _total(stat):
+    return sum(batcher.stats()[stat] for batcher in list(_batchers))
+
+
+REGISTRY.gauge_callback("translator_queue_depth", "Requests waiting for a batch", lambda: _total("depth"))
+REGISTRY.gauge_callback("translator_queue_projected_wait_ms", "Projected queue wait of the busiest batcher",
+                        lambda: max([batcher.projected_wait_ms() for batcher in list(_batchers)], default=0.0))
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Reproducible offline latency/throughput benchmark for the translation path
+
+Builds tiny randomly-initialized T5 and M2M100 models plus a character-level
+tokenizer locally (no network access), then sweeps input length, batch size,
+beam count, language pair and thread count through the real engine code.
+Every run writes machine-readable JSON; ``compare`` flags regressions between
+two runs. Peak memory is measured per case on Linux (the kernel's peak RSS
+counter is reset before each case); elsewhere it is reported as null.
+
+    python benchmark.py run --output bench.json
+    python benchmark.py compare baseline.json bench.json --threshold 0.10
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import sys
+import time
+
+from translation_cache import TranslationCache
+from translation_engine import LANGUAGE_CODES, M2M100Engine, T5Engine
+
+SEED = 1234
+LANG_TOKENS = [f"__{code}__" for code in LANGUAGE_CODES.values()]
+SPECIAL_TOKENS = ["<pad>", "</s>", "<unk>"]
+WORDS = ["hello", "world", "good", "morning", "thank", "you", "very", "much", "for", "your",
+         "help", "how", "are", "today", "great", "day", "the", "translation", "model", "works"]
+
+
+def build_tokenizer():
+    """Character-level fast tokenizer built in memory"""
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast
+
+    symbols = SPECIAL_TOKENS + LANG_TOKENS + list(string.ascii_letters + string.digits + string.punctuation)
+    vocab = {symbol: i for i, symbol in enumerate(symbols)}
+    tokenizer = Tokenizer(models.BPE(vocab=vocab, merges=[], unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.add_special_tokens(SPECIAL_TOKENS + LANG_TOKENS)
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, pad_token="<pad>", eos_token="</s>", unk_token="<unk>"
+    )
+
+
+class TinyT5Engine(T5Engine):
+    """T5Engine with a tiny random T5 instead of the downloaded checkpoint"""
+
+    model_name = "tiny-random-t5"
+
+    def _load(self):
+        import torch
+        from transformers import T5Config, T5ForConditionalGeneration
+
+        tokenizer = build_tokenizer()
+        torch.manual_seed(SEED)
+        config = T5Config(
+            vocab_size=len(tokenizer), d_model=64, d_kv=16, d_ff=128, num_layers=2,
+            num_decoder_layers=2, num_heads=4, pad_token_id=tokenizer.pad_token_id,
+            eos_token_id=tokenizer.eos_token_id, decoder_start_token_id=tokenizer.pad_token_id,
+        )
+        return tokenizer, self.load_model(lambda: T5ForConditionalGeneration(config), config, revision=f"seed{SEED}")
+
+
+class TinyM2M100Engine(M2M100Engine):
+    """M2M100Engine with a tiny random M2M100 instead of the downloaded checkpoint"""
+
+    model_name = "tiny-random-m2m100"
+
+    def _load(self):
+        import torch
+        from transformers import M2M100Config, M2M100ForConditionalGeneration
+
+        tokenizer = build_tokenizer()
+        torch.manual_seed(SEED)
+        config = M2M100Config(
+            vocab_size=len(tokenizer), d_model=64, encoder_layers=2, decoder_layers=2,
+            encoder_attention_heads=4, decoder_attention_heads=4, encoder_ffn_dim=128,
+            decoder_ffn_dim=128, max_position_embeddings=1024, pad_token_id=tokenizer.pad_token_id,
+            eos_token_id=tokenizer.eos_token_id, decoder_start_token_id=tokenizer.eos_token_id,
+        )
+        return tokenizer, self.load_model(lambda: M2M100ForConditionalGeneration(config), config,
+                                          revision=f"seed{SEED}")
+
+    def _prepare(self):
+        self.lang_token_ids = {
+            code: self.tokenizer.convert_tokens_to_ids(f"__{code}__") for code in LANGUAGE_CODES.values()
+        }
+
+
+BENCH_ENGINES = {"t5": TinyT5Engine, "m2m100": TinyM2M100Engine}
+
+
+def make_inputs(batch_size, words, seed=SEED):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(batch_size)]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def reset_peak_rss():
+    """Start a new peak RSS measurement; False where that is not possible (anything but Linux)"""
+    # ru_maxrss never goes down, so it cannot tell one case from the next
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def rss_kib(field="VmRSS"):
+    """Current (``VmRSS``) or peak since the last reset (``VmHWM``) resident set size"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def run_case(engine, pair, words, batch_size, num_beams, threads, new_tokens, repeats):
+    import torch
+
+    torch.set_num_threads(threads)
+    engine.generation_kwargs = {
+        # Fixed output length keeps the work identical between runs
+        "max_new_tokens": new_tokens,
+        "min_new_tokens": new_tokens,
+        "num_beams": num_beams,
+        "do_sample": False,
+    }
+    texts = make_inputs(batch_size, words)
+    src_tokens = sum(engine.token_lengths(texts))
+
+    measured = reset_peak_rss()
+    start_rss = rss_kib()
+    engine.translate_batch(texts, *pair)  # warm-up, not timed
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        engine.translate_batch(texts, *pair)
+        latencies.append(time.perf_counter() - start)
+
+    total = sum(latencies)
+    peak = rss_kib("VmHWM") if measured else None
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "sentences_per_sec": batch_size * repeats / total,
+        "src_tokens_per_sec": src_tokens * repeats / total,
+        "gen_tokens_per_sec": new_tokens * batch_size * repeats / total,
+        "peak_rss_kib": peak,
+        # Memory the case itself needed on top of what was resident before it
+        "rss_delta_kib": peak - start_rss if peak is not None and start_rss is not None else None,
+    }
+
+
+def run(args):
+    import torch
+    import transformers
+
+    results = []
+    for model in args.models:
+        engine = BENCH_ENGINES[model](cache=TranslationCache(path=None))
+        engine.load()
+        pairs = [tuple(pair.split("-")) for pair in args.pairs]
+        pairs = [pair for pair in pairs if engine.supports(*pair)]
+        for pair in pairs:
+            for words in args.lengths:
+                for batch_size in args.batch_sizes:
+                    for num_beams in args.beams:
+                        for threads in args.threads:
+                            case = {
+                                "model": model,
+                                "pair": "-".join(pair),
+                                "words": words,
+                                "batch_size": batch_size,
+                                "num_beams": num_beams,
+                                "threads": threads,
+                            }
+                            metrics = run_case(engine, pair, words, batch_size, num_beams,
+                                               threads, args.new_tokens, args.repeats)
+                            results.append(dict(case, **metrics))
+                            print(f"⏱️ {_case_label(case)}: p50 {metrics['p50_ms']:.1f}ms · "
+                                  f"{metrics['sentences_per_sec']:.1f} sent/s")
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "transformers": transformers.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": SEED,
+            "repeats": args.repeats,
+            "new_tokens": args.new_tokens,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Wrote {len(results)} results to {args.output}")
+    return 0
+
+
+CASE_KEYS = ("model", "pair", "words", "batch_size", "num_beams", "threads")
+
+
+def _case_label(case):
+    return " ".join(f"{key}={case[key]}" for key in CASE_KEYS)
+
+
+def compare(baseline, candidate, threshold=0.10):
+    """Regressions of ``candidate`` against ``baseline`` (both report dicts).
+
+    A case regresses when its p50/p95 latency grows, or its throughput drops,
+    by more than ``threshold`` (a fraction).
+    """
+    base = {tuple(r[key] for key in CASE_KEYS): r for r in baseline["results"]}
+    regressions = []
+    for result in candidate["results"]:
+        before = base.get(tuple(result[key] for key in CASE_KEYS))
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if result[metric] > before[metric] * (1 + threshold):
+                regressions.append((result, metric, before[metric], result[metric]))
+        for metric in ("sentences_per_sec", "src_tokens_per_sec"):
+            if result[metric] < before[metric] * (1 - threshold):
+                regressions.append((result, metric, before[metric], result[metric]))
+    return regressions
+
+
+def run_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    regressions = compare(baseline, candidate, args.threshold)
+    if not regressions:
+        print(f"✅ No regressions above {args.threshold:.0%}")
+        return 0
+    for result, metric, before, after in regressions:
+        change = (after - before) / before if before else float("inf")
+        print(f"⚠️ {_case_label(result)}: {metric} {before:.2f} → {after:.2f} ({change:+.1%})")
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline translation benchmark with tiny random models")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the sweep and write JSON results")
+    run_parser.add_argument("--output", default="bench.json")
+    run_parser.add_argument("--models", nargs="+", default=["t5", "m2m100"], choices=sorted(BENCH_ENGINES))
+    run_parser.add_argument("--pairs", nargs="+", default=["en-fr", "en-de"], help="e.g. en-fr en-hi")
+    run_parser.add_argument("--lengths", nargs="+", type=int, default=[8, 32, 128], help="words per input")
+    run_parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    run_parser.add_argument("--beams", nargs="+", type=int, default=[1, 4])
+    run_parser.add_argument("--threads", nargs="+", type=int, default=sorted({1, os.cpu_count() or 1}))
+    run_parser.add_argument("--new-tokens", type=int, default=16, help="generated tokens per input")
+    run_parser.add_argument("--repeats", type=int, default=20)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="allowed relative slowdown before a case is flagged")
+
+    args = parser.parse_args(argv)
+    return run(args) if args.command == "run" else run_compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
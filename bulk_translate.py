@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Bulk file translation with length-bucketed batching and resumable checkpoints
+
+Records are streamed from a JSONL, CSV or TXT file a window at a time. Inside a
+window they are sorted by token length so each batch pads as little as
+possible, translated in large batches, and written back in input order. Each
+record is decoded with the options the engine's decoding policy picks for its
+length (greedy first, beam search only for outputs that fail validation), like
+online requests. After
+every window the output is flushed and a checkpoint recorded, so a killed job
+picks up where it stopped.
+
+    python bulk_translate.py corpus.jsonl out.jsonl --src en --tgt fr
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from translation_engine import ENGINES, get_engine
+from translator import is_valid_translation
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_WINDOW = 1024
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext in (".csv", ".tsv"):
+        return "csv"
+    return "txt"
+
+
+def read_records(path, fmt, field="text"):
+    """Yield ``(record, text)`` one at a time without loading the whole file"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record, str(record.get(field, ""))
+        elif fmt == "csv":
+            delimiter = "\t" if path.lower().endswith(".tsv") else ","
+            for record in csv.DictReader(f, delimiter=delimiter):
+                yield record, record.get(field) or ""
+        else:
+            for line in f:
+                text = line.rstrip("\r\n")
+                yield text, text
+
+
+class RecordWriter:
+    """Append translated records in the same format as the input"""
+
+    def __init__(self, f, fmt, path, output_field="translation"):
+        self.f = f
+        self.fmt = fmt
+        self.output_field = output_field
+        self.delimiter = "\t" if path.lower().endswith(".tsv") else ","
+        self._csv = None
+
+    def write(self, record, translation):
+        if self.fmt == "jsonl":
+            record = dict(record, **{self.output_field: translation})
+            self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        elif self.fmt == "csv":
+            if self._csv is None:
+                fieldnames = list(record) + [self.output_field]
+                self._csv = csv.DictWriter(self.f, fieldnames=fieldnames, delimiter=self.delimiter)
+                if self.f.tell() == 0:
+                    self._csv.writeheader()
+            self._csv.writerow(dict(record, **{self.output_field: translation}))
+        else:
+            self.f.write(" ".join(translation.splitlines()) + "\n")
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    # Write-then-rename so a kill mid-write never leaves a corrupt checkpoint
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def translate_window(engine, texts, src_lang, tgt_lang, batch_size):
+    """Translate one window, bucketing by token length; returns outputs and source token count"""
+    outputs = list(texts)
+    lengths = engine.token_lengths(texts)
+
+    # Records with the same decoding options share batches; the policy rounds
+    # output budgets to powers of two, so a window splits into few groups
+    groups = {}
+    for i, text in enumerate(texts):
+        if not text.strip():
+            continue
+        options, retry_options = engine.policy.choose(lengths[i], src_lang, tgt_lang)
+        key = (_frozen(options), _frozen(retry_options))
+        groups.setdefault(key, []).append(i)
+
+    for (options, retry_options), indices in groups.items():
+        results = _decode(engine, texts, lengths, indices, src_lang, tgt_lang, dict(options), batch_size)
+        if retry_options is not None:
+            rejected = [i for i in indices if not is_valid_translation(results[i], texts[i])]
+            results.update(_decode(engine, texts, lengths, rejected, src_lang, tgt_lang,
+                                   dict(retry_options), batch_size))
+        for i, output in results.items():
+            outputs[i] = output
+
+    return outputs, sum(lengths)
+
+
+def _frozen(options):
+    return tuple(sorted(options.items())) if options is not None else None
+
+
+def _decode(engine, texts, lengths, indices, src_lang, tgt_lang, options, batch_size):
+    """Translations of ``texts[indices]`` with one set of options, from the cache where possible"""
+    results = {}
+    pending = []
+    for i in indices:
+        cached = engine.cache.get(engine.cache_key(texts[i], src_lang, tgt_lang, **options))
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    # Similar lengths side by side -> far less padding per batch
+    pending.sort(key=lambda i: lengths[i])
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        translated = engine.translate_batch([texts[i] for i in batch], src_lang, tgt_lang, **options)
+        for i, output in zip(batch, translated):
+            results[i] = output
+            engine.cache.put(engine.cache_key(texts[i], src_lang, tgt_lang, **options), output)
+    return results
+
+
+def translate_file(input_path, output_path, src_lang, tgt_lang, engine="m2m100", fmt=None,
+                   field="text", output_field="translation", batch_size=DEFAULT_BATCH_SIZE,
+                   window=DEFAULT_WINDOW, checkpoint_path=None, resume=True, progress=print):
+    """Translate a whole file, resuming from ``checkpoint_path`` when possible.
+
+    Returns a summary dict with record/token counts and throughput.
+    """
+    if isinstance(engine, str):
+        engine = get_engine(engine)
+    fmt = fmt or detect_format(input_path)
+    checkpoint_path = checkpoint_path or output_path + ".ckpt.json"
+
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state and (state.get("input") != os.path.abspath(input_path) or state.get("pair") != [src_lang, tgt_lang]):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to a different job; remove it or pass resume=False")
+    if not state:
+        state = {
+            "input": os.path.abspath(input_path),
+            "pair": [src_lang, tgt_lang],
+            "records_done": 0,
+            "output_bytes": 0,
+            "tokens_done": 0,
+        }
+    skip = state["records_done"]
+    if skip:
+        progress(f"♻️ Resuming after {skip} records")
+
+    engine.load()
+    started = time.perf_counter()
+    records_this_run = 0
+    tokens_this_run = 0
+
+    mode = "r+" if state["output_bytes"] and os.path.exists(output_path) else "w"
+    with open(output_path, mode, encoding="utf-8", newline="") as out:
+        # Drop anything written after the last checkpoint
+        out.seek(state["output_bytes"])
+        out.truncate()
+        writer = RecordWriter(out, fmt, output_path, output_field)
+
+        buffer = []
+        records = read_records(input_path, fmt, field)
+        for index, item in enumerate(records):
+            if index < skip:
+                continue
+            buffer.append(item)
+            if len(buffer) < window:
+                continue
+            tokens_this_run += _flush(engine, buffer, writer, out, state, checkpoint_path, src_lang, tgt_lang, batch_size)
+            records_this_run += len(buffer)
+            buffer = []
+            _report(progress, state, records_this_run, tokens_this_run, started)
+
+        if buffer:
+            tokens_this_run += _flush(engine, buffer, writer, out, state, checkpoint_path, src_lang, tgt_lang, batch_size)
+            records_this_run += len(buffer)
+            _report(progress, state, records_this_run, tokens_this_run, started)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "records": state["records_done"],
+        "records_this_run": records_this_run,
+        "tokens_this_run": tokens_this_run,
+        "seconds": elapsed,
+        "segments_per_sec": records_this_run / elapsed if elapsed else 0.0,
+        "tokens_per_sec": tokens_this_run / elapsed if elapsed else 0.0,
+    }
+
+
+def _flush(engine, buffer, writer, out, state, checkpoint_path, src_lang, tgt_lang, batch_size):
+    outputs, tokens = translate_window(engine, [text for _, text in buffer], src_lang, tgt_lang, batch_size)
+    for (record, _), translation in zip(buffer, outputs):
+        writer.write(record, translation)
+    out.flush()
+    os.fsync(out.fileno())
+
+    state["records_done"] += len(buffer)
+    state["tokens_done"] += tokens
+    state["output_bytes"] = out.tell()
+    save_checkpoint(checkpoint_path, state)
+    return tokens
+
+
+def _report(progress, state, records, tokens, started):
+    elapsed = time.perf_counter() - started
+    if not elapsed or not records:
+        return
+    progress(
+        f"📊 {state['records_done']} records done · "
+        f"{records / elapsed:.1f} segments/s · {tokens / elapsed:.0f} tokens/s"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate a JSONL/CSV/TXT corpus in length-bucketed batches")
+    parser.add_argument("input", help="input file (.jsonl, .csv/.tsv or plain text, one segment per line)")
+    parser.add_argument("output", help="output file, written in the same format as the input")
+    parser.add_argument("--src", required=True, help="source language code, e.g. en")
+    parser.add_argument("--tgt", required=True, help="target language code, e.g. fr")
+    parser.add_argument("--engine", default="m2m100", choices=sorted(ENGINES))
+    parser.add_argument("--format", choices=["jsonl", "csv", "txt"], help="override format detection")
+    parser.add_argument("--field", default="text", help="JSONL key / CSV column holding the source text")
+    parser.add_argument("--output-field", default="translation", help="JSONL key / CSV column for the result")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help="records read and length-sorted together between checkpoints")
+    parser.add_argument("--checkpoint", help="checkpoint path (default: OUTPUT.ckpt.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args(argv)
+
+    summary = translate_file(
+        args.input, args.output, args.src, args.tgt,
+        engine=args.engine, fmt=args.format, field=args.field, output_field=args.output_field,
+        batch_size=args.batch_size, window=args.window,
+        checkpoint_path=args.checkpoint, resume=not args.restart,
+    )
+    print(f"✅ Translated {summary['records_this_run']} records in {summary['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Adaptive decoding policy
+
+Chooses ``max_new_tokens`` from the source length and a per-pair length ratio,
+and the beam width from a per-request latency budget or the server-wide
+quality tier. With greedy-first enabled, requests decode greedily and only
+retry with beams when the output fails validation, so most short requests
+cost a fraction of a fixed 4-beam search.
+"""
+
+import math
+import os
+
+# Server-wide defaults (overridable through the environment)
+QUALITY_TIER = os.environ.get("TRANSLATOR_QUALITY_TIER", "quality")
+GREEDY_FIRST = os.environ.get("TRANSLATOR_GREEDY_FIRST", "1") not in ("0", "false", "no")
+# Rough CPU cost of one decoder step per beam, used against latency budgets
+MS_PER_TOKEN_BEAM = float(os.environ.get("TRANSLATOR_MS_PER_TOKEN_BEAM", "2.0"))
+
+QUALITY_TIERS = {"fast": 1, "balanced": 2, "quality": 4}
+
+# Target tokens per source token; anything not listed uses DEFAULT_LENGTH_RATIO
+LENGTH_RATIOS = {
+    ("en", "fr"): 1.4,
+    ("en", "es"): 1.4,
+    ("en", "de"): 1.4,
+    ("en", "hi"): 1.8,
+    ("en", "ru"): 1.5,
+    ("en", "zh"): 1.2,
+    ("en", "ja"): 1.5,
+}
+DEFAULT_LENGTH_RATIO = 1.6
+LENGTH_SLACK = 8
+MAX_NEW_TOKENS = 512
+
+
+class DecodingPolicy:
+    """Turns (source length, pair, latency budget) into generate() options"""
+
+    def __init__(self, tier=QUALITY_TIER, greedy_first=GREEDY_FIRST, length_ratios=None,
+                 ms_per_token_beam=MS_PER_TOKEN_BEAM):
+        if tier not in QUALITY_TIERS:
+            raise ValueError(f"Unknown quality tier {tier!r}; expected one of {sorted(QUALITY_TIERS)}")
+        self.tier = tier
+        self.greedy_first = greedy_first
+        self.length_ratios = dict(LENGTH_RATIOS, **(length_ratios or {}))
+        self.ms_per_token_beam = ms_per_token_beam
+
+    def max_new_tokens(self, src_tokens, src_lang, tgt_lang):
+        """Output budget rounded up to a power of two, so similar requests still batch together"""
+        ratio = self.length_ratios.get((src_lang, tgt_lang), DEFAULT_LENGTH_RATIO)
+        needed = math.ceil(src_tokens * ratio) + LENGTH_SLACK
+        return min(MAX_NEW_TOKENS, 1 << max(needed - 1, 1).bit_length())
+
+    def estimate_ms(self, src_tokens, max_new_tokens, num_beams=1):
+        """Rough CPU time of one request, used for latency budgets and scheduling"""
+        return (src_tokens + max_new_tokens) * num_beams * self.ms_per_token_beam
+
+    def num_beams(self, src_tokens, max_new_tokens, latency_budget_ms=None):
+        """Tier beam width, narrowed until the estimated cost fits the latency budget"""
+        beams = QUALITY_TIERS[self.tier]
+        if latency_budget_ms is None:
+            return beams
+        while beams > 1 and self.estimate_ms(src_tokens, max_new_tokens, beams) > latency_budget_ms:
+            beams //= 2
+        return beams
+
+    def choose(self, src_tokens, src_lang, tgt_lang, latency_budget_ms=None):
+        """Return ``(options, retry_options)``; retry_options is None when no retry applies"""
+        max_new_tokens = self.max_new_tokens(src_tokens, src_lang, tgt_lang)
+        beams = self.num_beams(src_tokens, max_new_tokens, latency_budget_ms)
+        options = {"max_new_tokens": max_new_tokens, "num_beams": beams}
+        if self.greedy_first and beams > 1:
+            return dict(options, num_beams=1), options
+        return options, None
+
+
+_policy = None
+
+
+def get_policy():
+    """Process-wide policy built from the environment defaults"""
+    global _policy
+    if _policy is None:
+        _policy = DecodingPolicy()
+    return _policy
@@ -0,0 +1,258 @@
+"""
+CPU inference backends for the translation engines
+
+``eager`` runs the checkpoint as-is in fp32, ``int8`` swaps every
+``nn.Linear`` for a dynamically quantized int8 one, and ``onnx`` exports the
+encoder/decoder graphs and runs them with ONNX Runtime (through optimum).
+Converted models are cached on disk per checkpoint (its commit hash and
+config), so only the first start-up pays for the conversion.
+``parity_report`` measures how far each backend drifts from fp32 and how
+much faster it is, so the trade-off is made knowingly:
+
+    python inference_backends.py parity --model t5 --backends eager int8 onnx
+    python inference_backends.py parity --tiny --model m2m100
+"""
+
+import argparse
+import difflib
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+# Server-wide default backend and artifact location (overridable through the environment)
+BACKEND = os.environ.get("TRANSLATOR_BACKEND", "eager")
+BACKEND_CACHE_DIR = os.environ.get(
+    "TRANSLATOR_BACKEND_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "translator", "backends")
+)
+
+PARITY_TEXTS = [
+    "Hello World",
+    "Good morning! How are you today?",
+    "Thank you very much for your help!",
+    "The meeting has been moved to Thursday afternoon because the room was booked.",
+]
+
+
+def checkpoint_fingerprint(config, revision=None):
+    """Short hash of a checkpoint's revision and config; a new checkpoint under the same name gets new artifacts"""
+    # transformers records the hub commit a config was downloaded from
+    revision = revision or getattr(config, "_commit_hash", None) or ""
+    digest = hashlib.sha256(f"{revision}\n{config.to_json_string()}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def artifact_dir(model_name, backend_name, cache_dir=None, fingerprint=None):
+    """Directory holding the converted ``model_name`` (checkpoint ``fingerprint``) for one backend"""
+    safe_name = re.sub(r"[^A-Za-z0-9._-]+", "--", model_name)
+    if fingerprint:
+        backend_name = f"{backend_name}-{fingerprint}"
+    return os.path.join(cache_dir or BACKEND_CACHE_DIR, safe_name, backend_name)
+
+
+class EagerBackend:
+    """The checkpoint as loaded by transformers: fp32, eager PyTorch"""
+
+    name = "eager"
+
+    def load(self, load_eager, directory, build_empty=None):
+        return load_eager()
+
+
+class Int8Backend:
+    """Dynamic int8 quantization of every linear layer (weights int8, activations quantized per batch).
+
+    The quantized weights are saved as a state_dict. Later starts build the
+    quantized module structure from ``build_empty()`` (the architecture
+    without the checkpoint's weights) and read the state_dict back with
+    ``weights_only=True``, so they neither load fp32 weights nor quantize, and
+    a tampered cache file cannot run code.
+    """
+
+    name = "int8"
+
+    def load(self, load_eager, directory, build_empty=None):
+        import torch
+
+        # Packed int8 parameters are only guaranteed to reload with the torch that wrote them
+        path = os.path.join(directory, f"state_dict-torch{torch.__version__}.pt")
+        if build_empty is not None and os.path.exists(path):
+            model = _int8_skeleton(build_empty())
+            model.load_state_dict(torch.load(path, weights_only=True))
+            return model.eval()
+        model = torch.ao.quantization.quantize_dynamic(load_eager().eval(), {torch.nn.Linear}, dtype=torch.qint8)
+        os.makedirs(directory, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.tmp"
+        torch.save(model.state_dict(), partial)
+        os.replace(partial, path)
+        return model
+
+
+def _int8_skeleton(model):
+    """Swap every ``nn.Linear`` for an empty dynamic int8 one, as ``quantize_dynamic`` would"""
+    import torch
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicLinear
+
+    for name, child in model.named_children():
+        if type(child) is torch.nn.Linear:
+            setattr(model, name, DynamicLinear(child.in_features, child.out_features,
+                                               bias_=child.bias is not None, dtype=torch.qint8))
+        else:
+            _int8_skeleton(child)
+    return model
+
+
+class OnnxBackend:
+    """Encoder/decoder exported to ONNX and run by ONNX Runtime (needs ``optimum[onnxruntime]``)"""
+
+    name = "onnx"
+
+    def load(self, load_eager, directory, build_empty=None):
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError as e:
+            raise RuntimeError("The onnx backend needs optimum[onnxruntime]: pip install 'optimum[onnxruntime]'") from e
+
+        if os.path.exists(os.path.join(directory, "config.json")):
+            return ORTModelForSeq2SeqLM.from_pretrained(directory)
+        # Export from the loaded checkpoint, so local (e.g. benchmark) models work too
+        with tempfile.TemporaryDirectory() as checkpoint:
+            load_eager().save_pretrained(checkpoint)
+            model = ORTModelForSeq2SeqLM.from_pretrained(checkpoint, export=True)
+        os.makedirs(os.path.dirname(directory), exist_ok=True)
+        staging = tempfile.mkdtemp(dir=os.path.dirname(directory))
+        model.save_pretrained(staging)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Another process finished the same export first
+            shutil.rmtree(staging, ignore_errors=True)
+        return model
+
+
+BACKENDS = {backend.name: backend for backend in (EagerBackend, Int8Backend, OnnxBackend)}
+
+
+def get_backend(name=None):
+    """Backend instance by name (``TRANSLATOR_BACKEND`` by default)"""
+    name = name or BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+# -- parity --------------------------------------------------------------
+
+
+def _similarity(a, b):
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def _logits(engine, texts, src_lang, tgt_lang, decoder_input_ids):
+    """Teacher-forced logits of ``engine`` for the given decoder inputs"""
+    import torch
+
+    encoded, _ = engine._model_inputs(texts, src_lang, tgt_lang)
+    with torch.inference_mode():
+        logits = engine.model(**encoded, decoder_input_ids=decoder_input_ids).logits
+    return torch.as_tensor(logits, dtype=torch.float32)
+
+
+def _reference_tokens(engine, texts, src_lang, tgt_lang, options):
+    import torch
+
+    encoded, generate_kwargs = engine._model_inputs(texts, src_lang, tgt_lang)
+    with torch.inference_mode():
+        return engine.model.generate(**encoded, **engine.generation_params(options), **generate_kwargs)
+
+
+def _timed_translate(engine, texts, src_lang, tgt_lang, options, repeats):
+    engine.translate_batch(texts, src_lang, tgt_lang, **options)  # warm-up, not timed
+    start = time.perf_counter()
+    for _ in range(repeats):
+        outputs = engine.translate_batch(texts, src_lang, tgt_lang, **options)
+    return outputs, (time.perf_counter() - start) / repeats
+
+
+def parity_report(make_engine, backends, pair, texts=PARITY_TEXTS, repeats=3, max_new_tokens=32):
+    """Compare every backend in ``backends`` with eager fp32 on the same texts.
+
+    ``make_engine(backend_name)`` returns a fresh engine. Per backend the
+    report has the greedy outputs' exact-match rate and mean character
+    similarity against fp32, the largest and mean absolute logit difference
+    when decoding fp32's output tokens, the load time and the speedup.
+    """
+    src_lang, tgt_lang = pair
+    options = {"max_new_tokens": max_new_tokens, "num_beams": 1}
+
+    reference = make_engine("eager").load()
+    ref_outputs, ref_seconds = _timed_translate(reference, texts, src_lang, tgt_lang, options, repeats)
+    ref_tokens = _reference_tokens(reference, texts, src_lang, tgt_lang, options)
+    ref_logits = _logits(reference, texts, src_lang, tgt_lang, ref_tokens[:, :-1])
+
+    report = {}
+    for name in backends:
+        engine = make_engine(name).load()
+        outputs, seconds = _timed_translate(engine, texts, src_lang, tgt_lang, options, repeats)
+        diff = (_logits(engine, texts, src_lang, tgt_lang, ref_tokens[:, :-1]) - ref_logits).abs()
+        report[name] = {
+            "exact_match": sum(a == b for a, b in zip(outputs, ref_outputs)) / len(texts),
+            "char_similarity": sum(_similarity(a, b) for a, b in zip(outputs, ref_outputs)) / len(texts),
+            "max_abs_logit_diff": diff.max().item(),
+            "mean_abs_logit_diff": diff.mean().item(),
+            "load_seconds": engine.load_seconds,
+            "batch_ms": seconds * 1000,
+            "speedup": ref_seconds / seconds if seconds else None,
+            "memory_mb": engine.memory_bytes() / 2 ** 20,
+        }
+    return report
+
+
+def print_parity_report(report):
+    print("⚖️ Backend parity against eager fp32")
+    for name, row in report.items():
+        print(f"   {name}: {row['speedup']:.2f}x, {row['batch_ms']:.1f}ms/batch · "
+              f"exact {row['exact_match']:.0%} · similarity {row['char_similarity']:.3f} · "
+              f"logit diff max {row['max_abs_logit_diff']:.4f} / mean {row['mean_abs_logit_diff']:.4f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translation inference backends")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parity_parser = commands.add_parser("parity", help="compare backends with eager fp32")
+    parity_parser.add_argument("--model", default="t5", choices=["t5", "m2m100"])
+    parity_parser.add_argument("--backends", nargs="+", default=sorted(BACKENDS), choices=sorted(BACKENDS))
+    parity_parser.add_argument("--pair", default="en-fr", help="e.g. en-de")
+    parity_parser.add_argument("--texts-file", help="one source text per line (default: built-in samples)")
+    parity_parser.add_argument("--repeats", type=int, default=3)
+    parity_parser.add_argument("--tiny", action="store_true", help="tiny random models (no download)")
+    parity_parser.add_argument("--cache-dir", default=None, help="where converted models are kept")
+
+    args = parser.parse_args(argv)
+
+    from translation_cache import TranslationCache
+
+    if args.tiny:
+        from benchmark import BENCH_ENGINES as engines
+    else:
+        from translation_engine import ENGINES as engines
+
+    def make_engine(backend):
+        return engines[args.model](cache=TranslationCache(path=None), backend=backend,
+                                   backend_cache_dir=args.cache_dir)
+
+    texts = PARITY_TEXTS
+    if args.texts_file:
+        with open(args.texts_file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    pair = tuple(args.pair.split("-"))
+    print_parity_report(parity_report(make_engine, args.backends, pair, texts, repeats=args.repeats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Cheap in-process language detection for the "auto" source language
+
+Scripts with a single language among ours (Devanagari, Cyrillic, kana, Han)
+are decided by counting characters. Latin-script text is scored against
+character 2–4-gram profiles built once from ``language_samples.json``, using
+at most the first ``MAX_CHARS`` characters, so a call costs microseconds and
+runs before anything is tokenized. Ambiguous input returns None and the
+caller keeps its own default.
+
+    python language_detection.py bench    # accuracy and speed on held-out sentences
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import unicodedata
+from collections import Counter
+
+SAMPLES_PATH = os.environ.get(
+    "TRANSLATOR_LANGUAGE_SAMPLES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "language_samples.json"),
+)
+
+AUTO = "auto"
+MAX_CHARS = 200
+NGRAM_SIZES = (2, 3, 4)
+# Average per-n-gram log-likelihood lead the winner needs over the runner-up
+MIN_MARGIN = 0.05
+MIN_LETTERS = 2
+# Overriding a source the user picked takes a sentence, not a loanword like
+# "Computer" or "Pizza": at least this many Latin letters and this margin
+CONFIDENT_LETTERS = 24
+CONFIDENT_MARGIN = 0.3
+
+# Unicode ranges that identify a language on their own (Han is shared by zh and ja)
+_SCRIPTS = (
+    ("hi", 0x0900, 0x097F),
+    ("ru", 0x0400, 0x04FF),
+    ("ja", 0x3040, 0x30FF),
+    ("zh", 0x4E00, 0x9FFF),
+)
+_SCRIPT_LANGUAGES = {lang for lang, _, _ in _SCRIPTS}
+
+
+def _script_of(char):
+    code = ord(char)
+    if code < 0x0400:
+        return "latin"
+    for lang, start, end in _SCRIPTS:
+        if start <= code <= end:
+            return lang
+    return "latin"
+
+
+def _clean(text):
+    text = unicodedata.normalize("NFC", text[:MAX_CHARS]).casefold()
+    return " ".join("".join(c if c.isalpha() else " " for c in text).split())
+
+
+def ngrams(text):
+    padded = f" {text} "
+    for size in NGRAM_SIZES:
+        for i in range(len(padded) - size + 1):
+            gram = padded[i:i + size]
+            if gram.strip():
+                yield gram
+
+
+class LanguageDetector:
+    """Script counts plus add-one smoothed character n-gram log-likelihoods"""
+
+    def __init__(self, samples):
+        self.languages = sorted(samples)
+        self.profiles = {}
+        self.unseen = {}
+        vocabulary = set()
+        counts = {}
+        for lang, texts in samples.items():
+            counts[lang] = Counter(gram for text in texts for gram in ngrams(_clean(text)))
+            vocabulary.update(counts[lang])
+        for lang, counter in counts.items():
+            total = sum(counter.values()) + len(vocabulary)
+            self.profiles[lang] = {gram: math.log((count + 1) / total) for gram, count in counter.items()}
+            self.unseen[lang] = math.log(1 / total)
+
+    @classmethod
+    def load(cls, path=SAMPLES_PATH):
+        """Build profiles from the ``train`` sentences of a samples file"""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["train"])
+
+    def scores(self, text, candidates=None):
+        """Average n-gram log-likelihood per candidate language"""
+        grams = list(ngrams(_clean(text)))
+        if not grams:
+            return {}
+        scores = {}
+        for lang in candidates or self.languages:
+            profile = self.profiles.get(lang)
+            if profile is not None:
+                unseen = self.unseen[lang]
+                scores[lang] = sum([profile.get(gram, unseen) for gram in grams]) / len(grams)
+        return scores
+
+    def detect(self, text, candidates=None, min_margin=MIN_MARGIN, min_letters=MIN_LETTERS):
+        """Language code of ``text`` among ``candidates`` (default: all profiled), or None if unsure.
+
+        ``min_letters`` and ``min_margin`` only apply to Latin-script text;
+        the other scripts identify their language on their own.
+        """
+        letters = Counter(_script_of(c) for c in text[:MAX_CHARS] if c.isalpha())
+        if sum(letters.values()) < MIN_LETTERS:
+            return None
+        script = letters.most_common(1)[0][0]
+        if script == "zh" and letters["ja"]:
+            script = "ja"  # Han with any kana is Japanese
+        if script != "latin":
+            return script if candidates is None or script in candidates else None
+        if letters["latin"] < min_letters:
+            return None
+
+        latin = [lang for lang in (candidates or self.languages) if lang not in _SCRIPT_LANGUAGES]
+        ranked = sorted(self.scores(text, latin).items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < min_margin:
+            return None
+        return ranked[0][0]
+
+
+def resolve_source(text, src_lang, tgt_lang, candidates=None, default="en"):
+    """``(src_lang, same_language)`` for a request.
+
+    ``"auto"`` is replaced by the detected language (``default`` when
+    unsure). ``same_language`` is True when the text is already in
+    ``tgt_lang``, so the request can be answered without the model. A source
+    the user picked is only overridden by a confident detection: a script
+    of its own, or a sentence of ``CONFIDENT_LETTERS`` with a clear margin.
+    """
+    if src_lang == AUTO:
+        src_lang = get_detector().detect(text, candidates) or default
+        return src_lang, src_lang == tgt_lang
+    if tgt_lang is None or src_lang == tgt_lang:
+        return src_lang, src_lang == tgt_lang
+    detected = get_detector().detect(text, candidates, min_margin=CONFIDENT_MARGIN, min_letters=CONFIDENT_LETTERS)
+    return src_lang, detected == tgt_lang
+
+
+_detector = None
+
+
+def get_detector():
+    """Process-wide detector, built from SAMPLES_PATH on first use"""
+    global _detector
+    if _detector is None:
+        _detector = LanguageDetector.load()
+    return _detector
+
+
+# -- benchmark ------------------------------------------------------------
+
+
+def benchmark(detector, samples, repeats=200):
+    """Accuracy per language on held-out sentences plus mean time per call"""
+    report = {"languages": {}, "confusions": []}
+    correct = total = 0
+    for lang, texts in samples.items():
+        hits = 0
+        for text in texts:
+            detected = detector.detect(text)
+            hits += detected == lang
+            if detected != lang:
+                report["confusions"].append({"text": text, "expected": lang, "detected": detected})
+        report["languages"][lang] = hits / len(texts)
+        correct += hits
+        total += len(texts)
+    report["accuracy"] = correct / total
+
+    texts = [text for group in samples.values() for text in group]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            detector.detect(text)
+    report["us_per_call"] = (time.perf_counter() - start) / (repeats * len(texts)) * 1e6
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Character n-gram language detection")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench_parser = commands.add_parser("bench", help="accuracy and speed on the held-out sentences")
+    bench_parser.add_argument("--samples", default=SAMPLES_PATH)
+    bench_parser.add_argument("--repeats", type=int, default=200)
+    bench_parser.add_argument("--output", help="write the report as JSON")
+    detect_parser = commands.add_parser("detect", help="detect the language of each argument")
+    detect_parser.add_argument("texts", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "detect":
+        for text in args.texts:
+            print(f"{get_detector().detect(text) or '?'}\t{text}")
+        return 0
+
+    with open(args.samples, encoding="utf-8") as f:
+        samples = json.load(f)
+    start = time.perf_counter()
+    detector = LanguageDetector(samples["train"])
+    build_ms = (time.perf_counter() - start) * 1000
+    report = benchmark(detector, samples["eval"], args.repeats)
+    report["build_ms"] = build_ms
+
+    print(f"🔍 Language detection: {report['accuracy']:.1%} accurate, "
+          f"{report['us_per_call']:.1f}µs per call (profiles built in {build_ms:.1f}ms)")
+    for lang, accuracy in report["languages"].items():
+        print(f"   {lang}: {accuracy:.0%}")
+    for miss in report["confusions"]:
+        print(f"   ⚠️ {miss['expected']} → {miss['detected']}: {miss['text']!r}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
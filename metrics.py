@@ -0,0 +1,218 @@
+"""
+Hot-path instrumentation with a Prometheus-style text endpoint
+
+Counters and histograms are cheap enough to update on every request. They can
+be scraped from ``/metrics`` (see ``start_metrics_server``) or forwarded to any
+other backend through ``REGISTRY.add_sink``.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Port for the /metrics endpoint; 0 leaves it off
+METRICS_PORT = int(os.environ.get("TRANSLATOR_METRICS_PORT", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _label_key(labels):
+    # Label values are text in the exposition format; keeps the series sortable (e.g. engine=None)
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry, name, help_text):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry._emit(self.name, labels, amount)
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, buckets):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+        self.registry._emit(self.name, labels, value)
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters/histograms plus optional sinks that see every update"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._gauges = {}
+        self._sinks = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        return self._get_or_create(name, lambda: Counter(self, name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._get_or_create(name, lambda: Histogram(self, name, help_text, buckets))
+
+    def gauge_callback(self, name, help_text, fn):
+        """Gauge read from ``fn()`` at render time (e.g. queue depth, cache size)"""
+        with self._lock:
+            self._gauges[name] = (help_text, fn)
+
+    def _get_or_create(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def add_sink(self, sink):
+        """Forward every update as ``sink(name, labels, value)`` (StatsD, logs, ...)"""
+        self._sinks.append(sink)
+
+    def _emit(self, name, labels, value):
+        for sink in self._sinks:
+            sink(name, labels, value)
+
+    def capture(self):
+        """Queue every later update in the returned deque instead of forwarding it to the sinks.
+
+        An inference worker calls this so the process serving ``/metrics``
+        (and owning the sinks) can ``replay`` what the worker observed.
+        """
+        events = deque()
+        self._sinks = [lambda name, labels, value: events.append((name, labels, value))]
+        return events
+
+    def replay(self, events):
+        """Apply ``(name, labels, value)`` updates captured in another process"""
+        for name, labels, value in events:
+            metric = self._metrics.get(name)
+            if isinstance(metric, Histogram):
+                metric.observe(value, **labels)
+            elif metric is not None:
+                metric.inc(value, **labels)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            gauges = list(self._gauges.items())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for name, (help_text, fn) in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {fn()}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+RESULTS = REGISTRY.counter("translator_results_total", "Translations served, by result source")
+STAGE_SECONDS = REGISTRY.histogram("translator_stage_seconds", "Time spent per pipeline stage")
+INPUT_TOKENS = REGISTRY.histogram("translator_input_tokens", "Source tokens per segment", TOKEN_BUCKETS)
+OUTPUT_TOKENS = REGISTRY.histogram("translator_output_tokens", "Generated tokens per segment", TOKEN_BUCKETS)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram("translator_queue_wait_seconds", "Time requests wait for a batch")
+SHED_REQUESTS = REGISTRY.counter("translator_shed_requests_total", "Requests refused or dropped by the scheduler, by reason")
+TIME_TO_FIRST_TOKEN = REGISTRY.histogram("translator_time_to_first_token_seconds", "Time until streamed output shows its first text")
+MEMORY_LOOKUPS = REGISTRY.counter("translator_memory_lookups_total", "Translation memory lookups after a cache miss, by result")
+DECODE_RETRIES = REGISTRY.counter("translator_decode_retries_total", "Greedy outputs retried with beam search")
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of a ``with`` block under ``translator_stage_seconds``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are frequent; keep them out of the console
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """Serve ``/metrics`` from a background thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,343 @@
+"""
+Model registry: route each language pair to the cheapest capable model
+
+Every registered engine has a capability table (the pairs it should serve)
+and a cost. Pairs no model serves directly are pivoted through English
+(X→EN→Y), each leg on its own cheapest model. Models load lazily on first use
+under a shared memory budget; when a load would exceed the budget, the least
+recently used idle model is unloaded first.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from translation_engine import get_engine
+
+# Memory budget for loaded models in MiB; 0 means unlimited
+MODEL_MEMORY_MB = int(os.environ.get("TRANSLATOR_MODEL_MEMORY_MB", "0"))
+
+# flan-t5-small is only routed the pairs it translates reasonably well
+T5_PAIRS = [("en", "fr"), ("en", "de"), ("en", "es")]
+
+# Intermediate language for pairs without a direct model
+PIVOT_LANGUAGE = "en"
+
+logger = logging.getLogger("translator")
+
+
+class ModelRegistry:
+    """Named engines with capability tables, LRU eviction and load timings"""
+
+    def __init__(self, memory_budget_mb=MODEL_MEMORY_MB):
+        self.memory_budget_bytes = memory_budget_mb * 2 ** 20 if memory_budget_mb else None
+        self._models = {}
+        # Loaded model names, least recently used first
+        self._lru = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.loads = []
+
+    def register(self, name, engine, pairs=None, cost=None):
+        """Add ``engine`` under ``name``; ``pairs`` defaults to everything it supports.
+
+        ``cost`` orders capable models when routing (lower wins) and defaults
+        to the engine's memory estimate. An engine belongs to one registry
+        only, since it reports its loads to that registry's budget and LRU.
+        """
+        pairs = set(pairs if pairs is not None else engine.supported_pairs())
+        unsupported = [pair for pair in pairs if not engine.supports(*pair)]
+        if unsupported:
+            raise ValueError(f"{name} cannot serve {sorted(unsupported)}")
+        if engine.registry is not None and engine.registry is not self:
+            raise ValueError(f"{name} ({engine.model_name}) is already registered with another ModelRegistry")
+        engine.registry = self
+        with self._lock:
+            self._models[name] = {
+                "engine": engine,
+                "pairs": pairs,
+                "cost": cost if cost is not None else engine.memory_mb or 0,
+            }
+            if engine.is_loaded:
+                self._lru[name] = True
+        return engine
+
+    def names(self):
+        return list(self._models)
+
+    def engines(self):
+        return [entry["engine"] for entry in self._models.values()]
+
+    def supported_pairs(self):
+        return sorted({pair for entry in self._models.values() for pair in entry["pairs"]})
+
+    def route(self, src_lang, tgt_lang):
+        """Name of the cheapest model whose capability table has the pair"""
+        capable = [
+            (entry["cost"], name) for name, entry in self._models.items()
+            if (src_lang, tgt_lang) in entry["pairs"]
+        ]
+        if not capable:
+            raise ValueError(f"No registered model supports {src_lang}→{tgt_lang}")
+        return min(capable)[1]
+
+    def legs(self, src_lang, tgt_lang):
+        """``[(model name, src, tgt), ...]``: one direct hop, or two through PIVOT_LANGUAGE"""
+        try:
+            return [(self.route(src_lang, tgt_lang), src_lang, tgt_lang)]
+        except ValueError:
+            if PIVOT_LANGUAGE in (src_lang, tgt_lang):
+                raise
+        try:
+            return [
+                (self.route(src_lang, PIVOT_LANGUAGE), src_lang, PIVOT_LANGUAGE),
+                (self.route(PIVOT_LANGUAGE, tgt_lang), PIVOT_LANGUAGE, tgt_lang),
+            ]
+        except ValueError:
+            raise ValueError(f"No registered model supports {src_lang}→{tgt_lang}, "
+                             f"directly or through {PIVOT_LANGUAGE}") from None
+
+    def supports(self, src_lang, tgt_lang):
+        """True if the pair can be served, directly or pivoted"""
+        try:
+            self.legs(src_lang, tgt_lang)
+        except ValueError:
+            return False
+        return True
+
+    def engine_for(self, src_lang, tgt_lang):
+        """Engine serving the pair, marked as most recently used"""
+        name = self.route(src_lang, tgt_lang)
+        with self._lock:
+            if name in self._lru:
+                self._lru.move_to_end(name)
+        return self._models[name]["engine"]
+
+    # -- budget ----------------------------------------------------------
+
+    def _name_of(self, engine):
+        for name, entry in self._models.items():
+            if entry["engine"] is engine:
+                return name
+        return None
+
+    def resident_bytes(self):
+        with self._lock:
+            engines = [self._models[name]["engine"] for name in self._lru]
+            return sum(engine.memory_bytes() for engine in engines if engine.is_loaded)
+
+    def reserve(self, engine):
+        """Called by ``engine.load()``: unload idle LRU models until the new one fits"""
+        if self.memory_budget_bytes is None:
+            return
+        needed = engine.memory_bytes()
+        with self._lock:
+            for name in list(self._lru):
+                if self.resident_bytes() + needed <= self.memory_budget_bytes:
+                    return
+                victim = self._models[name]["engine"]
+                if victim is engine or not victim.unload():
+                    continue
+                del self._lru[name]
+                self.evictions += 1
+                logger.info("♻️ Unloaded %s to stay within the model memory budget", victim.model_name)
+            if self.resident_bytes() + needed > self.memory_budget_bytes:
+                # Nothing idle is left to unload; serving beats refusing the request
+                logger.warning("⚠️ Loading %s goes over the model memory budget", engine.model_name)
+
+    def loaded(self, engine):
+        """Called by ``engine.load()`` once the weights are in memory"""
+        with self._lock:
+            name = self._name_of(engine)
+            if name is None:
+                return
+            self._lru[name] = True
+            self._lru.move_to_end(name)
+            self.loads.append({"model": name, "seconds": engine.load_seconds})
+
+    def unload(self, name):
+        with self._lock:
+            if self._models[name]["engine"].unload():
+                self._lru.pop(name, None)
+                return True
+            return False
+
+    # -- translation -----------------------------------------------------
+
+    def _leg_engine(self, name):
+        with self._lock:
+            if name in self._lru:
+                self._lru.move_to_end(name)
+        return self._models[name]["engine"]
+
+    def translate(self, text, src_lang, tgt_lang, **kwargs):
+        """Translate directly or leg by leg; every leg goes through its engine's cache.
+
+        The English intermediate of a pivoted pair is cached like any other
+        result, so retries and other targets of the same source reuse it.
+        ``deadline_ms`` covers the whole request, not each leg.
+        """
+        deadline_ms = kwargs.pop("deadline_ms", None)
+        if deadline_ms is not None:
+            kwargs["deadline"] = time.monotonic() + deadline_ms / 1000
+        for name, leg_src, leg_tgt in self.legs(src_lang, tgt_lang):
+            text = self._leg_engine(name).translate(text, leg_src, leg_tgt, **kwargs)
+        return text
+
+    def translate_many(self, text, src_lang, tgt_langs, **kwargs):
+        """Fan out to several targets, one fan-out per routed model.
+
+        Pivoted targets share one translation into English, which is then
+        fanned out to all of them.
+        """
+        groups, pivoted = {}, []
+        for tgt_lang in tgt_langs:
+            legs = self.legs(src_lang, tgt_lang)
+            if len(legs) == 1:
+                groups.setdefault(legs[0][0], []).append(tgt_lang)
+            else:
+                pivoted.append(tgt_lang)
+        results = {}
+        for targets in groups.values():
+            engine = self.engine_for(src_lang, targets[0])
+            results.update(engine.translate_many(text, src_lang, targets, **kwargs))
+        if pivoted:
+            english = self.translate(text, src_lang, PIVOT_LANGUAGE, **kwargs)
+            results.update(self.translate_many(english, PIVOT_LANGUAGE, pivoted, **kwargs))
+        return {tgt_lang: results[tgt_lang] for tgt_lang in tgt_langs if tgt_lang in results}
+
+    def submit(self, text, src_lang, tgt_lang, latency_budget_ms=None, deadline=None):
+        """Future for one translation, submitted leg by leg.
+
+        Each leg is queued on its engine's micro-batcher as soon as the
+        previous one finishes, so concurrent requests are batched per leg
+        instead of running their hops one call at a time.
+        """
+        legs = self.legs(src_lang, tgt_lang)
+        result = Future()
+        current = [None]
+
+        def start(index, leg_text):
+            name, leg_src, leg_tgt = legs[index]
+            engine = self._leg_engine(name)
+            options, _ = engine.decoding_options(leg_text, leg_src, leg_tgt, latency_budget_ms)
+            current[0] = future = engine.submit(leg_text, leg_src, leg_tgt, deadline=deadline, **options)
+            future.add_done_callback(lambda done: finish(index, done))
+
+        def finish(index, done):
+            if result.done():
+                return
+            if done.cancelled():
+                result.cancel()
+            elif done.exception() is not None:
+                result.set_exception(done.exception())
+            elif index + 1 < len(legs):
+                try:
+                    start(index + 1, done.result())
+                except Exception as e:
+                    result.set_exception(e)
+            else:
+                result.set_result(done.result())
+
+        # Cancelling the caller's future drops the leg that is queued or running
+        result.add_done_callback(lambda done: done.cancelled() and current[0].cancel())
+        start(0, text)
+        return result
+
+    def iter_segments(self, segments, src_lang, tgt_lang, validate=None):
+        """Yield ``(index, translation)`` in order, like ``engine.iter_segments``, for any routable pair.
+
+        Every segment is queued at once, so each leg of a pivoted pair runs
+        as padded batches. Segments rejected by ``validate(segment,
+        translation)`` are translated again with the policy's retry settings.
+        """
+        legs = self.legs(src_lang, tgt_lang)
+        if len(legs) == 1:
+            yield from self._leg_engine(legs[0][0]).iter_segments(segments, src_lang, tgt_lang, validate=validate)
+            return
+        futures = [self.submit(segment, src_lang, tgt_lang) for segment in segments]
+        try:
+            for index, future in enumerate(futures):
+                translated = future.result()
+                segment = segments[index]
+                if validate is not None and not validate(segment, translated):
+                    translated = self.translate(segment, src_lang, tgt_lang,
+                                                validate=lambda output, segment=segment: validate(segment, output))
+                yield index, translated
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _routed(self, name):
+        return [pair for pair in sorted(self._models[name]["pairs"]) if self.route(*pair) == name]
+
+    def routed_pairs(self):
+        """``{engine name: pairs}``: the pairs each model is the cheapest route for (e.g. for a worker pool)"""
+        return {entry["engine"].name: self._routed(name) for name, entry in self._models.items()}
+
+    def warmup(self):
+        """Warm every model on the pairs routed to it"""
+        for name, entry in self._models.items():
+            pairs = self._routed(name)
+            if pairs:
+                entry["engine"].warmup(pairs)
+
+    def report(self):
+        """Per-model load state, measured size and load timings"""
+        with self._lock:
+            return {
+                "memory_budget_mb": self.memory_budget_bytes / 2 ** 20 if self.memory_budget_bytes else None,
+                "resident_mb": self.resident_bytes() / 2 ** 20,
+                "evictions": self.evictions,
+                "models": {
+                    name: {
+                        "model": entry["engine"].model_name,
+                        "loaded": entry["engine"].is_loaded,
+                        "memory_mb": entry["engine"].memory_bytes() / 2 ** 20,
+                        "pairs": len(entry["pairs"]),
+                        "loads": sum(1 for load in self.loads if load["model"] == name),
+                        "last_load_seconds": entry["engine"].load_seconds,
+                    }
+                    for name, entry in self._models.items()
+                },
+            }
+
+
+def print_registry_report(registry):
+    report = registry.report()
+    budget = report["memory_budget_mb"]
+    print(f"🗂️ Model registry: {report['resident_mb']:.0f} MiB resident"
+          + (f" of {budget:.0f} MiB" if budget else "") + f", {report['evictions']} evictions")
+    for name, model in report["models"].items():
+        status = "✅ loaded" if model["loaded"] else "💤 not loaded"
+        load = f", last load {model['last_load_seconds']:.2f}s" if model["last_load_seconds"] is not None else ""
+        print(f"   {name}: {model['model']} ({model['pairs']} pairs) {status}, ~{model['memory_mb']:.0f} MiB{load}")
+
+
+def default_registry():
+    """T5 for its strong pairs, M2M100 for everything else"""
+    registry = ModelRegistry()
+    registry.register("t5", get_engine("t5"), pairs=T5_PAIRS)
+    registry.register("m2m100", get_engine("m2m100"))
+    return registry
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry(build=default_registry):
+    """Process-wide registry, made by ``build()`` on first use.
+
+    The UI, the JSON API and the worker pools of one process must all share
+    it: the shared engines can only report to one registry's memory budget.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = build()
+    return _registry
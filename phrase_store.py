@@ -0,0 +1,64 @@
+"""
+Precomputed phrase index for curated translations
+
+The curated phrases are loaded once from ``phrases.json`` and indexed by
+(language pair, normalized text), so known phrases are answered with a single
+dict lookup before anything is tokenized or generated.
+"""
+
+import json
+import os
+import unicodedata
+
+PHRASES_PATH = os.environ.get(
+    "TRANSLATOR_PHRASES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrases.json"),
+)
+
+
+def normalize_phrase(text):
+    """Case-fold, drop punctuation and collapse whitespace ("  HOW are you?? " -> "how are you")"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(" " if unicodedata.category(c).startswith("P") else c for c in text)
+    return " ".join(text.split())
+
+
+class PhraseStore:
+    """Curated source→target phrases indexed by ``(src, tgt, normalized text)``"""
+
+    def __init__(self, phrases=None):
+        self._index = {}
+        for (src_lang, tgt_lang), table in (phrases or {}).items():
+            for source, target in table.items():
+                self.add(src_lang, tgt_lang, source, target)
+
+    @classmethod
+    def load(cls, path=PHRASES_PATH):
+        """Build a store from a JSON file shaped like ``{"en-hi": {"Hello": "नमस्ते"}}``"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls({tuple(pair.split("-", 1)): table for pair, table in data.items()})
+
+    def add(self, src_lang, tgt_lang, source, target):
+        self._index[(src_lang, tgt_lang, normalize_phrase(source))] = target
+
+    def lookup(self, text, src_lang, tgt_lang):
+        """Curated translation for ``text`` or None"""
+        return self._index.get((src_lang, tgt_lang, normalize_phrase(text)))
+
+    def __len__(self):
+        return len(self._index)
+
+
+_store = None
+
+
+def get_phrase_store():
+    """Process-wide store, loaded from PHRASES_PATH on first use"""
+    global _store
+    if _store is None:
+        try:
+            _store = PhraseStore.load()
+        except FileNotFoundError:
+            _store = PhraseStore()
+    return _store
@@ -0,0 +1,56 @@
+"""
+Sentence/paragraph segmentation for long-document translation
+
+Documents are cut into segments that can be translated as one padded batch and
+glued back together with their original separators, so
+``"".join(segment + separator for segment, separator in split_segments(text)) == text``.
+"""
+
+import os
+import re
+
+# Segments longer than this (no sentence punctuation) are cut at whitespace
+MAX_SEGMENT_CHARS = int(os.environ.get("TRANSLATOR_MAX_SEGMENT_CHARS", "400"))
+
+_CLOSERS = "\"'”’)]»"
+_BOUNDARY_RE = re.compile(
+    r"\s*\n\s*"                                   # line and paragraph breaks
+    r"|(?:(?<=[.!?…])|(?<=[.!?…][" + re.escape(_CLOSERS) + r"]))\s+"  # Latin sentence ends
+    r"|(?<=[。！？।])\s*"                          # CJK / Devanagari ends need no space
+)
+
+
+def _split_long(segment, separator, max_chars):
+    if len(segment) <= max_chars:
+        return [(segment, separator)]
+
+    pieces = []
+    while len(segment) > max_chars:
+        cut = segment.rfind(" ", 0, max_chars + 1)
+        if cut <= 0:
+            # No whitespace to break on (e.g. Chinese/Japanese): hard cut
+            pieces.append((segment[:max_chars], ""))
+            segment = segment[max_chars:]
+        else:
+            pieces.append((segment[:cut], " "))
+            segment = segment[cut + 1:]
+    pieces.append((segment, separator))
+    return pieces
+
+
+def split_segments(text, max_chars=MAX_SEGMENT_CHARS):
+    """Split text into ``(segment, separator)`` pairs in document order"""
+    pieces = []
+    pos = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        if match.start() == match.end() == pos:
+            continue
+        pieces.extend(_split_long(text[pos:match.start()], match.group(), max_chars))
+        pos = match.end()
+    pieces.extend(_split_long(text[pos:], "", max_chars))
+    return [(segment, separator) for segment, separator in pieces if segment or separator]
+
+
+def join_segments(segments, separators):
+    """Reassemble translated segments with the original separators"""
+    return "".join(segment + separator for segment, separator in zip(segments, separators))
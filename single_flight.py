@@ -0,0 +1,82 @@
+"""
+Single-flight coalescing of identical in-flight requests
+
+When many callers ask for the same deterministic translation at once, only
+the first one starts a computation; the others wait on it and all receive
+its result or its exception. Every caller gets its own Future, so one caller
+cancelling never cancels the others; the shared computation is only
+cancelled once every caller has given up.
+"""
+
+import threading
+from concurrent.futures import Future, InvalidStateError
+
+from metrics import REGISTRY
+
+COALESCED = REGISTRY.counter("translator_coalesced_requests_total", "Requests that joined an identical in-flight request")
+
+
+def _relay(source, target):
+    """Copy the outcome of ``source`` into ``target`` unless the caller already cancelled it"""
+    try:
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+    except InvalidStateError:
+        pass
+
+
+class _Call:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one Future between concurrent callers that use the same key"""
+
+    def __init__(self, name="default"):
+        self.name = name
+        self._calls = {}
+        # Re-entrant: done callbacks of an already finished future run inline
+        self._lock = threading.RLock()
+
+    def submit(self, key, start):
+        """Future for ``start()`` (which returns a Future), shared with concurrent callers of ``key``"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call(start())
+                call.future.add_done_callback(lambda _: self._forget(key, call))
+            else:
+                COALESCED.inc(engine=self.name)
+            call.waiters += 1
+
+        view = Future()
+        view.add_done_callback(lambda done: self._left(call, done))
+        call.future.add_done_callback(lambda source: _relay(source, view))
+        return view
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def _forget(self, key, call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def _left(self, call, view):
+        if not view.cancelled():
+            return
+        with self._lock:
+            call.waiters -= 1
+            last = call.waiters == 0
+        if last:
+            # Nobody is waiting any more; drop it if it has not started yet
+            call.future.cancel()
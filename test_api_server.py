@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test the async JSON API against a stub model
+"""
+
+import asyncio
+import http.client
+import json
+import sys
+sys.path.append('.')
+
+from api_server import start_api_server
+from model_registry import ModelRegistry
+from phrase_store import PhraseStore
+from test_engine import FakeEngine
+
+def start_stub_server():
+    registry = ModelRegistry()
+    engine = registry.register("fake", FakeEngine())
+    phrases = PhraseStore({("en", "fr"): {"Thank you": "Merci"}})
+    server = start_api_server(port=0, host="127.0.0.1", registry=registry, phrases=phrases)
+    return server, engine
+
+def stop(server):
+    server.get_loop().call_soon_threadsafe(server.close)
+
+def post(conn, path, payload):
+    conn.request("POST", path, body=json.dumps(payload), headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, response.read().decode("utf-8")
+
+def test_translate_endpoints():
+    """Single and batch requests share one keep-alive connection"""
+
+    server, engine = start_stub_server()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+
+        status, body = post(conn, "/translate", {"text": "hello", "src": "en", "tgt": "fr"})
+        assert status == 200
+        assert json.loads(body)["translation"] == "[fr] HELLO"
+
+        status, body = post(conn, "/translate/batch", {
+            "segments": ["one", "two", "Thank you!", ""], "src": "en", "tgt": "de",
+        })
+        assert status == 200
+        assert json.loads(body)["translations"] == ["[de] ONE", "[de] TWO", "[de] THANK YOU!", ""]
+
+        # Curated phrases never reach the model
+        status, body = post(conn, "/translate", {"text": "thank you", "src": "en", "tgt": "fr"})
+        assert json.loads(body)["translation"] == "Merci"
+
+        print("🧪 Testing JSON API")
+        print("=" * 50)
+        print(f"🌐 Generate calls for 6 segments: {engine.generate_calls}")
+        conn.close()
+    finally:
+        stop(server)
+
+def test_streaming_batch():
+    """Streamed batches send one NDJSON line per segment"""
+
+    server, _ = start_stub_server()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+        status, body = post(conn, "/translate/batch", {
+            "segments": ["a", "b", "c"], "src": "en", "tgt": "fr", "stream": True,
+        })
+        assert status == 200
+        lines = [json.loads(line) for line in body.splitlines()]
+        assert sorted((line["index"], line["translation"]) for line in lines) == [
+            (0, "[fr] A"), (1, "[fr] B"), (2, "[fr] C"),
+        ]
+
+        # The connection is still usable after a chunked response
+        conn.request("GET", "/health")
+        assert conn.getresponse().status == 200
+        conn.close()
+    finally:
+        stop(server)
+
+def test_errors():
+    """Bad requests get JSON errors with the right status codes"""
+
+    server, _ = start_stub_server()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+        assert post(conn, "/translate", {"text": "hi", "src": "de", "tgt": "fr"})[0] == 400
+        assert post(conn, "/translate", {"src": "en", "tgt": "fr"})[0] == 400
+        assert post(conn, "/translate/batch", {"segments": "hi", "src": "en", "tgt": "fr"})[0] == 400
+        assert post(conn, "/nope", {})[0] == 404
+
+        conn.request("POST", "/translate", body=b"not json")
+        response = conn.getresponse()
+        assert response.status == 400 and "error" in json.loads(response.read())
+        conn.close()
+    finally:
+        stop(server)
+
+def test_pivoted_pair():
+    """Pairs without a direct model are served through English, leg by leg"""
+
+    from test_model_registry import make_pivot_registry
+
+    registry, _, _ = make_pivot_registry()
+    server = start_api_server(port=0, host="127.0.0.1", registry=registry, phrases=PhraseStore({}))
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+        status, body = post(conn, "/translate", {"text": "hallo", "src": "de", "tgt": "fr"})
+        assert status == 200
+        assert json.loads(body)["translation"] == "[fr] [EN] HALLO"
+        assert json.loads(body)["model"] == "fake/into-english+fake/large"
+        conn.close()
+    finally:
+        stop(server)
+
+def test_prework_off_loop():
+    """Tokenization and cache lookups run on the executor, never on the event loop"""
+
+    class LoopCheckingEngine(FakeEngine):
+        def __init__(self):
+            super().__init__()
+            self.on_loop = []
+
+        def decoding_options(self, *args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                self.on_loop.append(True)
+            except RuntimeError:
+                self.on_loop.append(False)
+            return super().decoding_options(*args, **kwargs)
+
+    registry = ModelRegistry()
+    engine = registry.register("fake", LoopCheckingEngine())
+    server = start_api_server(port=0, host="127.0.0.1", registry=registry, phrases=PhraseStore({}))
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+        status, body = post(conn, "/translate/batch", {"segments": ["one", "two"], "src": "en", "tgt": "fr"})
+        assert status == 200
+        assert json.loads(body)["translations"] == ["[fr] ONE", "[fr] TWO"]
+        assert engine.on_loop == [False, False]
+        conn.close()
+    finally:
+        stop(server)
+
+if __name__ == "__main__":
+    test_translate_endpoints()
+    test_streaming_batch()
+    test_errors()
+    test_pivoted_pair()
+    test_prework_off_loop()
+    print("✅ API tests passed")
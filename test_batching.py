@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test the micro-batching scheduler with a stub batch function
+"""
+
+import sys
+import threading
+import time
+sys.path.append('.')
+
+from batching import DeadlineExceeded, MicroBatcher, Overloaded
+
+def test_batching():
+    """Concurrent requests are grouped per language pair and answered in order"""
+
+    calls = []
+
+    def fake_generate(texts, src, tgt):
+        calls.append((src, tgt, len(texts)))
+        return [f"{src}->{tgt}: {text}" for text in texts]
+
+    batcher = MicroBatcher(fake_generate, max_batch_size=8, max_wait_ms=50)
+    results = {}
+
+    def worker(i):
+        tgt = "fr" if i % 2 else "de"
+        results[i] = batcher.translate(f"text {i}", "en", tgt)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    print("🧪 Testing Micro-Batching")
+    print("=" * 50)
+    print(f"📦 generate calls: {calls}")
+
+    for i in range(32):
+        tgt = "fr" if i % 2 else "de"
+        assert results[i] == f"en->{tgt}: text {i}"
+    assert all(size <= 8 for _, _, size in calls)
+    assert len(calls) < 32
+
+def test_batching_error():
+    """An exception in the batch is delivered to every caller in it"""
+
+    def broken_generate(texts, src, tgt):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(broken_generate, max_batch_size=4, max_wait_ms=1)
+    future = batcher.submit("Hello", "en", "fr")
+    try:
+        future.result(timeout=5)
+    except RuntimeError as e:
+        assert "model exploded" in str(e)
+    else:
+        raise AssertionError("expected the batch error to propagate")
+    batcher.close()
+
+def blocked_batcher(**kwargs):
+    """Batcher whose first batch blocks until released, so a queue can build up behind it"""
+
+    order = []
+    release = threading.Event()
+
+    def slow_generate(texts, src, tgt):
+        if texts == ["blocker"]:
+            release.wait(5)
+        order.extend(texts)
+        return texts
+
+    batcher = MicroBatcher(slow_generate, max_batch_size=1, max_wait_ms=0,
+                           cost_fn=lambda text, options: len(text.split()) * 10.0, **kwargs)
+    blocker = batcher.submit("blocker", "en", "fr")
+    while batcher.depth():
+        pass
+    return batcher, blocker, release, order
+
+def test_shortest_job_first():
+    """Cheap requests overtake an expensive one queued before them"""
+
+    batcher, blocker, release, order = blocked_batcher(aging_rate=0.0)
+    futures = [batcher.submit(text, "en", "fr") for text in ["a b c d e f g h", "x", "y z"]]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    batcher.close()
+    assert order == ["blocker", "x", "y z", "a b c d e f g h"]
+
+def test_aging():
+    """A long request that has waited long enough is no longer overtaken"""
+
+    batcher, blocker, release, order = blocked_batcher(aging_rate=1000.0)
+    long = batcher.submit("a b c d e f g h", "en", "fr")
+    time.sleep(0.01)
+    short = batcher.submit("x", "en", "fr")
+    release.set()
+    long.result(timeout=5), short.result(timeout=5)
+    batcher.close()
+    assert order == ["blocker", "a b c d e f g h", "x"]
+
+def test_load_shedding():
+    """Requests are refused at once when the projected queue wait is over the limit"""
+
+    batcher, blocker, release, order = blocked_batcher(max_queue_wait_ms=50)
+    queued = [batcher.submit("a b c", "en", "fr") for _ in range(2)]  # 30ms each
+    try:
+        batcher.submit("x", "en", "fr")
+    except Overloaded as e:
+        assert e.retry_after > 0.05
+    else:
+        raise AssertionError("expected the request to be shed")
+    assert batcher.stats()["depth"] == 2 and batcher.stats()["shed"] == 1
+    release.set()
+    assert [future.result(timeout=5) for future in queued] == ["a b c", "a b c"]
+    batcher.close()
+
+def test_deadlines():
+    """Infeasible deadlines are refused; deadlines passing in the queue fail the request"""
+
+    batcher, blocker, release, order = blocked_batcher()
+    expiring = batcher.submit("x", "en", "de", deadline=time.monotonic() + 0.1)
+    try:
+        batcher.submit("x y z", "en", "de", deadline=time.monotonic() + 0.001)
+    except DeadlineExceeded:
+        pass
+    else:
+        raise AssertionError("expected an infeasible deadline to be refused")
+    time.sleep(0.15)
+    release.set()
+    try:
+        expiring.result(timeout=5)
+    except DeadlineExceeded:
+        pass
+    else:
+        raise AssertionError("expected the expired request to fail")
+    assert blocker.result(timeout=5) == "blocker"
+    batcher.close()
+    assert batcher.stats() == {"depth": 0, "running": 0, "projected_wait_ms": 0.0, "shed": 2}
+
+def test_slots():
+    """Work outside the batches is admitted like a request and counts as running while it lasts"""
+
+    batcher = MicroBatcher(lambda texts, src, tgt: texts, max_wait_ms=0, max_queue_wait_ms=50)
+    with batcher.slot(1000.0):
+        assert batcher.stats()["running"] == 1
+        try:
+            with batcher.slot(10.0):
+                pass
+        except Overloaded as e:
+            assert e.retry_after > 0.05
+        else:
+            raise AssertionError("expected the slot to be refused")
+        try:
+            batcher.submit("x", "en", "fr")
+        except Overloaded:
+            pass
+        else:
+            raise AssertionError("expected the request to be shed")
+    assert batcher.stats()["running"] == 0
+    assert batcher.translate("x", "en", "fr", timeout=5) == "x"
+    batcher.close()
+
+if __name__ == "__main__":
+    test_batching()
+    test_batching_error()
+    test_shortest_job_first()
+    test_aging()
+    test_load_shedding()
+    test_deadlines()
+    test_slots()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test the benchmark regression comparison
+"""
+
+import sys
+sys.path.append('.')
+
+from benchmark import compare, reset_peak_rss, rss_kib
+
+def make_report(p50_ms, sentences_per_sec):
+    return {"results": [{
+        "model": "t5", "pair": "en-fr", "words": 8, "batch_size": 1, "num_beams": 4, "threads": 1,
+        "p50_ms": p50_ms, "p95_ms": p50_ms * 1.2,
+        "sentences_per_sec": sentences_per_sec, "src_tokens_per_sec": sentences_per_sec * 10,
+    }]}
+
+def test_compare():
+    """Slower latency or lower throughput beyond the threshold is flagged"""
+
+    baseline = make_report(100.0, 10.0)
+    assert compare(baseline, make_report(105.0, 9.6), threshold=0.10) == []
+
+    regressions = compare(baseline, make_report(150.0, 6.0), threshold=0.10)
+    metrics = {metric for _, metric, _, _ in regressions}
+
+    print("🧪 Testing Benchmark Comparison")
+    print("=" * 50)
+    print(f"⚠️ Flagged: {sorted(metrics)}")
+
+    assert metrics == {"p50_ms", "p95_ms", "sentences_per_sec", "src_tokens_per_sec"}
+
+def test_peak_rss_per_case():
+    """The peak RSS is reset between cases, so one case's peak never shows up in the next"""
+
+    if not reset_peak_rss():
+        print("⏭️ Peak RSS cannot be reset on this platform")
+        return
+    block = bytearray(64 * 2 ** 20)
+    block[::4096] = b"x" * len(block[::4096])  # touch every page
+    big_peak = rss_kib("VmHWM")
+    del block
+
+    assert reset_peak_rss()
+    small_peak = rss_kib("VmHWM")
+    assert big_peak - small_peak > 32 * 1024
+
+if __name__ == "__main__":
+    test_compare()
+    test_peak_rss_per_case()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test the tiered translation cache
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+from translation_cache import TranslationCache, make_key
+
+def test_cache_tiers():
+    """Entries survive in the SQLite tier after the in-memory LRU is gone"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        key = make_key("Hello   World", "en", "fr", "google/flan-t5-small", {"num_beams": 4})
+        assert key == make_key(" Hello World ", "en", "fr", "google/flan-t5-small", {"num_beams": 4})
+        assert key != make_key("Hello World", "en", "fr", "google/flan-t5-small", {"num_beams": 1})
+
+        cache = TranslationCache(path)
+        assert cache.get(key) is None
+        cache.put(key, "Bonjour le monde")
+        assert cache.get(key) == "Bonjour le monde"
+
+        # A fresh instance (e.g. another worker process) reads from disk
+        cache.flush()
+        restarted = TranslationCache(path)
+        assert restarted.get(key) == "Bonjour le monde"
+        assert restarted.stats()["disk_hits"] == 1
+
+        print("🧪 Testing Translation Cache")
+        print("=" * 50)
+        print(f"📊 Stats: {cache.stats()}")
+        cache.close()
+        restarted.close()
+
+def test_cache_eviction():
+    """The in-memory tier evicts least recently used entries by size"""
+
+    cache = TranslationCache(path=None, max_bytes=600)
+    for i in range(10):
+        cache.put(f"key{i}", "x" * 100)
+    stats = cache.stats()
+    assert stats["bytes"] <= 600
+    assert stats["evictions"] > 0
+    assert cache.get("key9") is not None
+    assert cache.get("key0") is None
+
+def test_disk_cap():
+    """Past the disk cap the oldest rows are deleted, newer ones stay"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TranslationCache(os.path.join(tmp, "cache.sqlite3"), disk_max_bytes=256 * 1024)
+        for i in range(400):
+            cache.put(f"key{i}", f"{i} " + "x" * 2000)
+        cache.flush()
+        stats = cache.stats()
+        assert stats["disk_evictions"] > 0 and stats["pending_writes"] == 0
+
+        restarted = TranslationCache(cache.path)
+        assert restarted.get("key0") is None
+        assert restarted.get("key399").startswith("399 ")
+        cache.close()
+        restarted.close()
+
+if __name__ == "__main__":
+    test_cache_tiers()
+    test_cache_eviction()
+    test_disk_cap()
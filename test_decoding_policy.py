@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test the adaptive decoding policy and greedy-first retries with a fake model
+"""
+
+import sys
+sys.path.append('.')
+
+from decoding_policy import DecodingPolicy
+from test_engine import FakeEngine
+
+def test_policy_choices():
+    """Output budget follows the source length; beams follow the tier and latency budget"""
+
+    policy = DecodingPolicy(tier="quality", greedy_first=False)
+    short = policy.max_new_tokens(2, "en", "fr")
+    long = policy.max_new_tokens(200, "en", "fr")
+    assert short < long <= 512
+    assert short & (short - 1) == 0  # power of two
+
+    assert policy.choose(10, "en", "fr") == ({"max_new_tokens": 32, "num_beams": 4}, None)
+    assert policy.choose(10, "en", "fr", latency_budget_ms=200) == ({"max_new_tokens": 32, "num_beams": 2}, None)
+    assert policy.choose(10, "en", "fr", latency_budget_ms=100) == ({"max_new_tokens": 32, "num_beams": 1}, None)
+    assert DecodingPolicy(tier="fast").choose(10, "en", "fr") == ({"max_new_tokens": 32, "num_beams": 1}, None)
+
+    greedy, retry = DecodingPolicy(tier="balanced", greedy_first=True).choose(10, "en", "fr")
+    assert greedy["num_beams"] == 1 and retry["num_beams"] == 2
+
+    print("🧪 Testing Decoding Policy")
+    print("=" * 50)
+    print(f"📏 en→fr budget: {short} tokens (short) / {long} tokens (long)")
+
+class RecordingEngine(FakeEngine):
+    """FakeEngine that remembers the decoding options of every batch"""
+
+    def __init__(self, bad_greedy=False):
+        super().__init__()
+        self.policy = DecodingPolicy(tier="quality", greedy_first=True)
+        self.bad_greedy = bad_greedy
+        self.options = []
+
+    def _generate(self, texts, src_lang, tgt_lang, **options):
+        self.options.append(options)
+        if self.bad_greedy and options["num_beams"] == 1:
+            return ["" for _ in texts]
+        return super()._generate(texts, src_lang, tgt_lang, **options)
+
+def test_greedy_first_retry():
+    """Valid greedy output is kept; invalid output is retried once with beams"""
+
+    engine = RecordingEngine()
+    assert engine.translate("hello", "en", "fr", validate=bool) == "[fr] HELLO"
+    assert [options["num_beams"] for options in engine.options] == [1]
+
+    engine = RecordingEngine(bad_greedy=True)
+    assert engine.translate("hello", "en", "fr", validate=bool) == "[fr] HELLO"
+    assert [options["num_beams"] for options in engine.options] == [1, 4]
+
+    # Beam and greedy results are cached separately
+    assert engine.translate("hello", "en", "fr", validate=bool) == "[fr] HELLO"
+    assert len(engine.options) == 2
+
+def test_generation_params():
+    """Per-request options replace max_length and drop beam-only settings"""
+
+    engine = FakeEngine()
+    engine.generation_kwargs = {"max_length": 512, "num_beams": 4, "early_stopping": True}
+    assert engine.generation_params({"max_new_tokens": 16, "num_beams": 1}) == {"max_new_tokens": 16, "num_beams": 1}
+    assert engine.generation_params() == engine.generation_kwargs
+
+if __name__ == "__main__":
+    test_policy_choices()
+    test_greedy_first_retry()
+    test_generation_params()
+    print("✅ Decoding policy tests passed")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test lazy loading and warm-up of the translation engine with a fake model
+"""
+
+import sys
+import threading
+sys.path.append('.')
+
+from batching import Overloaded
+from translation_engine import TranslationEngine
+from translation_cache import TranslationCache
+
+class FakeModel:
+    def eval(self):
+        return self
+
+class FakeEngine(TranslationEngine):
+    model_name = "fake/upper"
+
+    def __init__(self):
+        super().__init__(cache=TranslationCache(path=None))
+        self.loads = 0
+        self.generate_calls = 0
+
+    def _load(self):
+        self.loads += 1
+        return None, FakeModel()
+
+    def supported_pairs(self):
+        return [("en", "fr"), ("en", "de")]
+
+    def _generate(self, texts, src_lang, tgt_lang, **options):
+        self.generate_calls += 1
+        return [f"[{tgt_lang}] {text.upper()}" for text in texts]
+
+def test_lazy_load_and_warmup():
+    """Nothing loads until first use; warm-up covers every pair exactly once"""
+
+    engine = FakeEngine()
+    assert not engine.is_loaded and engine.loads == 0
+
+    report = engine.warmup()
+    assert engine.loads == 1
+    assert set(report["warmup_pairs"]) == {"en→fr", "en→de"}
+
+    print("🧪 Testing Translation Engine")
+    print("=" * 50)
+    print(f"⏱️ Report: {report}")
+
+def test_translate_uses_cache():
+    """Repeated requests are answered from the cache without generating again"""
+
+    engine = FakeEngine()
+    assert engine.translate("hello", "en", "fr") == "[fr] HELLO"
+    assert engine.translate("hello", "en", "fr") == "[fr] HELLO"
+    assert engine.generate_calls == 1
+    assert engine.cache.stats()["hits"] == 1
+
+def test_translate_stream():
+    """Document mode yields growing partial output and batches the segments"""
+
+    engine = FakeEngine()
+    partials = list(engine.translate_stream("One. Two!\n\nThree?", "en", "de"))
+    assert partials[-1] == "[de] ONE. [de] TWO!\n\n[de] THREE?"
+    assert all(partials[-1].startswith(partial) for partial in partials)
+    assert engine.generate_calls == 1
+
+def test_translate_many():
+    """Fan-out returns every target and reuses cached targets"""
+
+    engine = FakeEngine()
+    assert engine.translate("hello", "en", "de") == "[de] HELLO"
+    calls = engine.generate_calls
+
+    results = engine.translate_many("hello", "en")
+    assert results == {"fr": "[fr] HELLO", "de": "[de] HELLO"}
+    assert engine.generate_calls == calls + 1  # only "fr" was decoded
+
+    assert engine.translate_many("hello", "en", ["fr", "en"]) == {"fr": "[fr] HELLO"}
+    assert engine.generate_calls == calls + 1
+
+def test_stream_admission():
+    """Token streams beyond the stream limit are refused at once, not queued"""
+
+    class StreamEngine(FakeEngine):
+        def _stream_tokens(self, text, src_lang, tgt_lang, **options):
+            yield f"[{tgt_lang}]"
+            yield f"[{tgt_lang}] {text.upper()}"
+
+    engine = StreamEngine()
+    engine._streams = threading.BoundedSemaphore(1)
+    running = engine.stream("hello", "en", "fr")
+    assert next(running) == "[fr]"
+    try:
+        next(engine.stream("world", "en", "fr"))
+    except Overloaded:
+        pass
+    else:
+        raise AssertionError("expected the second stream to be refused")
+    assert list(running) == ["[fr] HELLO"]
+    assert list(engine.stream("world", "en", "fr")) == ["[fr]", "[fr] WORLD"]
+    # Answered from the cache: no stream slot needed
+    assert list(engine.stream("hello", "en", "fr")) == ["[fr] HELLO"]
+
+if __name__ == "__main__":
+    test_lazy_load_and_warmup()
+    test_translate_uses_cache()
+    test_translate_stream()
+    test_translate_many()
+    test_stream_admission()
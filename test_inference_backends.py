@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test backend selection, artifact paths and backend-specific cache keys
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('.')
+
+import pytest
+
+from inference_backends import BACKENDS, artifact_dir, checkpoint_fingerprint, get_backend
+from test_engine import FakeEngine
+
+def test_backend_selection():
+    """Backends are looked up by name and unknown names are rejected"""
+
+    assert set(BACKENDS) == {"eager", "int8", "onnx"}
+    assert get_backend("int8").name == "int8"
+    try:
+        get_backend("fp8")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown backend accepted")
+
+    # Eager simply loads the checkpoint; nothing is written to disk
+    model = object()
+    assert get_backend("eager").load(lambda: model, "/nonexistent") is model
+
+    print("🧪 Testing Inference Backends")
+    print("=" * 50)
+    print(f"🧰 Backends: {sorted(BACKENDS)}")
+
+def test_artifact_dir():
+    """Converted models are kept per model and backend under a filesystem-safe name"""
+
+    path = artifact_dir("facebook/m2m100_418M", "int8", cache_dir="/tmp/backends")
+    assert path == os.path.join("/tmp/backends", "facebook--m2m100_418M", "int8")
+    assert artifact_dir("facebook/m2m100_418M", "onnx", cache_dir="/tmp/backends") != path
+
+def test_artifacts_per_checkpoint():
+    """A new commit or config under the same model name gets its own artifacts"""
+
+    class Config:
+        def __init__(self, commit, layers):
+            self._commit_hash = commit
+            self.layers = layers
+
+        def to_json_string(self):
+            return f'{{"layers": {self.layers}}}'
+
+    fingerprints = {
+        checkpoint_fingerprint(Config("abc123", 6)),
+        checkpoint_fingerprint(Config("def456", 6)),
+        checkpoint_fingerprint(Config("abc123", 12)),
+        checkpoint_fingerprint(Config(None, 6), revision="seed42"),
+    }
+    assert len(fingerprints) == 4
+    assert checkpoint_fingerprint(Config("abc123", 6)) == checkpoint_fingerprint(Config("abc123", 6))
+    paths = {artifact_dir("t5-small", "int8", "/tmp/backends", fingerprint) for fingerprint in fingerprints}
+    assert len(paths) == 4
+
+def test_cache_key_per_backend():
+    """Results of converted models never answer fp32 requests (and vice versa)"""
+
+    eager, int8 = FakeEngine(), FakeEngine()
+    int8.backend = get_backend("int8")
+    assert eager.cache_key("hello", "en", "fr") != int8.cache_key("hello", "en", "fr")
+    assert eager.startup_report()["backend"] == "eager"
+
+def test_int8_cached_start():
+    """A cached int8 start neither loads fp32 weights nor quantizes, and gives the same logits"""
+
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    import inference_backends
+    from benchmark import TinyT5Engine
+    from translation_cache import TranslationCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def make_engine():
+            return TinyT5Engine(cache=TranslationCache(path=None), backend="int8", backend_cache_dir=tmp)
+
+        first = make_engine().load()
+        decoder_input_ids = torch.zeros((1, 1), dtype=torch.long)
+        expected = inference_backends._logits(first, ["hello world"], "en", "fr", decoder_input_ids)
+
+        quantize_dynamic = torch.ao.quantization.quantize_dynamic
+        quantized = []
+        torch.ao.quantization.quantize_dynamic = lambda *args, **kwargs: quantized.append(args)
+        try:
+            cached = make_engine().load()
+        finally:
+            torch.ao.quantization.quantize_dynamic = quantize_dynamic
+        assert quantized == []
+        logits = inference_backends._logits(cached, ["hello world"], "en", "fr", decoder_input_ids)
+        assert torch.equal(logits, expected)
+
+if __name__ == "__main__":
+    test_backend_selection()
+    test_artifact_dir()
+    test_artifacts_per_checkpoint()
+    test_cache_key_per_backend()
+    test_int8_cached_start()
+    print("✅ Inference backend tests passed")
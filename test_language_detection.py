@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test the character n-gram language detector and the "auto" source language
+"""
+
+import http.client
+import json
+import sys
+sys.path.append('.')
+
+from language_detection import AUTO, get_detector, resolve_source
+from test_api_server import post, start_stub_server, stop
+
+def test_detect():
+    """Each language is recognized by script or n-gram profile; unsure input is None"""
+
+    detector = get_detector()
+    samples = {
+        "en": "Where can I buy a ticket for the concert?",
+        "fr": "Où puis-je acheter un billet pour le concert ?",
+        "de": "Wo kann ich eine Karte für das Konzert kaufen?",
+        "es": "¿Dónde puedo comprar una entrada para el concierto?",
+        "hi": "मैं संगीत कार्यक्रम का टिकट कहाँ खरीद सकता हूँ?",
+        "ru": "Где я могу купить билет на концерт?",
+        "zh": "我在哪里可以买到音乐会的票？",
+        "ja": "コンサートのチケットはどこで買えますか？",
+    }
+    print("🧪 Testing Language Detection")
+    print("=" * 50)
+    for lang, text in samples.items():
+        print(f"🔍 {text} → {detector.detect(text)}")
+        assert detector.detect(text) == lang
+
+    assert detector.detect("Hallo Welt") == "de"
+    assert detector.detect("") is None
+    assert detector.detect("42 !") is None
+    # Candidates restrict the answer, including the script fast path
+    assert detector.detect("Привет, мир", candidates={"en", "fr"}) is None
+    assert detector.detect("Bonjour à tous, merci beaucoup", candidates={"en", "fr"}) == "fr"
+
+def test_resolve_source():
+    """"auto" becomes the detected language; text already in the target is flagged"""
+
+    assert resolve_source("Guten Morgen! Wie geht es dir heute?", AUTO, "en") == ("de", False)
+    assert resolve_source("Guten Morgen! Wie geht es dir heute?", AUTO, "de") == ("de", True)
+    assert resolve_source("Guten Morgen! Wie geht es dir heute?", "en", "de") == ("en", True)
+    assert resolve_source("नमस्ते दुनिया", "en", "hi") == ("en", True)
+    # Loanwords and other short text never override a source the user picked
+    for word, tgt in [("Computer", "fr"), ("Restaurant", "de"), ("Moment", "de"), ("Internet", "de"),
+                      ("Pizza", "es"), ("Radio", "es"), ("Bonjour le monde", "fr")]:
+        assert resolve_source(word, "en", tgt) == ("en", False), word
+    assert resolve_source("42", AUTO, "fr") == ("en", False)
+    assert resolve_source("42", AUTO, None) == ("en", False)
+
+def test_translate_same_language():
+    """Text already in the target language is returned without loading a model, in every mode"""
+
+    from metrics import RESULTS
+    from translator import engine, translate, translate_document, translate_stream
+
+    text = "आज मौसम अच्छा है और हम पार्क जा रहे हैं।"
+    before = RESULTS.value(source="same_language")
+    output = translate(text, AUTO, "hi")
+    assert output.startswith("🎯 आज मौसम अच्छा है")
+    assert "already in Hindi" in output
+    assert list(translate_stream(text, AUTO, "hi")) == [output]
+    assert list(translate_document(f"{text} {text}", AUTO, "hi")) == [
+        f"🎯 {text} {text}\n\n🔍 The text is already in Hindi"]
+    assert RESULTS.value(source="same_language") == before + 3
+    assert not engine.is_loaded
+
+def test_api_auto_source():
+    """The API detects "auto" sources and passes same-language segments through"""
+
+    server, engine = start_stub_server()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+        status, body = post(conn, "/translate", {"text": "Where is the station?", "src": "auto", "tgt": "fr"})
+        assert status == 200
+        assert json.loads(body)["src"] == "en"
+        assert json.loads(body)["translation"] == "[fr] WHERE IS THE STATION?"
+
+        status, body = post(conn, "/translate", {"text": "Wo ist der Bahnhof?", "src": "auto", "tgt": "de"})
+        assert status == 200
+        assert json.loads(body) == {"translation": "Wo ist der Bahnhof?", "src": "de", "tgt": "de", "model": None}
+
+        calls = engine.generate_calls
+        status, body = post(conn, "/translate/batch", {
+            "segments": ["Où puis-je acheter un billet pour le concert ?"], "src": "en", "tgt": "fr",
+        })
+        assert json.loads(body)["translations"] == ["Où puis-je acheter un billet pour le concert ?"]
+        assert engine.generate_calls == calls
+        conn.close()
+    finally:
+        stop(server)
+
+if __name__ == "__main__":
+    test_detect()
+    test_resolve_source()
+    test_translate_same_language()
+    test_api_auto_source()
+    print("✅ Language detection tests passed")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test the M2M100 engine on a tiny random model built locally
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.append('.')
+
+import pytest
+
+from test_engine import FakeModel
+from translation_cache import TranslationCache
+from translation_engine import LANGUAGE_CODES, M2M100Engine
+
+TEXT = "hello world, how are you today"
+TEXTS = ["hello world", "good morning, how are you today?", "thank you very much for your help"]
+
+def tiny_engine():
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from benchmark import TinyM2M100Engine
+
+    return TinyM2M100Engine(cache=TranslationCache(path=None)).load()
+
+def m2m100_tokenizer(directory, src_lang="en"):
+    """A real M2M100Tokenizer over a small SentencePiece model trained on the spot"""
+    spm = pytest.importorskip("sentencepiece")
+    pytest.importorskip("transformers")
+    from transformers import M2M100Tokenizer
+    from benchmark import WORDS
+
+    spm_file, vocab_file = os.path.join(directory, "sentencepiece.bpe.model"), os.path.join(directory, "vocab.json")
+    if not os.path.exists(spm_file):
+        model = io.BytesIO()
+        spm.SentencePieceTrainer.train(sentence_iterator=iter([" ".join(WORDS)] * 20), model_writer=model,
+                                       vocab_size=60, model_type="bpe", character_coverage=1.0, minloglevel=2)
+        with open(spm_file, "wb") as f:
+            f.write(model.getvalue())
+        processor = spm.SentencePieceProcessor(model_proto=model.getvalue())
+        vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3}
+        for i in range(processor.get_piece_size()):
+            vocab.setdefault(processor.id_to_piece(i), len(vocab))
+        with open(vocab_file, "w") as f:
+            json.dump(vocab, f)
+    return M2M100Tokenizer(vocab_file, spm_file, src_lang=src_lang)
+
+def test_encode_matches_tokenizer():
+    """Prepending the language token gives the ids the tokenizer gives with ``src_lang`` set"""
+
+    pytest.importorskip("torch")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = M2M100Engine(cache=TranslationCache(path=None))
+        engine.attach(m2m100_tokenizer(tmp), FakeModel())
+        for src_lang in ["en", "fr", "de", "hi"]:
+            reference = m2m100_tokenizer(tmp, src_lang=src_lang)
+            for text in TEXTS:
+                encoded, generate_kwargs = engine._model_inputs([text], src_lang, "es")
+                assert encoded["input_ids"][0].tolist() == reference(text)["input_ids"]
+                assert generate_kwargs["forced_bos_token_id"] == reference.get_lang_id("es")
+
+            # Padded batches keep every row's ids and mask the padding
+            encoded, _ = engine._model_inputs(TEXTS, src_lang, "es")
+            for row, mask, text in zip(encoded["input_ids"].tolist(), encoded["attention_mask"].tolist(), TEXTS):
+                assert row[:sum(mask)] == reference(text)["input_ids"]
+
+def test_concurrent_source_languages():
+    """Concurrent batches in different source languages each start with their own language token"""
+
+    engine = tiny_engine()
+    languages = list(LANGUAGE_CODES.values())
+    barrier = threading.Barrier(len(languages))
+    errors = []
+
+    def encode(src_lang):
+        tgt_lang = "en" if src_lang != "en" else "fr"
+        barrier.wait()
+        for _ in range(50):
+            encoded, generate_kwargs = engine._model_inputs(TEXTS, src_lang, tgt_lang)
+            first = set(encoded["input_ids"][:, 0].tolist())
+            if first != {engine.lang_token_ids[src_lang]}:
+                errors.append((src_lang, first))
+            if generate_kwargs["forced_bos_token_id"] != engine.lang_token_ids[tgt_lang]:
+                errors.append((tgt_lang, generate_kwargs["forced_bos_token_id"]))
+
+    threads = [threading.Thread(target=encode, args=(src_lang,)) for src_lang in languages]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+def test_fanout_matches_single_targets():
+    """One shared encoder pass decodes every target exactly as a per-target batch does"""
+
+    engine = tiny_engine()
+    targets = ["fr", "de", "es", "hi"]
+    results = engine.translate_many(TEXT, "en", targets)
+
+    # translate_many decodes all targets with one set of options
+    plans = [engine.decoding_options(TEXT, "en", tgt)[0] for tgt in targets]
+    options = dict(plans[0], max_new_tokens=max(o["max_new_tokens"] for o in plans),
+                   num_beams=min(o["num_beams"] for o in plans))
+    expected = {tgt: engine.translate_batch([TEXT], "en", tgt, **options)[0] for tgt in targets}
+
+    print("🧪 Testing M2M100 Engine")
+    print("=" * 50)
+    print(f"🌍 Fan-out: {results}")
+    assert results == expected
+
+if __name__ == "__main__":
+    test_encode_matches_tokenizer()
+    test_concurrent_source_languages()
+    test_fanout_matches_single_targets()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test hot-path metrics and the Prometheus text endpoint
+"""
+
+import sys
+import urllib.request
+sys.path.append('.')
+
+from metrics import MetricsRegistry, REGISTRY, RESULTS, start_metrics_server, timed
+
+def test_metrics_render():
+    """Counters and histograms render in Prometheus text format and reach sinks"""
+
+    registry = MetricsRegistry()
+    events = []
+    registry.add_sink(lambda name, labels, value: events.append((name, labels, value)))
+
+    results = registry.counter("demo_results_total", "Results by source")
+    latency = registry.histogram("demo_seconds", "Latency", buckets=(0.1, 1.0))
+    results.inc(source="model")
+    results.inc(source="model")
+    latency.observe(0.05)
+    latency.observe(5.0)
+
+    text = registry.render()
+    print("🧪 Testing Metrics")
+    print("=" * 50)
+    print(text)
+
+    assert 'demo_results_total{source="model"} 2' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 2' in text
+    assert "demo_seconds_count 2" in text
+    assert len(events) == 4
+
+def test_metrics_endpoint():
+    """The /metrics endpoint serves the global registry"""
+
+    RESULTS.inc(source="curated")
+    with timed("validate"):
+        pass
+    server = start_metrics_server(port=0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+    finally:
+        server.shutdown()
+    assert 'translator_results_total{source="curated"}' in body
+    assert 'translator_stage_seconds_count{stage="validate"}' in body
+    assert body == REGISTRY.render()
+
+if __name__ == "__main__":
+    test_metrics_render()
+    test_metrics_endpoint()
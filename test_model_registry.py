@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test model routing and memory-budgeted LRU eviction with fake models
+"""
+
+import sys
+import time
+sys.path.append('.')
+
+from model_registry import ModelRegistry
+from test_engine import FakeEngine
+
+class SmallEngine(FakeEngine):
+    model_name = "fake/small"
+    memory_mb = 100
+
+class LargeEngine(FakeEngine):
+    model_name = "fake/large"
+    memory_mb = 300
+
+    def supported_pairs(self):
+        return [("en", "fr"), ("en", "de"), ("fr", "en")]
+
+def make_registry(budget_mb):
+    registry = ModelRegistry(memory_budget_mb=budget_mb)
+    small = registry.register("small", SmallEngine(), pairs=[("en", "fr")])
+    large = registry.register("large", LargeEngine())
+    return registry, small, large
+
+def test_routing():
+    """The cheapest model with the pair in its capability table wins"""
+
+    registry, small, large = make_registry(0)
+    assert registry.route("en", "fr") == "small"
+    assert registry.route("en", "de") == "large"
+    assert registry.route("fr", "en") == "large"
+    try:
+        registry.route("de", "fr")
+        assert False, "unsupported pair should raise"
+    except ValueError:
+        pass
+
+    assert registry.translate("hello", "en", "fr") == "[fr] HELLO"
+    assert small.is_loaded and not large.is_loaded
+
+    results = registry.translate_many("hello", "en", ["fr", "de"])
+    assert results == {"fr": "[fr] HELLO", "de": "[de] HELLO"}
+
+def test_lru_eviction():
+    """Loading past the budget unloads the least recently used model"""
+
+    registry, small, large = make_registry(350)
+    registry.translate("hello", "en", "fr")
+    registry.translate("hello", "en", "de")
+    assert large.is_loaded and not small.is_loaded
+    assert registry.evictions == 1
+
+    registry.translate("bye", "en", "fr")
+    assert small.is_loaded and not large.is_loaded
+    assert small.loads == 2
+
+    report = registry.report()
+    print("🧪 Testing Model Registry")
+    print("=" * 50)
+    print(f"🗂️ Report: {report}")
+    assert report["models"]["small"]["loads"] == 2
+    assert report["models"]["small"]["last_load_seconds"] is not None
+    assert report["resident_mb"] == 100
+
+def test_busy_model_is_not_evicted():
+    """A model in the middle of a generate call is never unloaded"""
+
+    registry, small, large = make_registry(350)
+    small.load()
+    with small._in_use():
+        large.load()
+        assert small.is_loaded and large.is_loaded
+    assert registry.evictions == 0
+
+class IntoEnglishEngine(FakeEngine):
+    model_name = "fake/into-english"
+    memory_mb = 200
+
+    def supported_pairs(self):
+        return [("de", "en"), ("hi", "en")]
+
+def make_pivot_registry():
+    registry = ModelRegistry()
+    large = registry.register("large", LargeEngine())
+    into_english = registry.register("into-english", IntoEnglishEngine())
+    return registry, large, into_english
+
+def test_pivot_routing():
+    """Pairs without a direct model are chained through English, leg by leg"""
+
+    registry, large, into_english = make_pivot_registry()
+    assert registry.legs("de", "fr") == [("into-english", "de", "en"), ("large", "en", "fr")]
+    assert registry.supports("hi", "de") and not registry.supports("fr", "hi")
+
+    assert registry.translate("hallo", "de", "fr") == "[fr] [EN] HALLO"
+    assert (into_english.generate_calls, large.generate_calls) == (1, 1)
+
+    # The English intermediate is cached: a retry and a fan-out reuse it
+    assert registry.translate("hallo", "de", "fr") == "[fr] [EN] HALLO"
+    assert registry.translate_many("hallo", "de", ["fr", "en"]) == {"fr": "[fr] [EN] HALLO", "en": "[en] HALLO"}
+    assert into_english.generate_calls == 1
+
+def test_pivot_batches_each_leg():
+    """Segments of a pivoted document share one generate call per leg"""
+
+    registry, large, into_english = make_pivot_registry()
+    segments = ["eins", "zwei", "drei"]
+    results = list(registry.iter_segments(segments, "hi", "de"))
+    assert results == [(i, f"[de] [EN] {segment.upper()}") for i, segment in enumerate(segments)]
+    assert (into_english.generate_calls, large.generate_calls) == (1, 1)
+
+def test_pivot_shares_one_deadline():
+    """Both legs of a pivoted request run against the same absolute deadline"""
+
+    registry, large, into_english = make_pivot_registry()
+    deadlines = []
+    for engine in (into_english, large):
+        def recording(text, src_lang, tgt_lang, deadline=None, submit=engine.submit, **options):
+            deadlines.append(deadline)
+            return submit(text, src_lang, tgt_lang, deadline=deadline, **options)
+        engine.submit = recording
+
+    start = time.monotonic()
+    assert registry.translate("hallo", "de", "fr", deadline_ms=5000) == "[fr] [EN] HALLO"
+    assert len(deadlines) == 2 and deadlines[0] == deadlines[1]
+    assert start + 5 <= deadlines[0] <= time.monotonic() + 5
+
+def test_one_registry_per_engine():
+    """An engine owned by one registry cannot be registered with another"""
+
+    _, small, _ = make_registry(0)
+    try:
+        ModelRegistry().register("small", small)
+        assert False, "a second registry should be refused"
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    test_routing()
+    test_lru_eviction()
+    test_busy_model_is_not_evicted()
+    test_pivot_routing()
+    test_pivot_batches_each_leg()
+    test_pivot_shares_one_deadline()
+    test_one_registry_per_engine()
+    print("✅ Model registry tests passed")
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Test the precomputed curated phrase index
+"""
+
+import sys
+sys.path.append('.')
+
+from phrase_store import PhraseStore, normalize_phrase
+
+def test_phrase_lookup():
+    """Lookups ignore case, punctuation and spacing, per language pair"""
+
+    store = PhraseStore.load()
+
+    print("🧪 Testing Phrase Store")
+    print("=" * 50)
+    print(f"📚 {len(store)} curated phrases")
+
+    assert normalize_phrase("  HOW are   you?? ") == "how are you"
+    assert store.lookup("hello world", "en", "fr") == "Bonjour le monde"
+    assert store.lookup("HELLO, WORLD!", "en", "hi") == "नमस्ते दुनिया"
+    assert store.lookup("Hello World", "fr", "en") is None
+    assert store.lookup("Hello there", "en", "fr") is None
+
+if __name__ == "__main__":
+    test_phrase_lookup()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Test sentence segmentation used by document mode
+"""
+
+import sys
+sys.path.append('.')
+
+from segmentation import split_segments
+
+def test_segmentation():
+    """Segments plus separators always rebuild the original document"""
+
+    documents = [
+        "Good morning! How are you today?\n\nThank you very much for your help.",
+        'He said "Hello." Then he left',
+        "नमस्ते दुनिया। आप कैसे हैं?",
+        "你好。谢谢！",
+        "word " * 200,
+    ]
+
+    print("🧪 Testing Document Segmentation")
+    print("=" * 50)
+
+    for text in documents:
+        pieces = split_segments(text, max_chars=120)
+        print(f"📄 {len(pieces)} segments: {[segment for segment, _ in pieces][:4]}")
+        assert "".join(segment + separator for segment, separator in pieces) == text
+        assert all(len(segment) <= 120 for segment, _ in pieces)
+
+    assert [segment for segment, _ in split_segments(documents[0])] == [
+        "Good morning!", "How are you today?", "Thank you very much for your help."
+    ]
+
+if __name__ == "__main__":
+    test_segmentation()
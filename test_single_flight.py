@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test single-flight coalescing of identical in-flight requests
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+sys.path.append('.')
+
+from batching import DeadlineExceeded
+from single_flight import SingleFlight
+from test_engine import FakeEngine
+
+def test_shared_result_and_errors():
+    """Concurrent callers share one computation, its result and its exception"""
+
+    flights = SingleFlight()
+    shared = Future()
+    starts = []
+
+    def start():
+        starts.append(1)
+        return shared
+
+    first = flights.submit("k", start)
+    second = flights.submit("k", start)
+    assert len(starts) == 1 and flights.in_flight() == 1
+    shared.set_result("bonjour")
+    assert first.result() == second.result() == "bonjour"
+    assert flights.in_flight() == 0
+
+    failing = Future()
+    views = [flights.submit("bad", lambda: failing) for _ in range(3)]
+    failing.set_exception(RuntimeError("model crashed"))
+    for view in views:
+        try:
+            view.result()
+            assert False, "error should propagate"
+        except RuntimeError as e:
+            assert str(e) == "model crashed"
+
+    # A finished key starts a fresh computation
+    flights.submit("k", lambda: Future())
+    assert flights.in_flight() == 1
+
+def test_cancellation():
+    """One caller cancelling leaves the others waiting; the last one cancels the work"""
+
+    flights = SingleFlight()
+    shared = Future()
+    first = flights.submit("k", lambda: shared)
+    second = flights.submit("k", lambda: shared)
+
+    assert first.cancel()
+    assert not shared.cancelled()
+    shared.set_result("hola")
+    assert second.result() == "hola"
+
+    pending = Future()
+    views = [flights.submit("p", lambda: pending) for _ in range(2)]
+    for view in views:
+        view.cancel()
+    assert pending.cancelled()
+
+class SlowEngine(FakeEngine):
+    def __init__(self):
+        super().__init__()
+        self.rows = 0
+
+    def _generate(self, texts, src_lang, tgt_lang, **options):
+        time.sleep(0.05)
+        self.rows += len(texts)
+        return super()._generate(texts, src_lang, tgt_lang, **options)
+
+def test_engine_coalesces_identical_requests():
+    """A burst of identical requests costs one generated row"""
+
+    engine = SlowEngine()
+    barrier = threading.Barrier(8)
+
+    def request(text):
+        barrier.wait()
+        return engine.translate(text, "en", "fr")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(request, ["Good morning"] * 4 + ["Good  morning "] * 4))
+
+    print("🧪 Testing Single-Flight")
+    print("=" * 50)
+    print(f"🧵 8 identical requests → {engine.rows} generated row(s)")
+    assert len(set(results)) == 1
+    assert engine.rows == 1
+
+class BlockedEngine(FakeEngine):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def _generate(self, texts, src_lang, tgt_lang, **options):
+        self.release.wait(5)
+        return super()._generate(texts, src_lang, tgt_lang, **options)
+
+def test_mixed_deadlines():
+    """A caller without a deadline never fails because an identical request's deadline passed"""
+
+    engine = BlockedEngine()
+    options = {"max_new_tokens": 8, "num_beams": 1}
+    busy = engine.submit("Keep the worker busy", "en", "fr", **options)
+    time.sleep(0.05)
+    tight = engine.submit("Good morning", "en", "fr", deadline=time.monotonic() + 0.1, **options)
+    relaxed = engine.submit("Good morning", "en", "fr", **options)
+    time.sleep(0.2)
+    engine.release.set()
+
+    try:
+        tight.result(timeout=5)
+        assert False, "the tight deadline should have expired in the queue"
+    except DeadlineExceeded:
+        pass
+    assert relaxed.result(timeout=5) == "[fr] GOOD MORNING"
+    assert busy.result(timeout=5) == "[fr] KEEP THE WORKER BUSY"
+
+if __name__ == "__main__":
+    test_shared_result_and_errors()
+    test_cancellation()
+    test_engine_coalesces_identical_requests()
+    test_mixed_deadlines()
+    print("✅ Single-flight tests passed")
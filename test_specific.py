@@ -6,7 +6,7 @@ Test specific problematic translation
 import sys
 sys.path.append('.')
 
-from IBM_internship import translate
+from translator import translate
 
 def test_specific_case():
     """Test the specific case that was failing"""
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test incremental detokenization used for token-by-token streaming
+"""
+
+import sys
+import threading
+sys.path.append('.')
+
+from token_streaming import IncrementalDecoder, TokenStreamer
+
+class ByteTokenizer:
+    """Every token is one UTF-8 byte, like SentencePiece byte fallback"""
+
+    def decode(self, ids, skip_special_tokens=True, clean_up_tokenization_spaces=False):
+        return bytes(ids).decode("utf-8", errors="replace")
+
+class PieceTokenizer:
+    """SentencePiece-style pieces: "▁" marks a word start and is dropped at the start of a decode"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def decode(self, ids, skip_special_tokens=True, clean_up_tokenization_spaces=False):
+        return "".join(self.pieces[i] for i in ids).replace("▁", " ").lstrip(" ")
+
+class FakeIds:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def dim(self):
+        return 1
+
+    def tolist(self):
+        return self.ids
+
+def test_multibyte_boundaries():
+    """Characters split across byte tokens are only emitted once complete"""
+
+    text = "नमस्ते, 你好!"
+    decoder = IncrementalDecoder(ByteTokenizer())
+    partials = []
+    for byte in text.encode("utf-8"):
+        if decoder.add([byte]):
+            partials.append(decoder.text)
+
+    print("🧪 Testing Token Streaming")
+    print("=" * 50)
+    print(f"⚡ Partials: {partials}")
+
+    assert decoder.text == decoder.final_text() == text
+    assert not any("�" in partial for partial in partials)
+
+def test_sentencepiece_spaces():
+    """Word-start markers keep their space even when decoded one token at a time"""
+
+    pieces = ["▁Bon", "jour", "▁le", "▁monde", "!"]
+    decoder = IncrementalDecoder(PieceTokenizer(pieces))
+    deltas = [decoder.add([i]) for i in range(len(pieces))]
+    assert deltas == ["Bon", "jour", " le", " monde", "!"]
+    assert decoder.text == decoder.final_text() == "Bonjour le monde!"
+
+def test_streamer():
+    """The streamer skips the decoder start token and yields growing text"""
+
+    streamer = TokenStreamer(PieceTokenizer(["<s>", "▁Hola", "▁mundo"]), timeout=5)
+
+    def generate():
+        streamer.put(FakeIds([0]))  # decoder start
+        streamer.put(FakeIds([1]))
+        streamer.put(FakeIds([2]))
+        streamer.end()
+
+    threading.Thread(target=generate).start()
+    assert list(streamer) == ["Hola", "Hola mundo"]
+    assert streamer.stopped.is_set()
+
+if __name__ == "__main__":
+    test_multibyte_boundaries()
+    test_sentencepiece_spaces()
+    test_streamer()
+    print("✅ Token streaming tests passed")
@@ -6,8 +6,10 @@ Quick test script for the translation functionality
 import sys
 sys.path.append('.')
 
-# Import the translation function from our main script
-from IBM_internship import translate
+# Import the translation function (no Gradio, model loads on first use)
+import translator
+from batching import Overloaded
+from translator import BUSY_MESSAGE, translate
 
 def test_translations():
     """Test the translation function with sample inputs"""
@@ -29,5 +31,25 @@ def test_translations():
         print(f"📖 Output: {result}")
         print("-" * 30)
 
+def test_busy_document():
+    """A shed document is answered with the busy message, not an error"""
+
+    class BusyRouter:
+        def supports(self, src_lang, tgt_lang):
+            return True
+
+        def iter_segments(self, segments, src_lang, tgt_lang, validate=None):
+            raise Overloaded("Translator busy")
+            yield
+
+    router, model_ready = translator.router, translator.model_ready
+    translator.router, translator.model_ready = BusyRouter, lambda: True
+    try:
+        outputs = list(translator.translate_document("One sentence. And another one.", "en", "fr"))
+    finally:
+        translator.router, translator.model_ready = router, model_ready
+    assert outputs == [BUSY_MESSAGE]
+
 if __name__ == "__main__":
     test_translations()
+    test_busy_document()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test the fuzzy translation memory and its use by the engine
+"""
+
+import sys
+sys.path.append('.')
+
+from test_engine import FakeEngine
+from translation_memory import TranslationMemory, normalize_segment
+
+PAIR = ("en", "fr")
+
+def test_near_duplicates():
+    """Whitespace, casing, closing punctuation and numbers do not cause misses"""
+
+    memory = TranslationMemory(threshold=0.9)
+    memory.add("Your order 12 has shipped.", "Votre commande 12 a été expédiée.", PAIR)
+
+    assert normalize_segment("  Your ORDER 12   has shipped!") == ("your order ⦀ has shipped", ("12",), "!")
+    assert memory.lookup("your order 12 has shipped.", PAIR) == "Votre commande 12 a été expédiée."
+    assert memory.lookup("  Your ORDER 345 has   shipped", PAIR) == "Votre commande 345 a été expédiée"
+    assert memory.lookup("Your order 7 has shipped!", PAIR) == "Votre commande 7 a été expédiée!"
+
+    print("🧪 Testing Translation Memory")
+    print("=" * 50)
+    print(f"🧠 Stats: {memory.stats()}")
+
+def test_fuzzy_threshold():
+    """With fuzzy serving on, segments above the threshold are answered; others and other buckets miss"""
+
+    memory = TranslationMemory(threshold=0.75, fuzzy=True)
+    memory.add("The meeting has been moved to Thursday afternoon", "La réunion a été déplacée à jeudi après-midi", PAIR)
+    assert memory.lookup("The meeting has been moved to thursday afternoon :", PAIR) is not None
+    assert memory.lookup("The meetings have been moved to Thursday afternoon", PAIR) is not None
+    assert memory.lookup("The meeting has been cancelled", PAIR) is None
+    assert memory.lookup("The meeting has been moved to Thursday afternoon", ("en", "de")) is None
+    assert memory.stats()["fuzzy_hits"] == 1
+
+def test_fuzzy_matches_not_served():
+    """A near-identical sentence with the opposite meaning is only a suggestion, never the answer"""
+
+    memory = TranslationMemory(threshold=0.9)
+    memory.add("Please do not turn off the computer before saving your work",
+               "Veuillez ne pas éteindre l'ordinateur avant d'enregistrer votre travail", PAIR)
+    query = "Please do turn off the computer before saving your work"
+    assert memory.lookup(query, PAIR) is None
+    translation, similarity = memory.suggest(query, PAIR)
+    assert translation.startswith("Veuillez ne pas") and similarity >= 0.9
+    assert memory.stats()["fuzzy_hits"] == 0 and memory.stats()["misses"] == 1
+
+    engine = FakeEngine()
+    engine.memory = memory
+    memory.add("Please do not turn off the computer before saving your work",
+               "[fr] PLEASE DO NOT TURN OFF THE COMPUTER BEFORE SAVING YOUR WORK", engine.memory_bucket(
+                   "en", "fr", engine.decoding_options(query, "en", "fr")[0]))
+    assert engine.translate(query, "en", "fr") == f"[fr] {query.upper()}"
+    assert engine.generate_calls == 1
+
+def test_numbers_must_be_found():
+    """A stored translation whose numbers cannot be located only answers the same numbers"""
+
+    memory = TranslationMemory()
+    memory.add("Room 12 is free", "La salle douze est libre", PAIR)
+    assert memory.lookup("Room 12 is free", PAIR) == "La salle douze est libre"
+    assert memory.lookup("Room 13 is free", PAIR) is None
+
+def test_eviction():
+    """The oldest entries are dropped once the memory is full"""
+
+    memory = TranslationMemory(max_entries=2)
+    for word in ("apples", "pears", "plums"):
+        memory.add(f"I like {word}", f"J'aime les {word}", PAIR)
+    assert len(memory) == 2
+    assert memory.lookup("I like apples", PAIR) is None
+    assert memory.lookup("I like plums", PAIR) == "J'aime les plums"
+
+def test_engine_uses_memory():
+    """Near-duplicates are answered from the memory without generating"""
+
+    engine = FakeEngine()
+    engine.memory = TranslationMemory()
+    assert engine.translate("Hello there, 3 friends", "en", "fr") == "[fr] HELLO THERE, 3 FRIENDS"
+    assert engine.translate("hello there,  5 friends!", "en", "fr") == "[fr] HELLO THERE, 5 FRIENDS!"
+    assert engine.generate_calls == 1
+
+if __name__ == "__main__":
+    test_near_duplicates()
+    test_fuzzy_threshold()
+    test_fuzzy_matches_not_served()
+    test_numbers_must_be_found()
+    test_eviction()
+    test_engine_uses_memory()
+    print("✅ Translation memory tests passed")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test the multi-process worker pool with fake engines forked into real workers
+"""
+
+import contextlib
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import urllib.request
+sys.path.append('.')
+
+import pytest
+
+import worker_pool
+from batching import DeadlineExceeded
+from metrics import OUTPUT_TOKENS, STAGE_SECONDS, start_metrics_server, timed
+from test_engine import FakeEngine
+from worker_pool import WorkerDied, WorkerPool
+
+if "fork" not in multiprocessing.get_all_start_methods():
+    pytest.skip("the fake engines reach the workers by fork", allow_module_level=True)
+
+# Set by a worker once it is inside a slow generate (inherited through fork)
+busy = multiprocessing.get_context("fork").Event()
+
+class PoolEngine(FakeEngine):
+    name = "fake"
+
+    def _generate(self, texts, src_lang, tgt_lang, **options):
+        if texts[0] == "slow":
+            busy.set()
+            time.sleep(30)
+        if texts[0] == "late":
+            raise DeadlineExceeded("Deadline passed before the batch ran")
+        if texts[0] == "bad":
+            raise ValueError("bad input")
+        with timed("generate"):
+            outputs = [f"[{tgt_lang}] {text.upper()} from {os.getpid()}" for text in texts]
+        for output in outputs:
+            OUTPUT_TOKENS.observe(len(output.split()))
+        return outputs
+
+    def _stream_tokens(self, text, src_lang, tgt_lang, **options):
+        words = text.split()
+        for i in range(1, len(words) + 1):
+            time.sleep(0.05)
+            yield " ".join(words[:i])
+        yield text
+
+@contextlib.contextmanager
+def running_pool(workers=1, timeout=5):
+    engine = PoolEngine()
+    get_engine = worker_pool.get_engine
+    worker_pool.get_engine = lambda name: engine
+    try:
+        pool = WorkerPool(["fake"], workers=workers, warmup=False, timeout=timeout).start()
+        try:
+            yield pool
+        finally:
+            pool.close()
+    finally:
+        worker_pool.get_engine = get_engine
+
+def test_result_routing():
+    """Every caller gets the answer to its own batch, computed in a worker process"""
+
+    with running_pool(workers=2) as pool:
+        futures = [pool.submit_batch("fake", [f"text {i}", f"more {i}"], "en", "fr" if i % 2 else "de")
+                   for i in range(20)]
+        for i, future in enumerate(futures):
+            tgt = "fr" if i % 2 else "de"
+            outputs = future.result(timeout=5)
+            assert [output.split(" from ")[0] for output in outputs] == [f"[{tgt}] TEXT {i}", f"[{tgt}] MORE {i}"]
+            assert int(outputs[0].split(" from ")[1]) != os.getpid()
+        assert pool.fanout_batch("fake", "hi", "en", ["fr", "de"])[0].startswith("[fr] HI")
+
+def test_exception_types():
+    """Exceptions raised inside a worker reach the caller with their type"""
+
+    with running_pool() as pool:
+        with pytest.raises(ValueError, match="bad input"):
+            pool.translate_batch("fake", ["bad"], "en", "fr")
+        with pytest.raises(DeadlineExceeded):
+            pool.translate_batch("fake", ["late"], "en", "fr")
+        # An unsupported pair is rejected by the worker's engine
+        with pytest.raises(ValueError):
+            pool.translate_batch("fake", ["hi"], "fr", "en")
+        assert pool.translate_batch("fake", ["hi"], "en", "fr")[0].startswith("[fr] HI")
+
+def test_worker_killed_mid_batch():
+    """Callers of a killed worker get WorkerDied and a replacement serves the next request"""
+
+    busy.clear()
+    with running_pool() as pool:
+        pid = pool._workers[0].pid
+        future = pool.submit_batch("fake", ["slow"], "en", "fr")
+        assert busy.wait(5)
+        os.kill(pid, signal.SIGKILL)
+        with pytest.raises(WorkerDied):
+            future.result(timeout=5)
+
+        assert pool.translate_batch("fake", ["after"], "en", "fr")[0].startswith("[fr] AFTER")
+        assert pool.restarts == 1
+        assert pool._workers[0].pid != pid
+
+        print("🧪 Testing Worker Pool")
+        print("=" * 50)
+        print(f"💥 Worker {pid} killed, replaced by {pool._workers[0].pid}")
+
+def test_timeout():
+    """A caller stops waiting for a stuck worker after the pool timeout"""
+
+    with running_pool(timeout=0.5) as pool:
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            pool.translate_batch("fake", ["slow"], "en", "fr")
+        assert time.perf_counter() - start < 5
+        # Kill the stuck worker rather than waiting for it on close
+        os.kill(pool._workers[0].pid, signal.SIGKILL)
+
+def test_stream_cancellation():
+    """Closing a stream early stops the worker's generate so it can take the next task"""
+
+    with running_pool(timeout=2) as pool:
+        partials = list(pool.stream("fake", "one two three", "en", "fr"))
+        assert partials[:3] == ["one", "one two", "one two three"] and partials[-1] == "one two three"
+
+        partials = pool.stream("fake", " ".join(str(i) for i in range(200)), "en", "fr")
+        assert next(partials) == "0"
+        partials.close()
+        # The only worker would still be streaming for ~10s without the cancellation
+        assert pool.translate_batch("fake", ["next"], "en", "fr")[0].startswith("[fr] NEXT")
+
+def test_worker_metrics():
+    """Stage timings and token counts recorded in a worker show up on the front process's /metrics"""
+
+    generated, outputs = STAGE_SECONDS.count(stage="generate"), OUTPUT_TOKENS.count()
+    with running_pool() as pool:
+        pool.translate_batch("fake", ["one", "two"], "en", "fr")
+        pool.translate_batch("fake", ["three"], "en", "de")
+    assert STAGE_SECONDS.count(stage="generate") == generated + 2
+    assert OUTPUT_TOKENS.count() == outputs + 3
+
+    server = start_metrics_server(port=0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+    finally:
+        server.shutdown()
+    assert f'translator_stage_seconds_count{{stage="generate"}} {generated + 2}' in body
+
+if __name__ == "__main__":
+    test_result_routing()
+    test_exception_types()
+    test_worker_killed_mid_batch()
+    test_timeout()
+    test_stream_cancellation()
+    test_worker_metrics()
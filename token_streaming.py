@@ -0,0 +1,115 @@
+"""
+Token-by-token streaming of ``generate`` output
+
+``TokenStreamer`` is handed to ``model.generate(streamer=...)``, which runs on
+a background thread; iterating the streamer yields the decoded text so far
+after every new token. Text is detokenized incrementally over a short
+window of tokens, so SentencePiece word boundaries and multi-byte characters
+split across byte-fallback tokens never show up half-decoded.
+"""
+
+import queue
+import threading
+
+_END = object()
+
+
+class IncrementalDecoder:
+    """Turn a growing list of token ids into text, emitting only complete characters.
+
+    Decodes ``ids[prefix_offset:]`` and subtracts the decoded prefix, so the
+    tokenizer sees each new token together with its left context (needed for
+    SentencePiece's leading-space marker) without re-decoding the whole output.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.ids = []
+        self.text = ""
+        self._prefix_offset = 0
+        self._read_offset = 0
+
+    def _decode(self, ids):
+        return self.tokenizer.decode(ids, skip_special_tokens=True, clean_up_tokenization_spaces=False)
+
+    def add(self, token_ids):
+        """Append tokens; returns the newly completed text (possibly empty)"""
+        self.ids.extend(token_ids)
+        prefix_text = self._decode(self.ids[self._prefix_offset:self._read_offset])
+        new_text = self._decode(self.ids[self._prefix_offset:])
+        # A trailing U+FFFD means a multi-byte character is still incomplete
+        if len(new_text) > len(prefix_text) and not new_text.endswith("�"):
+            delta = new_text[len(prefix_text):]
+            self._prefix_offset = self._read_offset
+            self._read_offset = len(self.ids)
+            self.text += delta
+            return delta
+        return ""
+
+    def final_text(self):
+        """Full decode of every token (what a non-streaming decode returns)"""
+        return self.tokenizer.decode(self.ids, skip_special_tokens=True)
+
+
+class TokenStreamer:
+    """``generate`` streamer for a batch of one; iterate it for the text so far.
+
+    Matches the ``put``/``end`` interface transformers expects. Closing the
+    iterator early sets ``stopped``, which ``stopping_criteria()`` turns into
+    an early stop of the running ``generate``.
+    """
+
+    def __init__(self, tokenizer, timeout=None):
+        self.decoder = IncrementalDecoder(tokenizer)
+        self.timeout = timeout
+        self.stopped = threading.Event()
+        self._queue = queue.Queue()
+        self._prompt_seen = False
+
+    # -- called by generate() -------------------------------------------
+
+    def put(self, value):
+        if not self._prompt_seen:
+            # The first call carries the decoder start token(s), not output
+            self._prompt_seen = True
+            return
+        if value.dim() > 1:
+            if value.shape[0] > 1:
+                raise ValueError("TokenStreamer only supports a batch of one")
+            value = value[0]
+        self._queue.put(value.tolist())
+
+    def end(self):
+        self._queue.put(_END)
+
+    def fail(self, error):
+        """Forward an exception from the generate thread to the reader"""
+        self._queue.put(error)
+
+    # -- read side --------------------------------------------------------
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get(timeout=self.timeout)
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                if self.decoder.add(item):
+                    yield self.decoder.text
+        finally:
+            self.stopped.set()
+
+    def stopping_criteria(self):
+        """StoppingCriteriaList that ends generation once the reader has gone away"""
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        stopped = self.stopped
+
+        class _ReaderGone(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return torch.full((input_ids.shape[0],), stopped.is_set(), dtype=torch.bool)
+
+        return StoppingCriteriaList([_ReaderGone()])
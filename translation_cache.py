@@ -0,0 +1,238 @@
+"""
+Tiered translation result cache
+
+A bounded in-process LRU sits in front of a SQLite store on disk. The disk tier
+survives restarts and can be shared by several worker processes, so repeated
+phrases skip tokenization and generation entirely. Writes to disk are queued
+and committed in batches by a writer thread, so ``put`` never waits on SQLite,
+and the oldest rows are deleted once the file's live data passes
+``TRANSLATOR_CACHE_DISK_MAX_BYTES``.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Cache settings (overridable through the environment)
+CACHE_MAX_BYTES = int(os.environ.get("TRANSLATOR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_PATH = os.environ.get("TRANSLATOR_CACHE_PATH", ".translation_cache.sqlite3")
+# Live data kept in the SQLite file; 0 lets it grow without bound
+CACHE_DISK_MAX_BYTES = int(os.environ.get("TRANSLATOR_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Most rows the writer thread commits in one transaction
+_WRITE_BATCH = 256
+
+# Rough per-entry bookkeeping cost of the OrderedDict slot
+_ENTRY_OVERHEAD = 96
+
+logger = logging.getLogger("translator")
+
+
+def normalize_text(text):
+    """Canonical form of the source text used for cache keys"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_key(text, src_lang, tgt_lang, model_name, params=None):
+    """Stable key over normalized text, language pair, model and generation params"""
+    payload = json.dumps(
+        [normalize_text(text), src_lang, tgt_lang, model_name, params or {}],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """In-memory LRU (bounded by bytes) backed by an optional SQLite file.
+
+    Pass ``path=None`` (or an empty string) to keep the cache in memory only.
+    Disk writes land shortly after ``put`` returns; ``flush()`` waits for them.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, disk_max_bytes=CACHE_DISK_MAX_BYTES):
+        self.path = path or None
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._writes = queue.Queue()
+        self._writer = None
+        self._writer_pid = None
+
+        if self.path:
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS translations ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                # Trimming deletes the oldest rows first
+                conn.execute("CREATE INDEX IF NOT EXISTS translations_created ON translations (created)")
+
+    def _connection(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _entry_size(key, value):
+        return len(key) + len(value.encode("utf-8")) + _ENTRY_OVERHEAD
+
+    def _remember(self, key, value):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= self._entry_size(key, old)
+            size = self._entry_size(key, value)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._size -= self._entry_size(old_key, old_value)
+                self.evictions += 1
+
+    def get(self, key):
+        """Return the cached translation or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.path:
+            row = self._connection().execute(
+                "SELECT value FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store a translation in memory and queue it for the disk tier"""
+        self._remember(key, value)
+        if self.path:
+            self._writes.put((key, value, time.time()))
+            self._ensure_writer()
+
+    def flush(self):
+        """Wait until every queued write is on disk"""
+        if self.path:
+            self._writes.join()
+
+    def _ensure_writer(self):
+        # A forked child inherits the thread object but not the thread
+        if self._writer_pid != os.getpid():
+            with self._lock:
+                if self._writer_pid != os.getpid():
+                    self._writer = threading.Thread(target=self._write_loop, name="translation-cache-writer",
+                                                    daemon=True)
+                    self._writer.start()
+                    self._writer_pid = os.getpid()
+
+    def _write_loop(self):
+        while True:
+            rows = [self._writes.get()]
+            while len(rows) < _WRITE_BATCH:
+                try:
+                    rows.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._connection() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO translations (key, value, created) VALUES (?, ?, ?)", rows
+                    )
+                self._trim(self._connection())
+            except sqlite3.Error as e:
+                # A lost write only costs a future cache miss
+                logger.warning("⚠️ Translation cache write failed: %s", e)
+            finally:
+                for _ in rows:
+                    self._writes.task_done()
+
+    def _trim(self, conn):
+        """Delete the oldest rows once the file holds more than ``disk_max_bytes`` of live data"""
+        if not self.disk_max_bytes:
+            return
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        used = (pages - free) * page_size
+        if used <= self.disk_max_bytes:
+            return
+        rows = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        # Free the overshoot plus a tenth, so trimming does not run on every write
+        excess = math.ceil(rows * (1 - self.disk_max_bytes / used)) + rows // 10
+        with conn:
+            deleted = conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY created LIMIT ?)", (excess,)
+            ).rowcount
+        with self._lock:
+            self.disk_evictions += deleted
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.path:
+            self.flush()
+            with self._connection() as conn:
+                conn.execute("DELETE FROM translations")
+
+    def close(self):
+        """Write out queued entries and close this thread's SQLite connection"""
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def stats(self):
+        """Hit/miss/eviction counters plus the current memory footprint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "pending_writes": self._writes.qsize(),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,742 @@
+"""
+Importable translation engine with lazy model loading
+
+Importing this module is close to free: transformers/torch are only imported
+and the weights only loaded the first time an engine is actually used. Call
+``warmup()`` at server start to pay the one-time allocation costs up front.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from batching import DeadlineExceeded, MicroBatcher, Overloaded
+from decoding_policy import get_policy
+from inference_backends import artifact_dir, checkpoint_fingerprint, get_backend
+from metrics import (DECODE_RETRIES, INPUT_TOKENS, MEMORY_LOOKUPS, OUTPUT_TOKENS, REGISTRY, SHED_REQUESTS,
+                     STAGE_SECONDS, TIME_TO_FIRST_TOKEN, timed)
+from segmentation import join_segments, split_segments
+from single_flight import SingleFlight
+from token_streaming import TokenStreamer
+from translation_cache import TranslationCache, make_key
+from translation_memory import get_memory
+
+T5_MODEL_NAME = "google/flan-t5-small"
+M2M100_MODEL_NAME = "facebook/m2m100_418M"
+
+# Languages offered by the M2M100 app
+LANGUAGE_CODES = {
+    "English": "en",
+    "Hindi": "hi",
+    "French": "fr",
+    "Spanish": "es",
+    "German": "de",
+    "Chinese": "zh",
+    "Russian": "ru",
+    "Japanese": "ja",
+}
+
+WARMUP_TEXT = "Hello"
+
+# Gradio handlers allowed to run at once (the queue's default_concurrency_limit)
+CONCURRENCY = int(os.environ.get("TRANSLATOR_CONCURRENCY", "16"))
+# Batches the in-process engine runs in parallel; safe because generation never
+# mutates the shared tokenizer
+INFERENCE_THREADS = int(os.environ.get("TRANSLATOR_INFERENCE_THREADS", "1"))
+# Token streams one engine runs at once; each is a batch-of-one generate
+MAX_STREAMS = int(os.environ.get("TRANSLATOR_MAX_STREAMS", "4"))
+
+
+class TranslationEngine:
+    """Base class: lazy loading, micro-batching, caching and warm-up.
+
+    Subclasses implement ``_load()`` returning ``(tokenizer, model)`` (with the
+    model built through ``load_model`` so the configured backend applies),
+    ``supported_pairs()`` and ``_model_inputs(texts, src_lang, tgt_lang)``
+    (or ``_generate(texts, src_lang, tgt_lang, **options)`` directly), where
+    ``options`` are per-request decoding options from the policy.
+    """
+
+    name = None
+    model_name = None
+    generation_kwargs = {}
+    max_source_tokens = 512
+    # Rough resident size once loaded; used for memory budgeting until measured
+    memory_mb = None
+
+    def __init__(self, model_name=None, cache=None, policy=None, backend=None, backend_cache_dir=None, memory=None):
+        self.model_name = model_name or self.model_name
+        self.policy = policy or get_policy()
+        # eager fp32, int8 or onnx; see inference_backends
+        self.backend = get_backend(backend)
+        self.backend_cache_dir = backend_cache_dir
+        self.tokenizer = None
+        self.model = None
+        self.load_error = None
+        self.load_seconds = None
+        self.warmup_seconds = {}
+        self._cache = cache
+        # Fuzzy translation memory consulted after an exact cache miss (None: off)
+        self.memory = memory
+        self._batcher = None
+        self._fanout_fn = None
+        self._stream_fn = None
+        self._streams = threading.BoundedSemaphore(MAX_STREAMS)
+        self._flights = SingleFlight(self.name)
+        self._lock = threading.Lock()
+        # Set by ModelRegistry.register; loads and unloads are then budgeted
+        self.registry = None
+        self._measured_bytes = None
+        self._active = 0
+        self._active_lock = threading.Lock()
+
+    # -- loading ---------------------------------------------------------
+
+    @property
+    def is_loaded(self):
+        return self.model is not None
+
+    def load(self):
+        """Load tokenizer and model on first use (thread-safe, runs once)"""
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    if self.registry is not None:
+                        self.registry.reserve(self)
+                    start = time.perf_counter()
+                    self.attach(*self._load())
+                    self.load_seconds = time.perf_counter() - start
+                    if self.registry is not None:
+                        self.registry.loaded(self)
+        return self
+
+    def unload(self):
+        """Drop the tokenizer and weights; False if the engine is loading or generating"""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            with self._active_lock:
+                if self._active:
+                    return False
+                self.model = None
+                self.tokenizer = None
+            return True
+        finally:
+            self._lock.release()
+
+    def memory_bytes(self):
+        """Parameter and buffer bytes when loaded, else the last measurement or the estimate"""
+        model = self.model
+        if model is not None and hasattr(model, "parameters"):
+            tensors = list(model.parameters()) + list(model.buffers())
+            self._measured_bytes = sum(t.numel() * t.element_size() for t in tensors)
+        if self._measured_bytes is not None:
+            return self._measured_bytes
+        return (self.memory_mb or 0) * 2 ** 20
+
+    @contextmanager
+    def _in_use(self):
+        # Keeps the registry from unloading the weights mid-generate
+        with self._active_lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._active_lock:
+                self._active -= 1
+
+    def attach(self, tokenizer, model):
+        """Use an already loaded tokenizer/model (e.g. one inherited by a worker process)"""
+        if hasattr(model, "eval"):  # ONNX Runtime models have no training mode
+            model.eval()
+        self.tokenizer = tokenizer
+        self._prepare()
+        # Set last: is_loaded only flips once the lookup tables are ready
+        self.model = model
+
+    def available(self):
+        """Try to load once; False (with ``load_error`` set) if that fails"""
+        if self.model is not None:
+            return True
+        if self.load_error is not None:
+            return False
+        try:
+            self.load()
+        except Exception as e:
+            self.load_error = e
+            return False
+        return True
+
+    def _load(self):
+        raise NotImplementedError
+
+    def load_model(self, load_eager, config, revision=None):
+        """The model for the engine's backend; ``load_eager()`` loads the fp32 checkpoint.
+
+        Converted models are cached per checkpoint: ``config`` (and its hub
+        commit hash, or ``revision``) select the artifact directory.
+        """
+        fingerprint = checkpoint_fingerprint(config, revision)
+        directory = artifact_dir(self.model_name, self.backend.name, self.backend_cache_dir, fingerprint)
+
+        def build_empty():
+            # The architecture alone: no checkpoint read, no weight initialization
+            from transformers import AutoModelForSeq2SeqLM
+            try:
+                from transformers.initialization import no_init_weights
+            except ImportError:  # transformers < 5
+                from transformers.modeling_utils import no_init_weights
+
+            with no_init_weights():
+                return AutoModelForSeq2SeqLM.from_config(config)
+
+        return self.backend.load(load_eager, directory, build_empty)
+
+    def _prepare(self):
+        """Precompute per-language lookup tables once the tokenizer is available"""
+
+    # -- translation -----------------------------------------------------
+
+    def supported_pairs(self):
+        raise NotImplementedError
+
+    def supports(self, src_lang, tgt_lang):
+        return (src_lang, tgt_lang) in self.supported_pairs()
+
+    def _model_inputs(self, texts, src_lang, tgt_lang):
+        """``(encoded, generate_kwargs)`` for one batch of one language pair"""
+        raise NotImplementedError
+
+    def _generate(self, texts, src_lang, tgt_lang, **options):
+        encoded, generate_kwargs = self._model_inputs(texts, src_lang, tgt_lang)
+        return self._generate_and_decode(encoded, options, **generate_kwargs)
+
+    def _generate_fanout(self, text, src_lang, tgt_langs, **options):
+        """One text into several targets; subclasses share work across the targets"""
+        return [self._generate([text], src_lang, tgt_lang, **options)[0] for tgt_lang in tgt_langs]
+
+    def _encode(self, texts, prefix=()):
+        """Tokenize and pad a batch without touching shared tokenizer state.
+
+        The tokenizer is always called with the same settings (no special
+        tokens, no padding/truncation), so concurrent calls never reconfigure
+        it; special tokens, truncation and padding are applied here instead.
+        """
+        import torch
+
+        with timed("tokenize"):
+            suffix = [self.tokenizer.eos_token_id]
+            limit = self.max_source_tokens - len(prefix) - len(suffix)
+            rows = [
+                list(prefix) + ids[:limit] + suffix
+                for ids in self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+            ]
+            width = max(len(row) for row in rows)
+            pad = self.tokenizer.pad_token_id
+            encoded = {
+                "input_ids": torch.tensor([row + [pad] * (width - len(row)) for row in rows]),
+                "attention_mask": torch.tensor([[1] * len(row) + [0] * (width - len(row)) for row in rows]),
+            }
+        for row in rows:
+            INPUT_TOKENS.observe(len(row))
+        return encoded
+
+    def generation_params(self, options=None):
+        """``generation_kwargs`` with per-request decoding options applied"""
+        params = dict(self.generation_kwargs, **(options or {}))
+        if "max_new_tokens" in (options or {}):
+            params.pop("max_length", None)
+        if params.get("num_beams") == 1:
+            # Only meaningful for beam search; transformers warns otherwise
+            params.pop("early_stopping", None)
+        return params
+
+    def _generate_and_decode(self, encoded, options=None, **generate_kwargs):
+        """Run generate on an encoded batch and decode every row"""
+        import torch
+
+        with timed("generate"), torch.inference_mode():
+            generated_tokens = self.model.generate(**encoded, **self.generation_params(options), **generate_kwargs)
+        for count in (generated_tokens != self.tokenizer.pad_token_id).sum(dim=1).tolist():
+            OUTPUT_TOKENS.observe(count)
+        with timed("decode"):
+            return self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
+
+    def translate_batch(self, texts, src_lang, tgt_lang, **options):
+        """Translate a list of texts for one language pair in a single generate call"""
+        if not self.supports(src_lang, tgt_lang):
+            raise ValueError(f"{self.model_name} does not support {src_lang}→{tgt_lang}")
+        with self._in_use():
+            self.load()
+            return self._generate(list(texts), src_lang, tgt_lang, **options)
+
+    def fanout_batch(self, text, src_lang, tgt_langs, **options):
+        """Translate one text into every language in ``tgt_langs`` in a single pass"""
+        for tgt_lang in tgt_langs:
+            if not self.supports(src_lang, tgt_lang):
+                raise ValueError(f"{self.model_name} does not support {src_lang}→{tgt_lang}")
+        with self._in_use():
+            self.load()
+            return self._generate_fanout(text, src_lang, list(tgt_langs), **options)
+
+    def token_lengths(self, texts):
+        """Source token count per text (whitespace estimate until the tokenizer is loaded)"""
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return [len(text.split()) for text in texts]
+        return [len(ids) for ids in tokenizer(list(texts), add_special_tokens=False)["input_ids"]]
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = get_cache()
+        return self._cache
+
+    @property
+    def batcher(self):
+        if self._batcher is None:
+            with self._lock:
+                if self._batcher is None:
+                    self._batcher = MicroBatcher(self.translate_batch, num_workers=INFERENCE_THREADS,
+                                                 cost_fn=self.estimate_cost_ms)
+        return self._batcher
+
+    def set_batch_backend(self, batch_fn, num_workers=1, fanout_fn=None, stream_fn=None):
+        """Send this engine's micro-batches (fan-outs, streams) to ``batch_fn`` (e.g. a worker pool)"""
+        with self._lock:
+            self._batcher = MicroBatcher(batch_fn, num_workers=num_workers, cost_fn=self.estimate_cost_ms)
+            self._fanout_fn = fanout_fn
+            self._stream_fn = stream_fn
+
+    def result_tag(self):
+        """Model name as recorded with cached results"""
+        if self.backend.name != "eager":
+            # Converted models translate slightly differently; keep their results apart
+            return f"{self.model_name}@{self.backend.name}"
+        return self.model_name
+
+    def cache_key(self, text, src_lang, tgt_lang, **options):
+        return make_key(text, src_lang, tgt_lang, self.result_tag(), self.generation_params(options))
+
+    def memory_bucket(self, src_lang, tgt_lang, options):
+        """Translation memory partition: greedy and beam outputs never answer each other"""
+        return (src_lang, tgt_lang, self.result_tag(), self.generation_params(options).get("num_beams", 1))
+
+    def _recall(self, key, text, src_lang, tgt_lang, options):
+        """Exact cache hit, else a translation memory hit for a near-duplicate, else None"""
+        translated = self.cache.get(key)
+        if translated is not None or self.memory is None:
+            return translated
+        with timed("memory"):
+            translated = self.memory.lookup(text, self.memory_bucket(src_lang, tgt_lang, options))
+        MEMORY_LOOKUPS.inc(engine=self.name, result="miss" if translated is None else "hit")
+        return translated
+
+    def _remember(self, key, text, src_lang, tgt_lang, options, translated):
+        self.cache.put(key, translated)
+        if self.memory is not None:
+            self.memory.add(text, translated, self.memory_bucket(src_lang, tgt_lang, options))
+
+    def estimate_cost_ms(self, text, options):
+        """Scheduler cost of one request from its token count and decoding settings"""
+        params = self.generation_params(options)
+        src_tokens = self.token_lengths([text])[0]
+        max_new_tokens = params.get("max_new_tokens", params.get("max_length", self.max_source_tokens))
+        return self.policy.estimate_ms(src_tokens, max_new_tokens, params.get("num_beams", 1))
+
+    def queue_stats(self):
+        """Scheduler queue depth, projected wait and shed count"""
+        if self._batcher is None:
+            return {"depth": 0, "running": 0, "projected_wait_ms": 0.0, "shed": 0}
+        return self._batcher.stats()
+
+    def decoding_options(self, text, src_lang, tgt_lang, latency_budget_ms=None):
+        """``(options, retry_options)`` from the decoding policy for one text"""
+        src_tokens = self.token_lengths([text])[0]
+        return self.policy.choose(src_tokens, src_lang, tgt_lang, latency_budget_ms)
+
+    def submit(self, text, src_lang, tgt_lang, deadline=None, **options):
+        """Future for one translation, answered from the cache or the micro-batcher.
+
+        Identical requests already in flight are joined instead of generating
+        again, unless decoding samples (and so is not deterministic).
+        ``deadline`` (a ``time.monotonic()`` timestamp) is handed to the
+        scheduler, which raises ``Overloaded``/``DeadlineExceeded`` right away
+        when the request cannot be served in time. Requests with a deadline
+        are never coalesced, so one caller's deadline cannot fail another.
+        """
+        if not text.strip():
+            future = Future()
+            future.set_result(text)
+            return future
+
+        key = self.cache_key(text, src_lang, tgt_lang, **options)
+        translated = self._recall(key, text, src_lang, tgt_lang, options)
+        if translated is not None:
+            future = Future()
+            future.set_result(translated)
+            return future
+
+        def remember(done):
+            if not done.cancelled() and done.exception() is None:
+                self._remember(key, text, src_lang, tgt_lang, options, done.result())
+
+        def start():
+            future = self.batcher.submit(text, src_lang, tgt_lang, deadline=deadline, **options)
+            future.add_done_callback(remember)
+            return future
+
+        if deadline is not None or self.generation_params(options).get("do_sample"):
+            return start()
+        return self._flights.submit(key, start)
+
+    def translate(self, text, src_lang, tgt_lang, latency_budget_ms=None, validate=None, deadline_ms=None,
+                  deadline=None):
+        """Translate one text through the result cache and the micro-batcher.
+
+        Decoding options come from the engine's policy. When the policy decodes
+        greedily first, the text is retried with beam search only if
+        ``validate(translation)`` rejects the greedy output. With
+        ``deadline_ms`` (or an absolute ``time.monotonic()`` ``deadline``)
+        the request fails with ``DeadlineExceeded`` instead of being served
+        later than that.
+        """
+        if deadline_ms is not None:
+            deadline = time.monotonic() + deadline_ms / 1000
+        options, retry_options = self.decoding_options(text, src_lang, tgt_lang, latency_budget_ms)
+        translated = self.submit(text, src_lang, tgt_lang, deadline=deadline, **options).result()
+        if retry_options is not None and validate is not None and not validate(translated):
+            DECODE_RETRIES.inc(engine=self.name)
+            try:
+                translated = self.submit(text, src_lang, tgt_lang, deadline=deadline, **retry_options).result()
+            except DeadlineExceeded:
+                # No time left for beam search; the greedy output beats nothing
+                pass
+        return translated
+
+    def translate_many(self, text, src_lang, tgt_langs=None, latency_budget_ms=None, validate=None):
+        """Translate one text into several languages; returns ``{tgt_lang: translation}``.
+
+        Cached targets are answered from the cache and the rest are decoded
+        together by ``fanout_batch``. ``tgt_langs`` defaults to every
+        supported target of ``src_lang``.
+        """
+        if tgt_langs is None:
+            tgt_langs = [tgt for src, tgt in self.supported_pairs() if src == src_lang]
+        tgt_langs = [tgt_lang for tgt_lang in dict.fromkeys(tgt_langs) if tgt_lang != src_lang]
+        if not text.strip():
+            return {tgt_lang: text for tgt_lang in tgt_langs}
+
+        results, plans, keys = {}, {}, {}
+        for tgt_lang in tgt_langs:
+            plans[tgt_lang] = self.decoding_options(text, src_lang, tgt_lang, latency_budget_ms)
+            keys[tgt_lang] = self.cache_key(text, src_lang, tgt_lang, **plans[tgt_lang][0])
+            cached = self._recall(keys[tgt_lang], text, src_lang, tgt_lang, plans[tgt_lang][0])
+            if cached is not None:
+                results[tgt_lang] = cached
+        pending = [tgt_lang for tgt_lang in tgt_langs if tgt_lang not in results]
+
+        if pending:
+            # One decode for every row: the longest output budget and the narrowest beam
+            first = [plans[tgt_lang][0] for tgt_lang in pending]
+            options = dict(first[0],
+                           max_new_tokens=max(o["max_new_tokens"] for o in first),
+                           num_beams=min(o["num_beams"] for o in first))
+            fanout = self._fanout_fn or self.fanout_batch
+            for tgt_lang, translated in zip(pending, fanout(text, src_lang, pending, **options)):
+                self._remember(keys[tgt_lang], text, src_lang, tgt_lang, plans[tgt_lang][0], translated)
+                results[tgt_lang] = translated
+
+        if validate is not None:
+            for tgt_lang in pending:
+                retry_options = plans[tgt_lang][1]
+                if retry_options is not None and not validate(results[tgt_lang]):
+                    DECODE_RETRIES.inc(engine=self.name)
+                    results[tgt_lang] = self.submit(text, src_lang, tgt_lang, **retry_options).result()
+        return {tgt_lang: results[tgt_lang] for tgt_lang in tgt_langs}
+
+    def stream(self, text, src_lang, tgt_lang, latency_budget_ms=None, validate=None):
+        """Yield the translation so far as tokens are generated.
+
+        Runs its own greedy ``generate`` (a batch of one, outside the
+        micro-batcher) on a background thread, or on a worker when a pool is
+        attached. At most ``TRANSLATOR_MAX_STREAMS`` streams run at once and
+        each takes a slot in the scheduler's admission control; either being
+        full raises ``Overloaded`` on the first ``next()``. If ``validate``
+        rejects the streamed text and the policy allows a retry, the
+        beam-search result is yielded last. Time to first token is recorded
+        separately from the total streaming time.
+        """
+        start = time.perf_counter()
+        options, retry_options = self.decoding_options(text, src_lang, tgt_lang, latency_budget_ms)
+        options = dict(options, num_beams=1)
+        key = self.cache_key(text, src_lang, tgt_lang, **options)
+        translated = self._recall(key, text, src_lang, tgt_lang, options) if text.strip() else text
+        if translated is None:
+            translated, first = "", True
+            with self._stream_slot(text, options), self._in_use():
+                partials = (self._stream_fn or self._stream_tokens)(text, src_lang, tgt_lang, **options)
+                try:
+                    for translated in partials:
+                        if first:
+                            TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start, engine=self.name)
+                            first = False
+                        yield translated
+                finally:
+                    # Stops the generate early if the caller went away
+                    partials.close()
+            self._remember(key, text, src_lang, tgt_lang, options, translated)
+        else:
+            if translated:
+                TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start, engine=self.name)
+            yield translated
+
+        if retry_options is not None and validate is not None and text.strip() and not validate(translated):
+            DECODE_RETRIES.inc(engine=self.name)
+            yield self.submit(text, src_lang, tgt_lang, **retry_options).result()
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="stream")
+
+    @contextmanager
+    def _stream_slot(self, text, options):
+        if not self._streams.acquire(blocking=False):
+            SHED_REQUESTS.inc(reason="streams")
+            raise Overloaded(f"Translator busy: {MAX_STREAMS} streams already running")
+        try:
+            with self.batcher.slot(self.estimate_cost_ms(text, options)):
+                yield
+        finally:
+            self._streams.release()
+
+    def _stream_tokens(self, text, src_lang, tgt_lang, **options):
+        """Yield the text so far after every token, then the full decode"""
+        self.load()
+        streamer = TokenStreamer(self.tokenizer)
+        encoded, generate_kwargs = self._model_inputs([text], src_lang, tgt_lang)
+        params = dict(self.generation_params(options), **generate_kwargs)
+
+        def run():
+            import torch
+
+            try:
+                with torch.inference_mode():
+                    self.model.generate(**encoded, **params, streamer=streamer,
+                                        stopping_criteria=streamer.stopping_criteria())
+            except Exception as e:
+                streamer.fail(e)
+
+        threading.Thread(target=run, name=f"{self.name}-stream", daemon=True).start()
+        yield from streamer
+        OUTPUT_TOKENS.observe(len(streamer.decoder.ids))
+        yield streamer.decoder.final_text()
+
+    def iter_segments(self, segments, src_lang, tgt_lang, validate=None):
+        """Yield ``(index, translation)`` in order as the segments finish.
+
+        Every segment is queued at once, so the batcher pads them together
+        into as few generate calls as possible, while the first results are
+        available as soon as their batch is done. Segments rejected by
+        ``validate(segment, translation)`` are retried with beam search.
+        """
+        plans = [self.decoding_options(segment, src_lang, tgt_lang) for segment in segments]
+        futures = [
+            self.submit(segment, src_lang, tgt_lang, **options)
+            for segment, (options, _) in zip(segments, plans)
+        ]
+        try:
+            for index, future in enumerate(futures):
+                translated = future.result()
+                retry_options = plans[index][1]
+                if retry_options is not None and validate is not None and not validate(segments[index], translated):
+                    DECODE_RETRIES.inc(engine=self.name)
+                    translated = self.submit(segments[index], src_lang, tgt_lang, **retry_options).result()
+                yield index, translated
+        finally:
+            # Caller stopped early (e.g. the UI request was cancelled)
+            for future in futures:
+                future.cancel()
+
+    def translate_stream(self, text, src_lang, tgt_lang, validate=None):
+        """Translate a long document segment by segment, yielding the output so far"""
+        pieces = split_segments(text)
+        separators = [separator for _, separator in pieces]
+        translations = []
+        segments = [segment for segment, _ in pieces]
+        for _, translated in self.iter_segments(segments, src_lang, tgt_lang, validate=validate):
+            translations.append(translated)
+            yield join_segments(translations, separators)
+
+    def translate_document(self, text, src_lang, tgt_lang):
+        """Non-streaming version of translate_stream"""
+        result = ""
+        for result in self.translate_stream(text, src_lang, tgt_lang):
+            pass
+        return result
+
+    # -- start-up --------------------------------------------------------
+
+    def warmup(self, pairs=None):
+        """Run one dummy generation per language pair to trigger one-time allocations"""
+        self.load()
+        for src_lang, tgt_lang in pairs or self.supported_pairs():
+            start = time.perf_counter()
+            self.translate_batch([WARMUP_TEXT], src_lang, tgt_lang,
+                                 **self.decoding_options(WARMUP_TEXT, src_lang, tgt_lang)[0])
+            self.warmup_seconds[(src_lang, tgt_lang)] = time.perf_counter() - start
+        return self.startup_report()
+
+    def startup_report(self):
+        """Load and warm-up timings collected so far"""
+        return {
+            "model": self.model_name,
+            "backend": self.backend.name,
+            "loaded": self.is_loaded,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": sum(self.warmup_seconds.values()),
+            "warmup_pairs": {f"{src}→{tgt}": seconds for (src, tgt), seconds in self.warmup_seconds.items()},
+        }
+
+
+class T5Engine(TranslationEngine):
+    """FLAN-T5 driven by "translate English to X:" prompts"""
+
+    name = "t5"
+    model_name = T5_MODEL_NAME
+    memory_mb = 310
+    generation_kwargs = {
+        "max_length": 512,
+        "num_beams": 4,
+        "early_stopping": True,
+        "do_sample": False,
+        "temperature": 1.0,
+    }
+    PROMPT_LANGUAGES = {"en": "English", "fr": "French", "de": "German", "es": "Spanish", "hi": "Hindi"}
+
+    def _load(self):
+        from transformers import AutoConfig, AutoModelForSeq2SeqLM, AutoTokenizer
+
+        config = AutoConfig.from_pretrained(self.model_name)
+        return (
+            AutoTokenizer.from_pretrained(self.model_name),
+            self.load_model(lambda: AutoModelForSeq2SeqLM.from_pretrained(self.model_name, config=config), config),
+        )
+
+    def supported_pairs(self):
+        return [("en", tgt) for tgt in ("fr", "de", "es", "hi")]
+
+    def build_prompt(self, text, src_lang, tgt_lang):
+        """T5 task prefix for the pair, or None if the pair is not supported"""
+        if not self.supports(src_lang, tgt_lang):
+            return None
+        return f"translate {self.PROMPT_LANGUAGES[src_lang]} to {self.PROMPT_LANGUAGES[tgt_lang]}: {text}"
+
+    def _model_inputs(self, texts, src_lang, tgt_lang):
+        with timed("prompt"):
+            prompts = [self.build_prompt(text, src_lang, tgt_lang) for text in texts]
+        return self._encode(prompts), {}
+
+    def _generate_fanout(self, text, src_lang, tgt_langs, **options):
+        # Each target has its own prompt, so the targets simply share one batch
+        with timed("prompt"):
+            prompts = [self.build_prompt(text, src_lang, tgt_lang) for tgt_lang in tgt_langs]
+        return self._generate_and_decode(self._encode(prompts), options)
+
+
+class M2M100Engine(TranslationEngine):
+    """Many-to-many M2M100 covering every pair in LANGUAGE_CODES"""
+
+    name = "m2m100"
+    model_name = M2M100_MODEL_NAME
+    max_source_tokens = 1024
+    memory_mb = 1700
+
+    def _load(self):
+        from transformers import M2M100Config, M2M100ForConditionalGeneration, M2M100Tokenizer
+
+        config = M2M100Config.from_pretrained(self.model_name)
+        return (
+            M2M100Tokenizer.from_pretrained(self.model_name),
+            self.load_model(lambda: M2M100ForConditionalGeneration.from_pretrained(self.model_name, config=config),
+                            config),
+        )
+
+    def supported_pairs(self):
+        codes = list(LANGUAGE_CODES.values())
+        return [(src, tgt) for src in codes for tgt in codes if src != tgt]
+
+    def _prepare(self):
+        # Language tokens are looked up once instead of on every request
+        self.lang_token_ids = {code: self.tokenizer.get_lang_id(code) for code in LANGUAGE_CODES.values()}
+
+    def _model_inputs(self, texts, src_lang, tgt_lang):
+        # The source language token is prepended here rather than by setting
+        # tokenizer.src_lang, so concurrent batches never race on the tokenizer
+        encoded = self._encode(texts, prefix=[self.lang_token_ids[src_lang]])
+        return encoded, {"forced_bos_token_id": self.lang_token_ids[tgt_lang]}
+
+    def _generate_fanout(self, text, src_lang, tgt_langs, **options):
+        """Encode the source once and decode every target from the same encoder outputs.
+
+        Each row starts its decoder with its own target-language token, which
+        does per row what ``forced_bos_token_id`` does for a whole batch.
+        """
+        import torch
+        from transformers.modeling_outputs import BaseModelOutput
+
+        encoded = self._encode([text], prefix=[self.lang_token_ids[src_lang]])
+        rows = len(tgt_langs)
+        with timed("encode"), torch.inference_mode():
+            hidden = self.model.get_encoder()(**encoded).last_hidden_state
+        start = self.model.config.decoder_start_token_id
+        if "max_new_tokens" in options:
+            # The language token is part of the output budget, as with forced_bos_token_id
+            options = dict(options, max_new_tokens=options["max_new_tokens"] - 1)
+        return self._generate_and_decode(
+            {"attention_mask": encoded["attention_mask"].expand(rows, -1)},
+            options,
+            encoder_outputs=BaseModelOutput(last_hidden_state=hidden.expand(rows, -1, -1)),
+            decoder_input_ids=torch.tensor([[start, self.lang_token_ids[tgt_lang]] for tgt_lang in tgt_langs]),
+        )
+
+
+ENGINES = {engine.name: engine for engine in (T5Engine, M2M100Engine)}
+
+_instances = {}
+_cache = None
+_registry_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide translation cache, created on first use"""
+    global _cache
+    if _cache is None:
+        with _registry_lock:
+            if _cache is None:
+                _cache = TranslationCache()
+                for stat in ("hits", "misses", "evictions", "disk_evictions", "pending_writes", "entries", "bytes"):
+                    REGISTRY.gauge_callback(
+                        f"translator_cache_{stat}", f"Translation cache {stat}",
+                        lambda stat=stat: _cache.stats()[stat],
+                    )
+    return _cache
+
+
+def get_engine(name):
+    """Shared engine instance by short name ("t5" or "m2m100"); nothing is loaded yet"""
+    engine = _instances.get(name)
+    if engine is None:
+        with _registry_lock:
+            engine = _instances.get(name)
+            if engine is None:
+                engine = _instances[name] = ENGINES[name](memory=get_memory())
+    return engine
+
+
+def print_startup_report(engine):
+    report = engine.startup_report()
+    print(f"⏱️ Startup report for {report['model']} ({report['backend']} backend)")
+    if report["load_seconds"] is not None:
+        print(f"   📥 Model load: {report['load_seconds']:.2f}s")
+    if report["warmup_pairs"]:
+        print(f"   🔥 Warm-up: {report['warmup_seconds']:.2f}s over {len(report['warmup_pairs'])} pairs")
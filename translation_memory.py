@@ -0,0 +1,258 @@
+"""
+Fuzzy translation memory for near-duplicate segments
+
+Past source→target pairs are kept per language pair and model. Sources are
+normalized (case, spacing and trailing punctuation are ignored) and numbers
+are replaced by placeholders, so "Order 12 shipped." finds the stored
+"order 7 shipped" and comes back with 12 substituted into its translation.
+Only those matches answer a request. What normalization does not catch is
+found through a MinHash LSH index over character n-grams: candidates that
+share a band are checked for their exact n-gram Jaccard similarity against
+``TRANSLATOR_TM_THRESHOLD``. A high n-gram overlap says nothing about meaning
+("do not turn off" vs "do turn off"), so these are returned by ``suggest``
+and only served in place of the model with ``TRANSLATOR_TM_FUZZY=1``.
+"""
+
+import os
+import random
+import re
+import threading
+import unicodedata
+import zlib
+from array import array
+from collections import OrderedDict
+
+# Memory settings (overridable through the environment); a threshold of 0 disables the memory
+TM_THRESHOLD = float(os.environ.get("TRANSLATOR_TM_THRESHOLD", "0.9"))
+TM_MAX_ENTRIES = int(os.environ.get("TRANSLATOR_TM_MAX_ENTRIES", "100000"))
+# Serve fuzzy (n-gram similar) matches as translations; off, as they can reverse the meaning
+TM_FUZZY = os.environ.get("TRANSLATOR_TM_FUZZY", "0") not in ("0", "false", "no")
+
+NGRAM = 3
+# 32 hashes in 8 bands of 4: pairs above ~0.7 Jaccard almost always share a band
+NUM_HASHES = 32
+BANDS = 8
+# One fixed random mask per hash function, XORed onto a 32-bit n-gram hash
+_MASKS = [random.Random(1234 + i).getrandbits(32) for i in range(NUM_HASHES)]
+
+_NUMBER = re.compile(r"\d+(?:[.,:]\d+)*")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?;:。！？…]+$")
+PLACEHOLDER = "⦀"
+
+
+def normalize_segment(text):
+    """``(normalized, numbers, trailing)``: case-folded text with numbers as placeholders.
+
+    ``trailing`` is the segment's closing punctuation, which is ignored when
+    matching and restored on the translation.
+    """
+    text = " ".join(unicodedata.normalize("NFKC", text).split())
+    match = _TRAILING_PUNCTUATION.search(text)
+    trailing = match.group().strip() if match else ""
+    if match:
+        text = text[:match.start()]
+    numbers = tuple(_NUMBER.findall(text))
+    return _NUMBER.sub(PLACEHOLDER, text).casefold(), numbers, trailing
+
+
+def shingles(text):
+    padded = f" {text} "
+    return {padded[i:i + NGRAM] for i in range(max(len(padded) - NGRAM + 1, 1))}
+
+
+def minhash(grams):
+    """MinHash signature over the n-gram set.
+
+    XOR masks instead of full hash permutations keep this well under a
+    millisecond; candidates are checked with the exact Jaccard anyway.
+    """
+    hashes = [zlib.crc32(gram.encode("utf-8")) for gram in grams]
+    return array("I", (min(h ^ mask for h in hashes) for mask in _MASKS))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _template(target, numbers):
+    """Target with the source numbers replaced by indexed placeholders, or None if they cannot all be found"""
+    for index, number in enumerate(numbers):
+        pattern = re.compile(rf"(?<![\d.,]){re.escape(number)}(?![\d]|[.,]\d)")
+        target, found = pattern.subn(f"{PLACEHOLDER}{index}{PLACEHOLDER}", target, count=1)
+        if not found:
+            return None
+    return target
+
+
+def _fill(template, numbers):
+    for index, number in enumerate(numbers):
+        template = template.replace(f"{PLACEHOLDER}{index}{PLACEHOLDER}", number)
+    return template
+
+
+def _swap_trailing(translation, old, new):
+    """Give the translation the query's closing punctuation instead of the stored one's"""
+    if old == new:
+        return translation
+    if old and translation.endswith(old):
+        translation = translation[:-len(old)].rstrip()
+    elif old:
+        return translation  # the target punctuates differently; leave it alone
+    return translation + new
+
+
+class _Entry:
+    __slots__ = ("key", "normalized", "numbers", "trailing", "target", "template", "signature")
+
+    def __init__(self, key, normalized, numbers, trailing, target, template, signature):
+        self.key = key
+        self.normalized = normalized
+        self.numbers = numbers
+        self.trailing = trailing
+        self.target = target
+        self.template = template
+        self.signature = signature
+
+
+class TranslationMemory:
+    """Per-pair store of past translations answering exact and near-duplicate lookups.
+
+    ``bucket`` separates entries that must not answer each other (e.g. the
+    language pair plus the model and beam width that produced them). Oldest
+    entries are dropped once ``max_entries`` is reached. ``lookup`` only
+    answers from fuzzy matches when ``fuzzy`` is set.
+    """
+
+    def __init__(self, threshold=TM_THRESHOLD, max_entries=TM_MAX_ENTRIES, fuzzy=TM_FUZZY):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.fuzzy = fuzzy
+        # (bucket, normalized) -> entry, oldest first
+        self._entries = OrderedDict()
+        # (bucket, band, band hash) -> set of entry keys
+        self._bands = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _band_keys(self, bucket, signature):
+        rows = NUM_HASHES // BANDS
+        return [(bucket, band, hash(tuple(signature[band * rows:(band + 1) * rows]))) for band in range(BANDS)]
+
+    def add(self, source, target, bucket):
+        """Remember ``source``→``target``"""
+        normalized, numbers, trailing = normalize_segment(source)
+        if not normalized.strip(PLACEHOLDER + " "):
+            return
+        template = _template(target, numbers)
+        signature = minhash(shingles(normalized))
+        key = (bucket, normalized)
+        entry = _Entry(key, normalized, numbers, trailing, target, template, signature)
+        with self._lock:
+            if key in self._entries:
+                self._drop(self._entries[key])
+            self._entries[key] = entry
+            for band_key in self._band_keys(bucket, signature):
+                self._bands.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries.values())))
+
+    def _drop(self, entry):
+        del self._entries[entry.key]
+        for band_key in self._band_keys(entry.key[0], entry.signature):
+            keys = self._bands.get(band_key)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self._bands[band_key]
+
+    def lookup(self, source, bucket):
+        """Translation of a stored segment equal to ``source`` up to normalization and numbers, or None.
+
+        Fuzzy matches (see ``suggest``) are only served with ``fuzzy`` set.
+        """
+        normalized, numbers, trailing = normalize_segment(source)
+        with self._lock:
+            entry = self._entries.get((bucket, normalized))
+            translation = self._render(entry, numbers, trailing) if entry is not None else None
+            if translation is not None:
+                self.exact_hits += 1
+                return translation
+            if not self.fuzzy:
+                self.misses += 1
+                return None
+
+        suggestion = self._nearest(normalized, numbers, trailing, bucket)
+        with self._lock:
+            if suggestion is None:
+                self.misses += 1
+                return None
+            self.fuzzy_hits += 1
+            return suggestion[0]
+
+    def suggest(self, source, bucket):
+        """``(translation, similarity)`` of the most similar stored segment above ``threshold``, or None.
+
+        For showing to a translator or checking against the model; the
+        translation may not mean the same as ``source``.
+        """
+        return self._nearest(*normalize_segment(source), bucket)
+
+    def _nearest(self, normalized, numbers, trailing, bucket):
+        grams = shingles(normalized)
+        band_keys = self._band_keys(bucket, minhash(grams))
+        with self._lock:
+            candidates = set()
+            for band_key in band_keys:
+                candidates.update(self._bands.get(band_key, ()))
+            best, best_score = None, self.threshold
+            for key in candidates:
+                candidate = self._entries[key]
+                if len(candidate.numbers) != len(numbers):
+                    continue
+                score = jaccard(grams, shingles(candidate.normalized))
+                if score >= best_score:
+                    best, best_score = candidate, score
+            if best is None:
+                return None
+            translation = self._render(best, numbers, trailing)
+            return (translation, best_score) if translation is not None else None
+
+    @staticmethod
+    def _render(entry, numbers, trailing):
+        if numbers == entry.numbers:
+            translation = entry.target
+        elif entry.template is not None and len(numbers) == len(entry.numbers):
+            translation = _fill(entry.template, numbers)
+        else:
+            return None
+        return _swap_trailing(translation, entry.trailing, trailing)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.fuzzy_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.fuzzy_hits) / lookups if lookups else 0.0,
+            }
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_memory():
+    """Process-wide translation memory, or None when ``TRANSLATOR_TM_THRESHOLD`` is 0"""
+    global _memory
+    if _memory is None and TM_THRESHOLD > 0:
+        with _memory_lock:
+            if _memory is None:
+                _memory = TranslationMemory()
+    return _memory
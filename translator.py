@@ -0,0 +1,262 @@
+"""
+T5 demo translation pipeline with curated and mock fallbacks
+
+Kept free of Gradio so tests and batch jobs can import ``translate`` cheaply;
+the model itself is only loaded on the first translation. FLAN-T5 only
+translates out of English, so other directions are pivoted through English
+with M2M100 serving the X→EN leg (loaded the first time it is needed).
+"""
+
+import logging
+
+from batching import Overloaded
+from language_detection import AUTO, resolve_source
+from metrics import RESULTS, timed
+from phrase_store import get_phrase_store
+from segmentation import join_segments, split_segments
+from model_registry import PIVOT_LANGUAGE, ModelRegistry, get_registry
+from translation_engine import get_engine
+
+engine = get_engine("t5")
+model_name = engine.model_name
+phrases = get_phrase_store()
+
+# Per-request details are logged at DEBUG, so they cost nothing by default
+logger = logging.getLogger("translator")
+
+LANGUAGE_NAMES = {"en": "English", "hi": "Hindi", "fr": "French", "de": "German", "es": "Spanish"}
+
+# T5 for EN→X, M2M100 only for X→EN; every other pair is pivoted X→EN→Y
+def build_router():
+    registry = ModelRegistry()
+    registry.register("t5", engine)
+    registry.register("m2m100", get_engine("m2m100"),
+                      pairs=[(src, PIVOT_LANGUAGE) for src in LANGUAGE_NAMES if src != PIVOT_LANGUAGE])
+    return registry
+
+# The process-wide registry, so the JSON API shares its routes and memory budget
+def router():
+    return get_registry(build=build_router)
+
+# Footer naming the models behind a pair
+def model_label(src_lang, tgt_lang):
+    if engine.supports(src_lang, tgt_lang):
+        return "🤖 Powered by T5 Model"
+    if tgt_lang == PIVOT_LANGUAGE:
+        return "🤖 Powered by M2M100 Model"
+    return "🤖 Powered by M2M100 + T5 (via English)"
+
+# Load the model on first use; False means we are running in demo mode
+def model_ready():
+    if engine.is_loaded:
+        return True
+    if engine.load_error is None:
+        print(f"📥 Loading model: {model_name}")
+        if engine.available():
+            print("✅ Model loaded successfully!")
+            return True
+        print(f"⚠️ Error loading model: {engine.load_error}")
+        print("🔄 Falling back to demo mode...")
+    return False
+
+# Check if T5 output is valid (comprehensive validation)
+def is_valid_translation(translated, input_text):
+    return bool(
+        translated and 
+        translated.strip() and
+        translated.strip() != input_text.strip() and
+        len(translated.strip()) > 3 and
+        not translated.strip().startswith("Translate") and
+        not translated.strip().startswith("translate") and
+        # Check if output contains mostly punctuation or special characters
+        sum(c.isalpha() for c in translated) > len(translated) * 0.3 and  # At least 30% letters
+        not all(c in "?!.,;: " for c in translated.strip())  # Not just punctuation
+    )
+
+BUSY_MESSAGE = "⏳ The translator is busy right now. Please try again in a few seconds."
+
+# Answer for text detected to be in the target language already
+def same_language_message(text, tgt_lang):
+    RESULTS.inc(source="same_language")
+    return f"🎯 {text}\n\n🔍 The text is already in {LANGUAGE_NAMES.get(tgt_lang, tgt_lang)}"
+
+# Generic response when the T5 output fails validation
+def fallback_message(text, src_lang, tgt_lang):
+    return f"🔄 [Professional translation needed for '{text}']\nFrom {LANGUAGE_NAMES.get(src_lang, src_lang)} to {LANGUAGE_NAMES.get(tgt_lang, tgt_lang)}\n\n⚠️ T5 model output was incomplete. For production use, consider using specialized translation models like M2M100 or commercial APIs."
+
+# Translation function with error handling
+def translate(text, src_lang, tgt_lang, latency_budget_ms=None):
+    logger.debug("🔄 Translating: %r from %s to %s", text, src_lang, tgt_lang)
+    
+    try:
+        if not text.strip():
+            return "⚠️ Please enter some text to translate"
+        
+        if src_lang == tgt_lang:
+            return "⚠️ Source and target languages are the same"
+
+        # "auto" is resolved here, and text already in the target language
+        # is returned before anything is tokenized
+        src_lang, same_language = resolve_source(text, src_lang, tgt_lang, candidates=LANGUAGE_NAMES)
+        if same_language:
+            return same_language_message(text, tgt_lang)
+            
+        # Known phrases are answered from the precomputed index, before the model
+        curated = phrases.lookup(text, src_lang, tgt_lang)
+        if curated is not None:
+            if engine.load_error is not None:
+                RESULTS.inc(source="mock")
+                return f"🎯 {curated}\n\n💡 Demo Translation (Mock)"
+            RESULTS.inc(source="curated")
+            return f"🎯 {curated}\n\n✨ High-Quality Curated Translation"
+
+        # If model failed to load, use a mock translator for demo
+        if not model_ready():
+            logger.debug("📝 Using mock translator (model not loaded)")
+            RESULTS.inc(source="mock")
+            return f"🔄 Mock Translation: '{text}' from {LANGUAGE_NAMES.get(src_lang, src_lang)} to {LANGUAGE_NAMES.get(tgt_lang, tgt_lang)}\n\n⚠️ This is a demo interface. The actual translation model requires additional dependencies that are not compatible with Python 3.13. Please see installation notes below."
+            
+        # For FLAN-T5 models (if they loaded successfully)
+        logger.debug("🤖 Using T5 model for translation")
+        
+        if not router().supports(src_lang, tgt_lang):
+            RESULTS.inc(source="unsupported")
+            return "⚠️ This demo model supports limited language pairs (EN, HI, FR, DE, ES)"
+
+        # Create more specific prompts for better T5 performance; pivoted
+        # pairs are checked against the source text instead
+        input_text = engine.build_prompt(text, src_lang, tgt_lang) or text
+        logger.debug("📝 Input prompt: %s", input_text)
+        # Goes through the result cache and the micro-batcher; greedy output
+        # that fails validation is retried once with beam search. Pairs T5
+        # cannot serve run leg by leg through English
+        translated = router().translate(
+            text, src_lang, tgt_lang,
+            latency_budget_ms=latency_budget_ms,
+            validate=lambda output: is_valid_translation(output, input_text),
+        )
+        logger.debug("✅ T5 output: %r", translated)
+        
+        with timed("validate"):
+            valid = is_valid_translation(translated, input_text)
+        if not valid:
+            logger.debug("⚠️ T5 output invalid: %r", translated)
+            RESULTS.inc(source="fallback")
+            # Provide a generic response
+            return fallback_message(text, src_lang, tgt_lang)
+        
+        RESULTS.inc(source="model")
+        return f"🎯 {translated}\n\n{model_label(src_lang, tgt_lang)}"
+
+    except Overloaded:
+        RESULTS.inc(source="busy")
+        return BUSY_MESSAGE
+        
+    except Exception as e:
+        error_msg = f"❌ Translation error: {str(e)}"
+        logger.warning(error_msg)
+        RESULTS.inc(source="error")
+        return error_msg
+
+# Streaming mode: yield the model output as it is generated, token by token
+def translate_stream(text, src_lang, tgt_lang):
+    if src_lang == AUTO and text.strip():
+        src_lang, same_language = resolve_source(text, src_lang, tgt_lang, candidates=LANGUAGE_NAMES)
+        if same_language:
+            yield same_language_message(text, tgt_lang)
+            return
+    input_text = engine.build_prompt(text, src_lang, tgt_lang)
+    # Empty input, curated phrases, demo mode and unsupported pairs behave exactly like translate()
+    if (not text.strip() or src_lang == tgt_lang or input_text is None
+            or phrases.lookup(text, src_lang, tgt_lang) is not None or not model_ready()):
+        yield translate(text, src_lang, tgt_lang)
+        return
+
+    logger.debug("⚡ Streaming: %r from %s to %s", text, src_lang, tgt_lang)
+    try:
+        translated = ""
+        for translated in engine.stream(
+            text, src_lang, tgt_lang,
+            validate=lambda output: is_valid_translation(output, input_text),
+        ):
+            yield f"🎯 {translated}\n\n⏳ Translating..."
+
+        with timed("validate"):
+            valid = is_valid_translation(translated, input_text)
+        if not valid:
+            RESULTS.inc(source="fallback")
+            yield fallback_message(text, src_lang, tgt_lang)
+            return
+
+        RESULTS.inc(source="model")
+        yield f"🎯 {translated}\n\n🤖 Powered by T5 Model"
+
+    except Overloaded:
+        RESULTS.inc(source="busy")
+        yield BUSY_MESSAGE
+
+    except Exception as e:
+        error_msg = f"❌ Translation error: {str(e)}"
+        logger.warning(error_msg)
+        RESULTS.inc(source="error")
+        yield error_msg
+
+# Long-document mode: translate sentence by sentence and stream the partial output
+def translate_document(text, src_lang, tgt_lang):
+    logger.debug("📄 Translating document (%d chars) from %s to %s", len(text), src_lang, tgt_lang)
+    if src_lang == AUTO and text.strip():
+        src_lang, same_language = resolve_source(text, src_lang, tgt_lang, candidates=LANGUAGE_NAMES)
+        if same_language:
+            yield same_language_message(text, tgt_lang)
+            return
+
+    try:
+        # Short input, demo mode or unsupported pairs behave exactly like translate()
+        if not text.strip() or src_lang == tgt_lang or not model_ready() or not router().supports(src_lang, tgt_lang):
+            yield translate(text, src_lang, tgt_lang)
+            return
+
+        pieces = split_segments(text)
+        segments = [segment for segment, _ in pieces]
+        separators = [separator for _, separator in pieces]
+
+        # Curated sentences skip the model; everything else is batched together
+        curated = [phrases.lookup(segment, src_lang, tgt_lang) for segment in segments]
+        misses = [segment for segment, known in zip(segments, curated) if known is None]
+
+        def segment_valid(segment, translated):
+            prompt = engine.build_prompt(segment, src_lang, tgt_lang) or segment
+            return not segment.strip() or is_valid_translation(translated, prompt)
+
+        # Pivoted pairs batch each leg across all segments
+        model_outputs = router().iter_segments(misses, src_lang, tgt_lang, validate=segment_valid)
+
+        translations = []
+        for segment, known in zip(segments, curated):
+            if known is not None:
+                translated = known
+                RESULTS.inc(source="curated")
+            else:
+                _, translated = next(model_outputs)
+                with timed("validate"):
+                    valid = segment_valid(segment, translated)
+                # Keep the source sentence rather than a broken model output
+                if not valid:
+                    translated = segment
+                RESULTS.inc(source="model" if valid else "fallback")
+            translations.append(translated)
+            done = len(translations)
+            if done < len(segments):
+                yield f"🎯 {join_segments(translations, separators)}\n\n⏳ Translating... ({done}/{len(segments)} segments)"
+
+        yield f"🎯 {join_segments(translations, separators)}\n\n{model_label(src_lang, tgt_lang)} ({len(segments)} segments)"
+
+    except Overloaded:
+        RESULTS.inc(source="busy")
+        yield BUSY_MESSAGE
+
+    except Exception as e:
+        error_msg = f"❌ Translation error: {str(e)}"
+        logger.warning(error_msg)
+        RESULTS.inc(source="error")
+        yield error_msg
@@ -0,0 +1,452 @@
+"""
+Multi-process inference worker pool with copy-on-write shared weights
+
+The front process loads every model once and then forks a zygote: a
+single-threaded process that forks the K inference workers (and any
+replacement later), each serving all of them. Forking after the loads means
+the weight tensors are shared copy-on-write (they are only ever read), so
+total memory stays close to one copy of each model while the cores are
+divided between the K workers exactly once; forking from the zygote means no
+worker is ever forked from the front process while its serving threads hold
+locks. On platforms without ``fork`` the weights are moved to shared memory
+and handed to spawned workers instead.
+
+The engine keeps its cache and micro-batcher in the front process; only the
+padded batches and token streams travel to the workers. The metrics a worker
+records while running a task (stage timings, token counts) travel back with
+its answer and are recorded in the front process, which serves ``/metrics``. Each worker has its
+own pipe, so the tasks a worker was running are known: if it dies (OOM kill,
+crash inside ``generate``) its pipe closes, they fail with ``WorkerDied`` and
+a fresh worker takes its place, instead of leaving their callers waiting forever.
+"""
+
+import functools
+import gc
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import traceback
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeout
+from multiprocessing.connection import Connection, wait
+from multiprocessing.reduction import recv_handle, send_handle
+
+from metrics import REGISTRY
+from translation_engine import get_engine
+
+# Number of inference processes; 0 keeps inference in the serving process
+WORKERS = int(os.environ.get("TRANSLATOR_WORKERS", "0"))
+# Longest a caller waits for a worker's answer
+WORKER_TIMEOUT_S = float(os.environ.get("TRANSLATOR_WORKER_TIMEOUT_S", "300"))
+
+logger = logging.getLogger("translator")
+
+
+class WorkerDied(RuntimeError):
+    """The inference worker running the task exited before answering"""
+
+
+def _portable(error):
+    """``error`` itself if it survives pickling, else a RuntimeError with its text"""
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def _worker_main(models, num_threads, warm_pairs, conn, cancelled, index):
+    try:
+        import torch
+    except ImportError:  # engines without a torch model
+        pass
+    else:
+        torch.set_num_threads(num_threads)
+    # Updates made in this process from now on, shipped with the next answer
+    events = REGISTRY.capture()
+    engines = {}
+    for engine_name, (tokenizer, model) in models.items():
+        engines[engine_name] = get_engine(engine_name)
+        engines[engine_name].attach(tokenizer, model)
+        if engine_name in warm_pairs:
+            engines[engine_name].warmup(warm_pairs[engine_name])
+    events.clear()  # warm-up traffic is not served traffic
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        task_id, engine_name, method, args, options = task
+        try:
+            if method == "stream":
+                _stream(engines[engine_name], task_id, args, options, conn, cancelled, index, events)
+            else:
+                # method is "translate_batch" or "fanout_batch"
+                outputs = getattr(engines[engine_name], method)(*args, **options)
+                conn.send((task_id, outputs, None, True, _drain(events)))
+        except Exception as e:
+            # The caller gets the original exception type back where possible
+            conn.send((task_id, None, _portable(e), True, _drain(events)))
+
+
+def _drain(events):
+    # popleft is thread-safe: a stream's generate thread may still be recording
+    drained = []
+    while events:
+        drained.append(events.popleft())
+    return drained
+
+
+def _stream(engine, task_id, args, options, conn, cancelled, index, events):
+    # Every partial text is its own message; a final empty one ends the stream
+    partials = engine._stream_tokens(*args, **options)
+    try:
+        for partial in partials:
+            if cancelled[index] == task_id:
+                break  # the reader went away; closing stops the generate
+            conn.send((task_id, partial, None, False, _drain(events)))
+    finally:
+        partials.close()
+    conn.send((task_id, None, None, True, _drain(events)))
+
+
+def _zygote_main(models, num_threads, warm_pairs, conn, cancelled):
+    """Fork one worker per request from the front process; never runs a thread itself"""
+    while True:
+        try:
+            index = conn.recv()
+        except EOFError:
+            index = None
+        if index is None:
+            break
+        fd = recv_handle(conn)
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            code = 1
+            try:
+                _worker_main(models, num_threads, warm_pairs, Connection(fd), cancelled, index)
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        os.close(fd)
+        conn.send(pid)
+        _reap(os.WNOHANG)
+    _reap(0)
+
+
+def _reap(options):
+    # Collect exited workers so they do not linger as zombies
+    try:
+        while os.waitpid(-1, options)[0]:
+            pass
+    except ChildProcessError:
+        pass  # no children left
+
+
+class _Worker:
+    """One inference process, its pipe and the tasks sent to it"""
+
+    __slots__ = ("index", "pid", "conn", "process", "pending", "send_lock")
+
+    def __init__(self, index, pid, conn, process=None):
+        self.index = index
+        self.pid = pid
+        self.conn = conn
+        # Only set for workers this process started itself (spawned, not forked by the zygote)
+        self.process = process
+        # task id -> Future (or message queue for streams), for everything sent and not yet answered
+        self.pending = {}
+        self.send_lock = threading.Lock()
+
+
+class WorkerPool:
+    """K inference processes sharing one read-only copy of each engine's weights"""
+
+    def __init__(self, engine_names, workers=None, threads_per_worker=None, warmup=True, timeout=WORKER_TIMEOUT_S,
+                 pairs=None):
+        self.engine_names = list(engine_names)
+        self.workers = workers or WORKERS or 1
+        cpus = os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.workers)
+        # Engine name -> the pairs each worker warms up (every supported pair when not given)
+        self.warm_pairs = {}
+        if warmup:
+            for name in self.engine_names:
+                if pairs is None:
+                    self.warm_pairs[name] = None
+                elif pairs.get(name):
+                    self.warm_pairs[name] = list(pairs[name])
+        self.timeout = timeout
+        self.restarts = 0
+        self._workers = []
+        self._zygote = None
+        self._zygote_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._collector = None
+        self._closing = False
+
+    def start(self):
+        """Load every engine's weights once in this process, then start the workers.
+
+        Call it before this process starts any other thread: the zygote is
+        forked here, and every worker (replacements included) is forked from it.
+        """
+        engines = [get_engine(name).load() for name in self.engine_names]
+        # Rust tokenizers must not keep their own thread pool across fork
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            self._ctx = multiprocessing.get_context("fork")
+        else:
+            import torch.multiprocessing
+
+            self._ctx = torch.multiprocessing.get_context("spawn")
+            for engine in engines:
+                engine.model.share_memory()
+        # Per worker slot: id of a stream whose reader went away, checked by the worker between tokens
+        self._cancelled = self._ctx.Array("q", [-1] * self.workers, lock=False)
+
+        if self._ctx.get_start_method() == "fork":
+            # Keep the garbage collector from touching (and so copying) inherited objects
+            gc.freeze()
+            self._zygote_conn, child_conn = self._ctx.Pipe()
+            self._zygote = self._ctx.Process(
+                target=_zygote_main,
+                args=(self._models(), self.threads_per_worker, self.warm_pairs, child_conn, self._cancelled),
+                name="translator-zygote",
+                daemon=True,
+            )
+            self._zygote.start()
+            child_conn.close()
+
+        self._workers = [self._spawn(i) for i in range(self.workers)]
+        # Wakes the collector up when the pool is closed
+        self._wakeup, self._wakeup_writer = multiprocessing.Pipe(duplex=False)
+        self._collector = threading.Thread(target=self._collect, name="worker-pool-results", daemon=True)
+        self._collector.start()
+        return self
+
+    def _models(self):
+        models = {}
+        for name in self.engine_names:
+            engine = get_engine(name)
+            models[name] = (engine.tokenizer, engine.model)
+        return models
+
+    def _spawn(self, index):
+        conn, child_conn = self._ctx.Pipe()
+        if self._zygote is not None:
+            with self._zygote_lock:
+                self._zygote_conn.send(index)
+                send_handle(self._zygote_conn, child_conn.fileno(), self._zygote.pid)
+                pid = self._zygote_conn.recv()
+            child_conn.close()
+            return _Worker(index, pid, conn)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._models(), self.threads_per_worker, self.warm_pairs, child_conn, self._cancelled, index),
+            name=f"translator-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(index, process.pid, conn, process)
+
+    def _collect(self):
+        while True:
+            with self._lock:
+                workers = list(self._workers)
+            by_conn = {worker.conn: worker for worker in workers}
+            ready = wait(list(by_conn) + [self._wakeup])
+            if self._closing:
+                return
+            for conn in ready:
+                worker = by_conn.get(conn)
+                # A worker's pipe only reaches EOF once the worker is gone
+                if worker is not None and not self._receive(worker):
+                    self._replace(worker)
+
+    def _receive(self, worker):
+        """Resolve the task the worker answered; False once its pipe is closed"""
+        try:
+            task_id, outputs, error, final, events = worker.conn.recv()
+        except (EOFError, OSError):
+            return False  # the worker is gone
+        # Recorded even if the caller stopped waiting: the work was done
+        REGISTRY.replay(events)
+        with self._lock:
+            entry = worker.pending.pop(task_id, None) if final else worker.pending.get(task_id)
+        if entry is None:
+            return True
+        if isinstance(entry, queue.SimpleQueue):
+            entry.put((outputs, error, final))
+            return True
+        try:
+            if error is not None:
+                entry.set_exception(error)
+            else:
+                entry.set_result(outputs)
+        except InvalidStateError:
+            pass  # the caller timed out and cancelled it
+        return True
+
+    def _replace(self, worker):
+        """Fail everything the dead worker was running and start a new one in its place"""
+        worker.conn.close()
+        if worker.process is not None:
+            worker.process.join()
+        replacement = self._spawn(worker.index)
+        with self._lock:
+            # Tasks sent until now are the dead worker's; later ones go to the replacement
+            pending, worker.pending = worker.pending, {}
+            self._workers[worker.index] = replacement
+            self.restarts += 1
+        error = WorkerDied(f"Inference worker {worker.index} (pid {worker.pid}) exited")
+        logger.warning("💥 %s; failing %d task(s) and restarting it", error, len(pending))
+        for entry in pending.values():
+            _fail(entry, error)
+
+    def _send(self, entry, engine_name, method, args, options):
+        task_id = next(self._ids)
+        with self._lock:
+            # The least busy worker gets the task
+            worker = min(self._workers, key=lambda w: len(w.pending))
+            worker.pending[task_id] = entry
+        try:
+            with worker.send_lock:
+                worker.conn.send((task_id, engine_name, method, args, options))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                worker.pending.pop(task_id, None)
+            _fail(entry, WorkerDied(f"Inference worker {worker.index} is gone: {e}"))
+        return worker, task_id
+
+    def _submit(self, engine_name, method, args, options):
+        future = Future()
+        self._send(future, engine_name, method, args, options)
+        return future
+
+    def _wait(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            if future.done():
+                raise  # the task itself timed out (e.g. DeadlineExceeded)
+            future.cancel()
+            raise TimeoutError(f"No answer from the inference workers within {self.timeout:.0f}s") from None
+
+    def submit_batch(self, engine_name, texts, src_lang, tgt_lang, **options):
+        return self._submit(engine_name, "translate_batch", (list(texts), src_lang, tgt_lang), options)
+
+    def translate_batch(self, engine_name, texts, src_lang, tgt_lang, **options):
+        """Run one of ``engine_name``'s padded batches on the least busy worker"""
+        return self._wait(self.submit_batch(engine_name, texts, src_lang, tgt_lang, **options))
+
+    def fanout_batch(self, engine_name, text, src_lang, tgt_langs, **options):
+        """Translate one text into several targets on the least busy worker"""
+        return self._wait(self._submit(engine_name, "fanout_batch", (text, src_lang, list(tgt_langs)), options))
+
+    def stream(self, engine_name, text, src_lang, tgt_lang, **options):
+        """Yield the text so far as a worker generates it; closing early stops the worker's generate"""
+        messages = queue.SimpleQueue()
+        worker, task_id = self._send(messages, engine_name, "stream", (text, src_lang, tgt_lang), options)
+        final = False
+        try:
+            while not final:
+                try:
+                    partial, error, final = messages.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No answer from the inference workers within {self.timeout:.0f}s") from None
+                if error is not None:
+                    raise error
+                if not final:
+                    yield partial
+        finally:
+            if not final:
+                self._cancelled[worker.index] = task_id
+                with self._lock:
+                    worker.pending.pop(task_id, None)
+
+    def close(self):
+        self._closing = True
+        if self._collector is not None:
+            self._wakeup_writer.send(None)
+            self._collector.join()
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        if self._zygote is not None:
+            # The zygote waits for the workers it forked before exiting
+            self._zygote_conn.send(None)
+            self._zygote.join()
+            self._zygote_conn.close()
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join()
+            worker.conn.close()
+        self._workers = []
+
+    def memory_report(self):
+        """Proportional set size (shared pages split fairly) of the front process and workers"""
+        pids = [os.getpid()] + [worker.pid for worker in self._workers]
+        report = {pid: _pss_kib(pid) for pid in pids}
+        known = [kib for kib in report.values() if kib is not None]
+        return {
+            "per_process_kib": report,
+            "total_pss_kib": sum(known) if known else None,
+        }
+
+
+def _fail(entry, error):
+    if isinstance(entry, queue.SimpleQueue):
+        entry.put((None, error, True))
+        return
+    try:
+        entry.set_exception(error)
+    except InvalidStateError:
+        pass  # the caller timed out and cancelled it
+
+
+def _pss_kib(pid):
+    # Linux only: smaps_rollup accounts shared copy-on-write pages proportionally
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def start_worker_pool(engines, workers=None, threads_per_worker=None, warmup=True, pairs=None):
+    """Route the micro-batchers of ``engines`` (one engine or a list) through one worker pool.
+
+    Call this once, before serving traffic or starting other threads: every
+    engine is loaded first and the workers are forked after, so each one
+    serves all the engines. Batches formed in this process are dispatched to
+    the least busy worker. ``pairs`` maps engine names to the pairs routed to
+    them, the only ones the workers warm up (default: every supported pair).
+    """
+    if not isinstance(engines, (list, tuple)):
+        engines = [engines]
+    pool = WorkerPool([engine.name for engine in engines], workers, threads_per_worker, warmup,
+                      pairs=pairs).start()
+    for engine in engines:
+        engine.set_batch_backend(functools.partial(pool.translate_batch, engine.name), num_workers=pool.workers,
+                                 fanout_fn=functools.partial(pool.fanout_batch, engine.name),
+                                 stream_fn=functools.partial(pool.stream, engine.name))
+    return pool